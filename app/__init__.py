@@ -6,61 +6,55 @@ from config import Config
 jwt = JWTManager()
 socketio = SocketIO()
 
-def create_app():
+def create_app(config_class=Config):
     app = Flask(__name__)
-    app.config.from_object(Config)
+    app.config.from_object(config_class)
+    
+    # JSON 응답 고속 경로 (orjson이 있으면 사용)
+    from app.serialization import FastJSONProvider
+    app.json = FastJSONProvider(app)
 
     # models에서 db import
     from app.models import db
+    from app.storage import init_storage
+    from app.activity import init_activity_log
+    from app.chat.ring import init_message_ring
+    from app.chat.broadcast import init_broadcaster
     
     db.init_app(app)
     jwt.init_app(app)
-    socketio.init_app(app, cors_allowed_origins="*")
+    socketio.init_app(app, cors_allowed_origins="*",
+                      async_mode=app.config.get('SOCKETIO_ASYNC_MODE'))
+    init_storage(app)
+    init_activity_log(app)
+    init_message_ring(app)
+    init_broadcaster(app)
 
     # 블루프린트 등록
     from app.auth.routes import auth_bp
     from app.calendar.routes import calendar_bp
     from app.chat.routes import chat_bp
+    from app.messages.routes import messages_bp
     from app.profile.routes import profile_bp
 
     
     app.register_blueprint(auth_bp)
     app.register_blueprint(calendar_bp)
     app.register_blueprint(chat_bp)
+    app.register_blueprint(messages_bp)
     app.register_blueprint(profile_bp)
 
-    with app.app_context():
-        db.create_all()
-        
-        # 기본 관리자 계정 생성
-        from app.models import User
-        from app.crypto import MessageCrypto
-        admin = User.query.filter_by(username='admin').first()
-        if not admin:
-            try:
-                # 관리자용 키 쌍 생성
-                private_key_pem, public_key_pem = MessageCrypto.generate_key_pair()
-                key_fingerprint = MessageCrypto.generate_fingerprint(public_key_pem)
-                
-                admin = User(
-                    username='admin', 
-                    email='admin@myapp.com', 
-                    is_admin=True,
-                    public_key=public_key_pem,
-                    key_fingerprint=key_fingerprint
-                )
-                admin.set_password('admin123')
-                db.session.add(admin)
-                db.session.commit()
-                print("Admin user created: username=admin, password=admin123")
-                print(f"Admin key fingerprint: {key_fingerprint}")
-            except Exception as e:
-                print(f"Error creating admin user: {e}")
-                # 키 생성 실패시 기본 관리자만 생성
-                admin = User(username='admin', email='admin@myapp.com', is_admin=True)
-                admin.set_password('admin123')
-                db.session.add(admin)
-                db.session.commit()
-                print("Admin user created without encryption keys: username=admin, password=admin123")
+    # 요청 계측 (METRICS_ENABLED일 때만, app/metrics.py)
+    from app.metrics import init_metrics
+    init_metrics(app)
+
+    # 응답 압축과 정적 파일 캐시 (app/compression.py)
+    from app.compression import init_compression
+    init_compression(app)
+
+    from app.cli import register_commands
+    register_commands(app)
 
-    return app
\ No newline at end of file
+    # DB 스키마 생성/마이그레이션과 관리자 계정 생성은 여기서 하지 않는다.
+    # 배포 시 한 번 `flask --app run init`으로 실행 (app/cli.py의 bootstrap 참고)
+    return app
@@ -0,0 +1,343 @@
+"""
+사용자 활동(UserActivity) 감사 로그 버퍼
+소켓 핫패스(on_join/on_leave 등)에서는 record()로 메모리 버퍼에 넣기만 하고,
+백그라운드 작업이 건수(ACTIVITY_LOG_BATCH_SIZE) 또는 시간(ACTIVITY_LOG_FLUSH_INTERVAL)
+기준으로 모아 싱크에 한 번에 쓴다.
+
+- 싱크: DB(user_activity 테이블에 일괄 INSERT) 또는 추가 전용 바이너리 파일
+- 버퍼가 가득 차거나 싱크 쓰기에 실패하면 설정에 따라 버리거나(drop)
+  디스크 스필 파일(spill/spill-<pid>.ual)로 내보내고(spill), 스필된 기록은 다음 플러시 때 다시 보낸다.
+  비정상 종료/재시작한 프로세스가 남긴 스필 파일도 다음 플러시 때 이어받아 보낸다.
+- 프로세스 종료 시 shutdown()(atexit 등록)이 남은 기록을 모두 플러시한다.
+
+파일 형식 (활동 로그 파일과 스필 파일 공통, 리틀 엔디언):
+    헤더  b'UAL1'
+    기록  user_id(u32) timestamp(i64, epoch 기준 마이크로초) type 길이(u8) details 길이(u16)
+          type(UTF-8) details(UTF-8)
+"""
+
+import atexit
+import os
+import struct
+import threading
+from collections import deque
+from datetime import datetime, timedelta
+
+from app.models import UserActivity, db
+
+FILE_MAGIC = b'UAL1'
+RECORD_HEADER = struct.Struct('<IqBH')
+EPOCH = datetime(1970, 1, 1)
+MAX_TYPE_BYTES = 255
+MAX_DETAILS_BYTES = 65535
+
+
+# ---------------------------------------------------------------------------
+# 파일 형식
+# ---------------------------------------------------------------------------
+
+def encode_records(records):
+    """(user_id, timestamp, activity_type, details) 목록을 파일 기록 형식으로 인코딩"""
+    chunks = []
+    for user_id, timestamp, activity_type, details in records:
+        type_bytes = activity_type.encode('utf-8')[:MAX_TYPE_BYTES]
+        details_bytes = (details or '').encode('utf-8')[:MAX_DETAILS_BYTES]
+        micros = (timestamp - EPOCH) // timedelta(microseconds=1)
+        chunks.append(RECORD_HEADER.pack(user_id, micros, len(type_bytes), len(details_bytes)))
+        chunks.append(type_bytes)
+        chunks.append(details_bytes)
+    return b''.join(chunks)
+
+
+def append_records(path, records):
+    """파일 끝에 기록 추가 (새 파일이면 헤더부터)"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'ab') as f:
+        if f.tell() == 0:
+            f.write(FILE_MAGIC)
+        f.write(encode_records(records))
+
+
+def iter_activity_file(path):
+    """활동 로그/스필 파일의 기록을 (user_id, timestamp, activity_type, details)로 읽기
+
+    마지막 기록이 쓰다 만 상태(비정상 종료)라면 그 기록은 건너뛴다.
+    """
+    with open(path, 'rb') as f:
+        data = f.read()
+    if not data.startswith(FILE_MAGIC):
+        raise ValueError(f'활동 로그 파일 형식이 아닙니다: {path}')
+
+    offset = len(FILE_MAGIC)
+    while offset + RECORD_HEADER.size <= len(data):
+        user_id, micros, type_len, details_len = RECORD_HEADER.unpack_from(data, offset)
+        offset += RECORD_HEADER.size
+        end = offset + type_len + details_len
+        if end > len(data):
+            break
+        activity_type = data[offset:offset + type_len].decode('utf-8', 'replace')
+        details = data[offset + type_len:end].decode('utf-8', 'replace') or None
+        offset = end
+        yield user_id, EPOCH + timedelta(microseconds=micros), activity_type, details
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _spill_owner(name):
+    """스필 파일 이름 -> 지금 그 파일을 쓰거나 다시 보내는 프로세스의 pid (형식이 아니면 None)
+
+    spill-<pid>.ual은 기록 중인 파일, spill-<pid>.ual.<처리 pid>.replaying은 다시 보내는 중인 파일이다.
+    """
+    parts = name.split('.')
+    try:
+        if len(parts) == 2 and parts[0].startswith('spill-') and parts[1] == 'ual':
+            return int(parts[0][len('spill-'):])
+        if len(parts) == 4 and parts[0].startswith('spill-') and parts[1] == 'ual' and parts[3] == 'replaying':
+            return int(parts[2])
+    except ValueError:
+        pass
+    return None
+
+
+# ---------------------------------------------------------------------------
+# 싱크
+# ---------------------------------------------------------------------------
+
+class DatabaseSink:
+    """user_activity 테이블에 배치 단위로 INSERT (배치당 트랜잭션 하나)"""
+
+    def __init__(self, app):
+        self.app = app
+
+    def write(self, records):
+        rows = [
+            {'user_id': user_id, 'timestamp': timestamp, 'activity_type': activity_type, 'details': details}
+            for user_id, timestamp, activity_type, details in records
+        ]
+        with self.app.app_context():
+            with db.engine.begin() as conn:
+                conn.execute(UserActivity.__table__.insert(), rows)
+
+
+class FileSink:
+    """날짜별 추가 전용 바이너리 파일 (activity-YYYYMMDD.ual)"""
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    def path_for(self, day):
+        return os.path.join(self.directory, f'activity-{day:%Y%m%d}.ual')
+
+    def write(self, records):
+        by_day = {}
+        for record in records:
+            by_day.setdefault(record[1].date(), []).append(record)
+        for day, day_records in by_day.items():
+            append_records(self.path_for(day), day_records)
+
+
+# ---------------------------------------------------------------------------
+# 버퍼
+# ---------------------------------------------------------------------------
+
+class ActivityLog:
+    """활동 기록 버퍼 - record()는 블로킹 없이 버퍼에 넣기만 한다"""
+
+    def __init__(self):
+        self.sink = None
+        self.batch_size = 500
+        self.flush_interval = 1.0
+        self.max_buffer = 10000
+        self.overflow = 'spill'
+        self.spill_path = None
+        self.recorded = 0
+        self.flushed = 0
+        self.dropped = 0
+        self.spilled = 0
+        self._buffer = deque()
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._spill_lock = threading.Lock()
+        self._wake = None
+        self._started = False
+        self._stopped = False
+        self._atexit_registered = False
+
+    def init_app(self, app):
+        config = app.config
+        self.batch_size = config.get('ACTIVITY_LOG_BATCH_SIZE', self.batch_size)
+        self.flush_interval = config.get('ACTIVITY_LOG_FLUSH_INTERVAL', self.flush_interval)
+        self.max_buffer = config.get('ACTIVITY_LOG_MAX_BUFFER', self.max_buffer)
+        self.overflow = config.get('ACTIVITY_LOG_OVERFLOW', self.overflow)
+
+        directory = config.get('ACTIVITY_LOG_DIR') or os.path.join(app.instance_path, 'activity_log')
+        if config.get('ACTIVITY_LOG_SINK', 'database') == 'file':
+            self.sink = FileSink(directory)
+        else:
+            self.sink = DatabaseSink(app)
+        self.spill_path = os.path.join(directory, 'spill', f'spill-{os.getpid()}.ual')
+        if not self._atexit_registered:
+            atexit.register(self.shutdown)
+            self._atexit_registered = True
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._started:
+                return
+            from app.storage import async_primitives
+            _, create_event, _, start_task = async_primitives()
+            self._wake = create_event()
+            self._started = True
+        start_task(self._run)
+
+    def record(self, user_id, activity_type, details=None, timestamp=None):
+        """활동 기록 추가 (싱크에는 나중에 배치로 기록됨)"""
+        entry = (user_id, timestamp or datetime.utcnow(), activity_type, details)
+        with self._lock:
+            full = len(self._buffer) >= self.max_buffer
+            if not full:
+                self._buffer.append(entry)
+                self.recorded += 1
+                size = len(self._buffer)
+        if full:
+            self._overflow([entry])
+            return
+
+        self._ensure_started()
+        if size >= self.batch_size:
+            self._wake.set()
+
+    def _overflow(self, records):
+        """버퍼 초과/싱크 실패 시 스필 파일로 내보내거나 버린다"""
+        if self.overflow == 'spill' and self.spill_path:
+            try:
+                with self._spill_lock:
+                    append_records(self.spill_path, records)
+                self.spilled += len(records)
+                return
+            except OSError as e:
+                print(f'활동 로그 스필 실패: {e}')
+        self.dropped += len(records)
+
+    def _take(self):
+        with self._lock:
+            batch = list(self._buffer)
+            self._buffer.clear()
+        return batch
+
+    def _claim_spill_files(self):
+        """다시 보낼 스필 파일을 이 프로세스 몫으로 가져온다 - .replaying 경로 목록
+
+        이 프로세스의 스필 파일과, 이미 종료된 프로세스가 남긴 스필/다시 보내다 만 파일을
+        spill-<pid>.ual.<이 pid>.replaying으로 이름을 바꿔 가져온다. os.rename은 원자적이라
+        여러 프로세스가 동시에 훑어도 한 곳만 성공한다. 살아 있는 다른 프로세스의 파일은
+        아직 쓰는 중일 수 있으므로 그 프로세스가 보낸다.
+        """
+        directory = os.path.dirname(self.spill_path)
+        try:
+            names = sorted(os.listdir(directory))
+        except FileNotFoundError:
+            return []
+
+        pid = os.getpid()
+        claimed = []
+        for name in names:
+            owner = _spill_owner(name)
+            if owner is None:
+                continue
+            path = os.path.join(directory, name)
+            if name.endswith('.replaying'):
+                if owner == pid:
+                    claimed.append(path)  # 지난 플러시에서 실패한 파일
+                    continue
+                if _pid_alive(owner):
+                    continue
+                source = name.rsplit('.', 2)[0]
+            else:
+                if owner != pid and _pid_alive(owner):
+                    continue
+                source = name
+            target = os.path.join(directory, f'{source}.{pid}.replaying')
+            try:
+                # 이 프로세스의 파일은 새 스필 기록과 섞이지 않도록 잠근 채로 가져온다
+                with self._spill_lock:
+                    os.rename(path, target)
+            except FileNotFoundError:
+                continue  # 다른 프로세스가 먼저 가져감
+            claimed.append(target)
+        return claimed
+
+    def _replay_spill(self):
+        """스필 파일의 기록을 싱크로 다시 보낸다 - 보낸 기록 수"""
+        replayed = 0
+        for path in self._claim_spill_files():
+            try:
+                records = list(iter_activity_file(path))
+            except ValueError as e:
+                print(f'활동 로그 스필 파일을 읽을 수 없습니다: {e}')
+                os.replace(path, path + '.bad')
+                continue
+            for i in range(0, len(records), self.batch_size):
+                self.sink.write(records[i:i + self.batch_size])
+            os.remove(path)
+            replayed += len(records)
+        return replayed
+
+    def flush(self):
+        """버퍼(와 스필 파일)의 기록을 싱크에 쓴다 - 쓴 기록 수 반환"""
+        if self.sink is None:
+            return 0
+        with self._flush_lock:
+            batch = self._take()
+            written = 0
+            try:
+                if batch:
+                    self.sink.write(batch)
+                    written += len(batch)
+                    self.flushed += len(batch)
+                if self.overflow == 'spill' and self.spill_path:
+                    replayed = self._replay_spill()
+                    written += replayed
+                    self.flushed += replayed
+            except Exception as e:
+                print(f'활동 로그 쓰기 오류: {e}')
+                if batch and written == 0:
+                    self._overflow(batch)
+            return written
+
+    def _run(self):
+        while not self._stopped:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+
+    def shutdown(self):
+        """백그라운드 플러시를 멈추고 남은 기록을 모두 쓴다"""
+        self._stopped = True
+        if self._wake is not None:
+            self._wake.set()
+        self.flush()
+
+    def stats(self):
+        return {
+            'buffered': len(self._buffer),
+            'recorded': self.recorded,
+            'flushed': self.flushed,
+            'spilled': self.spilled,
+            'dropped': self.dropped,
+        }
+
+
+activity_log = ActivityLog()
+
+
+def init_activity_log(app):
+    activity_log.init_app(app)
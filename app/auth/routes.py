@@ -1,7 +1,7 @@
 from flask import Blueprint, request, jsonify, render_template, redirect, url_for
 from flask_jwt_extended import create_access_token, unset_jwt_cookies, jwt_required, get_jwt_identity
 from app.models import User, db
-from app.crypto import MessageCrypto
+from app.routing import read_replica
 
 auth_bp = Blueprint('auth', __name__)
 
@@ -33,7 +33,8 @@ def register():
     if email and User.query.filter_by(email=email).first():
         return jsonify({'error': '이미 사용중인 이메일입니다.'}), 400
     
-    # RSA 키 쌍 생성
+    # RSA 키 쌍 생성 (암호화 백엔드는 필요할 때 로드)
+    from app.crypto import MessageCrypto
     try:
         private_key_pem, public_key_pem = MessageCrypto.generate_key_pair()
         key_fingerprint = MessageCrypto.generate_fingerprint(public_key_pem)
@@ -155,6 +156,7 @@ def regenerate_keys():
     if not user:
         return jsonify({'error': '사용자를 찾을 수 없습니다.'}), 404
     
+    from app.crypto import MessageCrypto
     try:
         # 새로운 키 쌍 생성
         private_key_pem, public_key_pem = MessageCrypto.generate_key_pair()
@@ -177,6 +179,7 @@ def regenerate_keys():
 
 @auth_bp.route('/api/auth/online-users', methods=['GET'])
 @jwt_required()
+@read_replica
 def get_online_users():
     """온라인 사용자 목록을 가져오는 API"""
     from datetime import datetime, timedelta
@@ -0,0 +1,251 @@
+"""
+일정 충돌 감지
+사용자별로 시작 시각 기준 정렬된 구간 인덱스를 메모리에 유지하고,
+본인 이벤트와 편집 권한으로 공유받은 이벤트 중 겹치는 일정을 찾는다.
+
+인덱스는 워커마다 따로 있으므로 만들 때의 user.calendar_version을 기록해 두고,
+조회 때 DB의 버전과 다르면(다른 워커가 이벤트를 바꿈) DB에서 다시 만든다.
+"""
+
+import sys
+import threading
+from bisect import bisect_left, bisect_right, insort
+from collections import OrderedDict
+from datetime import timedelta
+
+from app.models import Event, EventShare, db
+from app.calendar.listeners import SNAPSHOT_FIELDS, calendar_version, on_events_changed, snapshot
+from app.calendar.recurrence import is_recurring, iter_occurrences, to_naive_utc
+
+# 새 반복 이벤트를 검사할 때 확인할 최대 발생 수
+MAX_CHECKED_OCCURRENCES = 50
+# 응답에 담는 최대 충돌 수 (시작 시각이 이른 순)
+MAX_CONFLICTS = 100
+
+
+def _overlaps(a_start, a_end, b_start, b_end):
+    """반개구간 [start, end) 겹침 여부 (종료 시간이 없는 이벤트는 한 시점으로 취급)"""
+    a_point = a_start == a_end
+    b_point = b_start == b_end
+    if a_point and b_point:
+        return a_start == b_start
+    if a_point:
+        return b_start <= a_start < b_end
+    if b_point:
+        return a_start <= b_start < a_end
+    return a_start < b_end and b_start < a_end
+
+
+def _interval(snap):
+    start = to_naive_utc(snap['start_time'])
+    end = to_naive_utc(snap['end_time']) or start
+    return start, max(start, end)
+
+
+class UserIntervalIndex:
+    """한 사용자가 볼 수 있는 이벤트의 구간 인덱스
+
+    단일 이벤트는 (start, id) 정렬 리스트에 넣고, 가장 긴 이벤트 길이만큼
+    앞쪽을 넓혀 이분 탐색한다. 반복 이벤트는 질의 구간에서만 전개한다.
+    """
+
+    def __init__(self, version=0):
+        self.version = version  # 만들 때의 user.calendar_version
+        self._starts = []       # 정렬된 (start, event_id)
+        self._single = {}       # event_id -> (start, end, snap)
+        self._recurring = {}    # event_id -> snap
+        self._max_duration = timedelta(0)
+
+    def __len__(self):
+        return len(self._single) + len(self._recurring)
+
+    def event_ids(self):
+        return set(self._single) | set(self._recurring)
+
+    def add(self, snap):
+        if snap['is_all_day'] or snap['start_time'] is None:
+            return
+        if is_recurring(snap['repeat']):
+            self._recurring[snap['id']] = snap
+            return
+        start, end = _interval(snap)
+        self._single[snap['id']] = (start, end, snap)
+        insort(self._starts, (start, snap['id']))
+        self._max_duration = max(self._max_duration, end - start)
+
+    def remove(self, event_id):
+        self._recurring.pop(event_id, None)
+        entry = self._single.pop(event_id, None)
+        if entry is not None:
+            index = bisect_left(self._starts, (entry[0], event_id))
+            if index < len(self._starts) and self._starts[index] == (entry[0], event_id):
+                del self._starts[index]
+
+    def find(self, start, end, exclude_id=None):
+        """[start, end)와 겹치는 (snap, 발생 시작, 발생 종료) 목록"""
+        found = []
+        low = bisect_left(self._starts, (start - self._max_duration,))
+        high = bisect_right(self._starts, (end, sys.maxsize))
+        for other_start, event_id in self._starts[low:high]:
+            if event_id == exclude_id:
+                continue
+            _, other_end, snap = self._single[event_id]
+            if _overlaps(start, end, other_start, other_end):
+                found.append((snap, other_start, other_end))
+
+        for event_id, snap in self._recurring.items():
+            if event_id == exclude_id:
+                continue
+            base_start, base_end = _interval(snap)
+            duration = base_end - base_start
+            for occurrence in iter_occurrences(base_start, snap['repeat'],
+                                               to_naive_utc(snap['repeat_until']),
+                                               window_start=start - duration, window_end=end):
+                if _overlaps(start, end, occurrence, occurrence + duration):
+                    found.append((snap, occurrence, occurrence + duration))
+        return found
+
+
+class ConflictDetector:
+    """user_id -> UserIntervalIndex LRU 레지스트리"""
+
+    def __init__(self, max_users=2000):
+        self.max_users = max_users
+        self._indexes = OrderedDict()
+        self._members = {}      # event_id -> 해당 이벤트를 담고 있는 user_id 집합
+        self._user_events = {}  # user_id -> 인덱스에 담긴 event_id 집합 (_drop을 그 사용자 이벤트 수에 비례하게)
+        self._lock = threading.RLock()
+
+    def _load(self, user_id, version):
+        """DB에서 인덱스를 새로 만든다 (잠금 밖에서 호출)"""
+        columns = [getattr(Event, field) for field in SNAPSHOT_FIELDS]
+        editable_ids = db.session.query(EventShare.event_id).filter(
+            EventShare.shared_with_user_id == user_id,
+            EventShare.permission == 'edit'
+        )
+        rows = db.session.query(*columns).filter(
+            db.or_(Event.user_id == user_id, Event.id.in_(editable_ids))
+        ).all()
+        index = UserIntervalIndex(version)
+        for row in rows:
+            index.add(snapshot(row))
+        return index
+
+    def _index_for(self, user_id, version):
+        with self._lock:
+            index = self._indexes.get(user_id)
+            if index is not None and index.version == version:
+                self._indexes.move_to_end(user_id)
+                return index
+
+        # DB 조회는 잠금 밖에서 - 다른 사용자의 충돌 검사를 막지 않는다
+        index = self._load(user_id, version)
+        if calendar_version(user_id) != version:
+            return index  # 읽는 사이 바뀜 - 이번 요청에만 쓰고 캐시하지 않는다
+
+        with self._lock:
+            current = self._indexes.get(user_id)
+            if current is not None and current.version >= version:
+                self._indexes.move_to_end(user_id)
+                return current
+            self._drop(user_id)
+            self._indexes[user_id] = index
+            event_ids = index.event_ids()
+            self._user_events[user_id] = event_ids
+            for event_id in event_ids:
+                self._members.setdefault(event_id, set()).add(user_id)
+            while len(self._indexes) > self.max_users:
+                self._drop(next(iter(self._indexes)))
+            return index
+
+    def _drop(self, user_id):
+        self._indexes.pop(user_id, None)
+        for event_id in self._user_events.pop(user_id, ()):
+            users = self._members.get(event_id)
+            if users is None:
+                continue
+            users.discard(user_id)
+            if not users:
+                del self._members[event_id]
+
+    def find_conflicts(self, user_id, snap):
+        """snap 이벤트(반복이면 앞쪽 일부 발생)와 겹치는 일정 목록 (시작 시각 순 최대 MAX_CONFLICTS개)"""
+        if snap['is_all_day'] or snap['start_time'] is None:
+            return []
+
+        start, end = _interval(snap)
+        duration = end - start
+        if is_recurring(snap['repeat']):
+            occurrences = list(iter_occurrences(start, snap['repeat'], to_naive_utc(snap['repeat_until']),
+                                                limit=MAX_CHECKED_OCCURRENCES))
+        else:
+            occurrences = [start]
+
+        index = self._index_for(user_id, calendar_version(user_id))
+        conflicts = []
+        seen = set()
+        with self._lock:
+            for occurrence in occurrences:
+                for other, other_start, other_end in index.find(occurrence, occurrence + duration,
+                                                                exclude_id=snap['id']):
+                    key = (other['id'], other_start)
+                    if key in seen:
+                        continue
+                    seen.add(key)
+                    conflicts.append({
+                        'id': other['id'],
+                        'title': other['title'],
+                        'start_time': other_start.isoformat(),
+                        'end_time': other_end.isoformat() if other_end != other_start else None,
+                        'is_shared_with_me': other['user_id'] != user_id
+                    })
+        conflicts.sort(key=lambda conflict: conflict['start_time'])
+        return conflicts[:MAX_CONFLICTS]
+
+    def apply_changes(self, changes, reset_users=(), versions=None):
+        """같은 워커의 변경을 인덱스에 반영
+
+        인덱스가 이 변경 직전 버전(versions[user_id] - 1)이 아니면 그 사이 다른 워커의 변경이
+        있었던 것이므로 버리고 다음 조회에서 다시 만든다.
+        """
+        versions = versions or {}
+        with self._lock:
+            stale = set(reset_users)
+            stale.update(user_id for user_id, index in self._indexes.items()
+                         if user_id in versions and index.version != versions[user_id] - 1)
+            for user_id in stale:
+                self._drop(user_id)
+
+            for before, after in changes:
+                snap = after or before
+                event_id = snap['id']
+                holders = set(self._members.get(event_id, ()))
+                if snap['user_id'] in self._indexes:
+                    holders.add(snap['user_id'])
+                for user_id in holders:
+                    index = self._indexes.get(user_id)
+                    if index is None:
+                        continue
+                    index.remove(event_id)
+                    if after is not None:
+                        index.add(after)
+                        self._user_events.setdefault(user_id, set()).add(event_id)
+                    else:
+                        self._user_events.get(user_id, set()).discard(event_id)
+                if after is None:
+                    self._members.pop(event_id, None)
+                elif holders:
+                    self._members[event_id] = holders
+
+            for user_id, version in versions.items():
+                index = self._indexes.get(user_id)
+                if index is not None:
+                    index.version = version
+
+
+conflict_detector = ConflictDetector()
+
+
+@on_events_changed
+def _update_indexes(changes, reset_users, versions):
+    conflict_detector.apply_changes(changes, reset_users, versions)
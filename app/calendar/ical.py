@@ -0,0 +1,402 @@
+"""
+iCalendar(.ics) 가져오기/내보내기 모듈
+대용량 캘린더도 메모리를 일정하게 유지하도록 스트리밍 방식으로 처리
+"""
+
+import codecs
+import re
+import uuid
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from app.calendar.recurrence import compute_fire_at, occurrence_at
+
+PRODID = '-//Integration//Calendar//KO'
+
+# 가져올 때 허용하는 콘텐츠 라인(접힌 줄을 펼친 뒤) 최대 길이 - 줄바꿈 없는 입력으로 메모리가 커지지 않도록
+MAX_LINE_LENGTH = 1024 * 1024
+
+# 내보낸 이벤트의 UID (event-<id>@integration)
+_OWN_UID_RE = re.compile(r'^event-(\d+)@integration$')
+
+# 내부 반복 규칙 <-> RRULE FREQ
+REPEAT_TO_FREQ = {'daily': 'DAILY', 'weekly': 'WEEKLY', 'monthly': 'MONTHLY'}
+FREQ_TO_REPEAT = {freq: repeat for repeat, freq in REPEAT_TO_FREQ.items()}
+
+# 가져올 때 해석하는 RRULE 키 (그 외 BYxxx 등이 있으면 반복을 그대로 표현할 수 없다)
+RRULE_KEYS = frozenset({'FREQ', 'UNTIL', 'COUNT', 'INTERVAL', 'WKST', 'BYDAY', 'BYMONTHDAY'})
+ICS_WEEKDAYS = ('MO', 'TU', 'WE', 'TH', 'FR', 'SA', 'SU')
+
+# 내부 우선순위 <-> iCalendar PRIORITY (1이 가장 높음)
+PRIORITY_TO_ICS = {'urgent': 1, 'high': 3, 'normal': 5, 'low': 9}
+
+
+class UnsupportedEvent(ValueError):
+    """서버의 이벤트 모델로 그대로 표현할 수 없는 VEVENT (가져오지 않고 보고한다)"""
+
+
+class LineTooLong(ValueError):
+    """MAX_LINE_LENGTH를 넘는 콘텐츠 라인 - 가져오기를 중단한다"""
+
+
+_DURATION_RE = re.compile(
+    r'^(?P<sign>[+-])?P(?:(?P<weeks>\d+)W)?(?:(?P<days>\d+)D)?'
+    r'(?:T(?:(?P<hours>\d+)H)?(?:(?P<minutes>\d+)M)?(?:(?P<seconds>\d+)S)?)?$'
+)
+
+
+# ---------------------------------------------------------------------------
+# 내보내기
+# ---------------------------------------------------------------------------
+
+def _escape_text(value):
+    return (value.replace('\\', '\\\\').replace(';', '\\;')
+                 .replace(',', '\\,').replace('\r\n', '\\n').replace('\n', '\\n'))
+
+
+def _fold(line):
+    """RFC 5545 규칙에 따라 75옥텟 단위로 줄을 접는다"""
+    encoded = line.encode('utf-8')
+    if len(encoded) <= 75:
+        return line + '\r\n'
+
+    parts = []
+    limit = 75
+    while encoded:
+        cut = min(limit, len(encoded))
+        # UTF-8 멀티바이트 문자가 잘리지 않도록 조정
+        while cut < len(encoded) and (encoded[cut] & 0xC0) == 0x80:
+            cut -= 1
+        parts.append(encoded[:cut].decode('utf-8'))
+        encoded = encoded[cut:]
+        limit = 74  # 이어지는 줄은 앞의 공백 한 칸 포함
+    return '\r\n '.join(parts) + '\r\n'
+
+
+def _format_datetime(value, all_day=False):
+    if all_day:
+        return value.strftime('%Y%m%d')
+    # 서버는 UTC(naive)로 저장하므로 Z 접미사를 붙인다
+    return value.strftime('%Y%m%dT%H%M%SZ')
+
+
+def format_vevent(row):
+    """이벤트 한 건(컬럼 튜플 또는 모델)을 VEVENT 문자열로 변환"""
+    all_day = bool(row.is_all_day)
+    value_param = ';VALUE=DATE' if all_day else ''
+    lines = [
+        'BEGIN:VEVENT',
+        f'UID:{row.ical_uid or f"event-{row.id}@integration"}',
+        f'DTSTAMP:{_format_datetime(row.updated_at or row.created_at or datetime.utcnow())}',
+        f'DTSTART{value_param}:{_format_datetime(row.start_time, all_day)}',
+    ]
+    if row.end_time:
+        lines.append(f'DTEND{value_param}:{_format_datetime(row.end_time, all_day)}')
+    lines.append(f'SUMMARY:{_escape_text(row.title)}')
+    if row.description:
+        lines.append(f'DESCRIPTION:{_escape_text(row.description)}')
+    if row.location:
+        lines.append(f'LOCATION:{_escape_text(row.location)}')
+    if row.category:
+        lines.append(f'CATEGORIES:{_escape_text(row.category)}')
+    if row.priority in PRIORITY_TO_ICS:
+        lines.append(f'PRIORITY:{PRIORITY_TO_ICS[row.priority]}')
+    if row.color:
+        lines.append(f'X-INTEGRATION-COLOR:{row.color}')
+
+    freq = REPEAT_TO_FREQ.get(row.repeat)
+    if freq:
+        rrule = f'RRULE:FREQ={freq}'
+        if row.repeat_until:
+            rrule += f';UNTIL={_format_datetime(row.repeat_until, all_day)}'
+        lines.append(rrule)
+
+    if row.notification_minutes:
+        lines.extend([
+            'BEGIN:VALARM',
+            'ACTION:DISPLAY',
+            f'DESCRIPTION:{_escape_text(row.title)}',
+            f'TRIGGER:-PT{int(row.notification_minutes)}M',
+            'END:VALARM',
+        ])
+    lines.append('END:VEVENT')
+    return ''.join(_fold(line) for line in lines)
+
+
+def iter_ics(rows):
+    """VCALENDAR 문서를 조각 단위로 생성하는 제너레이터
+
+    rows는 서버 측 커서(yield_per)로 읽어오는 이터러블이어야 한다.
+    """
+    yield ''.join(_fold(line) for line in (
+        'BEGIN:VCALENDAR',
+        'VERSION:2.0',
+        f'PRODID:{PRODID}',
+        'CALSCALE:GREGORIAN',
+    ))
+    for row in rows:
+        yield format_vevent(row)
+    yield _fold('END:VCALENDAR')
+
+
+# ---------------------------------------------------------------------------
+# 가져오기
+# ---------------------------------------------------------------------------
+
+def _unescape_text(value):
+    result = []
+    chars = iter(value)
+    for char in chars:
+        if char == '\\':
+            nxt = next(chars, '')
+            result.append('\n' if nxt in ('n', 'N') else nxt)
+        else:
+            result.append(char)
+    return ''.join(result)
+
+
+def own_event_id(uid):
+    """이 서버가 내보낸 UID이면 이벤트 id, 아니면 None"""
+    match = _OWN_UID_RE.match(uid or '')
+    return int(match.group(1)) if match else None
+
+
+def _iter_raw_lines(stream, chunk_size, max_length):
+    decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+    buffer = ''
+    while True:
+        chunk = stream.read(chunk_size)
+        buffer += decoder.decode(chunk, final=not chunk)
+        *lines, buffer = buffer.split('\n')
+        yield from lines
+        if len(buffer) > max_length:
+            raise LineTooLong(f'한 줄이 {max_length}자를 넘습니다.')
+        if not chunk:
+            break
+    if buffer:
+        yield buffer
+
+
+def iter_content_lines(stream, chunk_size=64 * 1024, max_length=MAX_LINE_LENGTH):
+    """바이너리 스트림에서 접힌 줄을 펼친 콘텐츠 라인을 하나씩 생성 (max_length를 넘으면 LineTooLong)"""
+    pending = None
+    for line in _iter_raw_lines(stream, chunk_size, max_length):
+        line = line.rstrip('\r')
+        if line[:1] in (' ', '\t') and pending is not None:
+            pending += line[1:]
+            if len(pending) > max_length:
+                raise LineTooLong(f'한 줄이 {max_length}자를 넘습니다.')
+            continue
+        if pending is not None:
+            yield pending
+        pending = line
+    if pending:
+        yield pending
+
+
+def _parse_property(line):
+    """'NAME;PARAM=VALUE:value' 형식의 줄을 (이름, 파라미터, 값)으로 분리"""
+    head, sep, value = line.partition(':')
+    if not sep:
+        return None, {}, ''
+    name, *raw_params = head.split(';')
+    params = {}
+    for raw in raw_params:
+        key, _, param_value = raw.partition('=')
+        params[key.upper()] = param_value.strip('"')
+    return name.upper(), params, value
+
+
+def iter_vevents(stream):
+    """VEVENT 하나씩 {속성명: (파라미터, 값)} 딕셔너리로 생성
+
+    한 번에 하나의 이벤트만 메모리에 유지한다.
+    """
+    current = None
+    depth = []
+    for line in iter_content_lines(stream):
+        if not line:
+            continue
+        name, params, value = _parse_property(line)
+        if name == 'BEGIN':
+            depth.append(value.upper())
+            if value.upper() == 'VEVENT':
+                current = {}
+            continue
+        if name == 'END':
+            component = depth.pop() if depth else None
+            if component == 'VEVENT' and current is not None:
+                yield current
+                current = None
+            continue
+        if current is None or not name:
+            continue
+        if depth and depth[-1] == 'VALARM':
+            if name == 'TRIGGER' and 'ALARM_TRIGGER' not in current:
+                current['ALARM_TRIGGER'] = (params, value)
+            continue
+        # 같은 속성이 여러 번 나오면 첫 번째 값을 사용
+        current.setdefault(name, (params, value))
+
+
+def _zone(tzid):
+    try:
+        return ZoneInfo(tzid.strip())
+    except (ZoneInfoNotFoundError, ValueError, OSError):
+        raise UnsupportedEvent(f'알 수 없는 시간대입니다: {tzid}')
+
+
+def _parse_ics_datetime(params, value):
+    """DTSTART/DTEND 값을 (datetime, 종일 여부)로 변환
+
+    서버는 UTC(naive)로 저장하므로 TZID가 지정된 로컬 시간은 UTC로 바꾼다.
+    Z 접미사는 UTC, 둘 다 없는 floating 시간은 그대로 사용한다.
+    """
+    value = value.strip()
+    if params.get('VALUE') == 'DATE' or len(value) == 8:
+        parsed = datetime.strptime(value[:8], '%Y%m%d')
+        return parsed, True
+    parsed = datetime.strptime(value.rstrip('Z')[:15], '%Y%m%dT%H%M%S')
+    if not value.endswith('Z') and params.get('TZID'):
+        zone = _zone(params['TZID'])
+        parsed = parsed.replace(tzinfo=zone).astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed, False
+
+
+def _parse_duration(value):
+    match = _DURATION_RE.match(value.strip())
+    if not match:
+        return None
+    parts = {key: int(val) for key, val in match.groupdict().items() if val and key != 'sign'}
+    duration = timedelta(
+        weeks=parts.get('weeks', 0), days=parts.get('days', 0), hours=parts.get('hours', 0),
+        minutes=parts.get('minutes', 0), seconds=parts.get('seconds', 0)
+    )
+    return -duration if match.group('sign') == '-' else duration
+
+
+def _parse_rrule(value):
+    rule = {}
+    for part in value.split(';'):
+        if not part.strip():
+            continue
+        key, _, val = part.strip().partition('=')
+        rule[key.upper()] = val
+    return rule
+
+
+def _parse_recurrence(rule, start_time, local_date):
+    """RRULE -> (repeat, repeat_until)
+
+    내부 모델은 시작 시각에서 하루/한 주/한 달 간격으로만 반복하므로
+    INTERVAL>1, 시작일과 다른 BYDAY/BYMONTHDAY 등은 UnsupportedEvent로 거부한다.
+    local_date는 TZID 기준 시작 날짜(요일/일자 비교용)다.
+    """
+    freq = rule.get('FREQ', '').upper()
+    repeat = FREQ_TO_REPEAT.get(freq)
+    if repeat is None:
+        raise UnsupportedEvent(f'지원하지 않는 반복 주기입니다: {freq or "(없음)"}')
+    unknown = sorted(set(rule) - RRULE_KEYS)
+    if unknown:
+        raise UnsupportedEvent(f'지원하지 않는 반복 규칙입니다: {", ".join(unknown)}')
+    try:
+        interval = int(rule.get('INTERVAL') or 1)
+        count = int(rule['COUNT']) if rule.get('COUNT') else None
+    except ValueError:
+        raise UnsupportedEvent('잘못된 반복 규칙입니다.')
+    if interval != 1:
+        raise UnsupportedEvent(f'반복 간격(INTERVAL={interval})은 지원하지 않습니다.')
+    if rule.get('BYDAY') and (repeat != 'weekly' or rule['BYDAY'].upper() != ICS_WEEKDAYS[local_date.weekday()]):
+        raise UnsupportedEvent(f'시작일과 다른 요일 반복(BYDAY={rule["BYDAY"]})은 지원하지 않습니다.')
+    if rule.get('BYMONTHDAY') and (repeat != 'monthly' or rule['BYMONTHDAY'] != str(local_date.day)):
+        raise UnsupportedEvent(f'시작일과 다른 날짜 반복(BYMONTHDAY={rule["BYMONTHDAY"]})은 지원하지 않습니다.')
+
+    repeat_until = None
+    if rule.get('UNTIL'):
+        repeat_until, _ = _parse_ics_datetime({}, rule['UNTIL'])
+    if count is not None:
+        if count < 1:
+            raise UnsupportedEvent('잘못된 반복 횟수입니다.')
+        # COUNT번째 발생의 시작 시각까지 (repeat_until은 마지막 발생을 포함)
+        last = occurrence_at(start_time, repeat, count - 1)
+        repeat_until = min(repeat_until, last) if repeat_until else last
+    return repeat, repeat_until
+
+
+def vevent_to_mapping(vevent, user_id):
+    """파싱된 VEVENT를 Event 컬럼 딕셔너리로 변환 (필수값이 없으면 ValueError)"""
+    if 'DTSTART' not in vevent:
+        raise ValueError('DTSTART가 없습니다.')
+    if 'RECURRENCE-ID' in vevent:
+        # 반복 중 한 번만 바뀐 발생 - 내부 모델에는 발생별 예외가 없다
+        raise UnsupportedEvent('반복 이벤트의 개별 발생 변경(RECURRENCE-ID)은 지원하지 않습니다.')
+
+    start_time, all_day = _parse_ics_datetime(*vevent['DTSTART'])
+    end_time = None
+    if 'DTEND' in vevent:
+        end_time, _ = _parse_ics_datetime(*vevent['DTEND'])
+    elif 'DURATION' in vevent:
+        duration = _parse_duration(vevent['DURATION'][1])
+        if duration is not None:
+            end_time = start_time + duration
+
+    repeat = None
+    repeat_until = None
+    repeat_group_id = None
+    if 'RRULE' in vevent:
+        local_date = datetime.strptime(vevent['DTSTART'][1].strip()[:8], '%Y%m%d').date()
+        repeat, repeat_until = _parse_recurrence(_parse_rrule(vevent['RRULE'][1]), start_time, local_date)
+        repeat_group_id = str(uuid.uuid4())
+
+    notification_minutes = 15
+    if 'ALARM_TRIGGER' in vevent:
+        duration = _parse_duration(vevent['ALARM_TRIGGER'][1])
+        if duration is not None and duration <= timedelta(0):
+            notification_minutes = int(-duration.total_seconds() // 60)
+
+    priority = 'normal'
+    if 'PRIORITY' in vevent:
+        try:
+            level = int(vevent['PRIORITY'][1])
+        except ValueError:
+            level = 0
+        if 1 <= level <= 2:
+            priority = 'urgent'
+        elif 3 <= level <= 4:
+            priority = 'high'
+        elif level >= 6:
+            priority = 'low'
+
+    title = _unescape_text(vevent.get('SUMMARY', ({}, ''))[1]) or '(제목 없음)'
+    description = _unescape_text(vevent['DESCRIPTION'][1]) if 'DESCRIPTION' in vevent else None
+    location = _unescape_text(vevent['LOCATION'][1]) if 'LOCATION' in vevent else None
+    category = 'general'
+    if 'CATEGORIES' in vevent:
+        category = _unescape_text(vevent['CATEGORIES'][1].split(',')[0]).strip()[:50] or 'general'
+    color = vevent.get('X-INTEGRATION-COLOR', ({}, '#3788d8'))[1][:7]
+
+    uid = vevent['UID'][1].strip()[:255] if 'UID' in vevent else None
+
+    now = datetime.utcnow()
+    return {
+        'ical_uid': uid or None,
+        'title': title[:100],
+        'description': description,
+        'start_time': start_time,
+        'end_time': end_time,
+        'repeat': repeat,
+        'category': category,
+        'location': location[:200] if location else None,
+        'is_all_day': all_day,
+        'user_id': user_id,
+        'created_at': now,
+        'updated_at': now,
+        'repeat_group_id': repeat_group_id,
+        'is_repeat_master': bool(repeat_group_id),
+        'repeat_until': repeat_until,
+        'notification_minutes': notification_minutes,
+        'fire_at': compute_fire_at(start_time, repeat, repeat_until, notification_minutes, now=now),
+        'is_shared': False,
+        'color': color,
+        'priority': priority
+    }
@@ -0,0 +1,74 @@
+"""
+캘린더 이벤트 변경 알림
+이벤트를 쓰는 라우트는 커밋 전에 touch()로 영향을 받는 사용자의 캘린더 버전(user.calendar_version)을 올리고,
+커밋 후 dispatch()를 호출한다. 알림 스케줄러 같은 메모리 구조들은 on_events_changed로 변경을 구독한다.
+
+메모리 구조는 워커마다 따로 있으므로 dispatch는 같은 프로세스에만 전달된다. 다른 워커에서 일어난 변경은
+캐시가 읽을 때 calendar_version(user_id)를 비교해 알아낸다 (통계 롤업, 충돌 인덱스).
+"""
+
+from app.models import Event, EventShare, User, db
+
+# 스냅샷에 담는 Event 컬럼
+SNAPSHOT_FIELDS = (
+    'id', 'user_id', 'title', 'start_time', 'end_time', 'repeat', 'repeat_until',
+    'category', 'location', 'priority', 'is_all_day', 'notification_minutes', 'fire_at'
+)
+
+_listeners = []
+
+
+def snapshot(row):
+    """Event 모델(또는 같은 이름의 컬럼을 가진 행/딕셔너리)의 스냅샷"""
+    if isinstance(row, dict):
+        return {field: row.get(field) for field in SNAPSHOT_FIELDS}
+    return {field: getattr(row, field, None) for field in SNAPSHOT_FIELDS}
+
+
+def on_events_changed(func):
+    """변경 리스너 등록 데코레이터
+
+    리스너는 func(changes, reset_users, versions) 형태로 호출된다.
+    changes는 (before, after) 스냅샷 쌍의 리스트로, 생성 시 before가,
+    삭제 시 after가 None이다. reset_users는 개별 변경을 알 수 없어
+    (예: 대량 가져오기) 사용자 단위로 다시 읽어야 하는 user_id 집합이다.
+    versions는 이 변경으로 올린 {user_id: calendar_version}이다 (touch의 반환값).
+    """
+    _listeners.append(func)
+    return func
+
+
+def touch(user_ids=(), event_ids=()):
+    """커밋 전, 변경의 영향을 받는 사용자의 캘린더 버전을 올린다 - {user_id: 새 버전}
+
+    event_ids는 소유자와 공유받은 사용자까지 포함하므로 이벤트/공유를 지우기 전에 호출한다.
+    """
+    users = set(user_ids)
+    event_ids = list(event_ids)
+    if event_ids:
+        users.update(db.session.execute(db.select(Event.user_id).where(Event.id.in_(event_ids))).scalars())
+        users.update(db.session.execute(
+            db.select(EventShare.shared_with_user_id).where(EventShare.event_id.in_(event_ids))
+        ).scalars())
+    if not users:
+        return {}
+    db.session.execute(
+        User.__table__.update().where(User.id.in_(users)).values(calendar_version=User.calendar_version + 1)
+    )
+    return dict(db.session.execute(db.select(User.id, User.calendar_version).where(User.id.in_(users))).all())
+
+
+def calendar_version(user_id):
+    return db.session.execute(db.select(User.calendar_version).where(User.id == user_id)).scalar() or 0
+
+
+def dispatch(changes=(), reset_users=(), versions=None):
+    changes = list(changes)
+    reset_users = set(reset_users)
+    if not changes and not reset_users:
+        return
+    for listener in _listeners:
+        try:
+            listener(changes, reset_users, versions or {})
+        except Exception as e:
+            print(f'이벤트 변경 리스너 오류 ({listener.__name__}): {e}')
@@ -0,0 +1,202 @@
+"""
+이벤트 알림 스케줄러
+다가오는 알림 시각(fire_at)을 최소 힙으로 관리하고, 시각이 되면
+기존 Socket.IO 연결(user_<id> 룸)로 알림을 푸시한다.
+재시작 시에는 인덱스가 걸린 Event.fire_at 컬럼에서 힙을 다시 만든다.
+"""
+
+import heapq
+import threading
+from datetime import datetime, timedelta
+
+from app import socketio
+from app.models import Event, EventShare, db
+from app.calendar.listeners import on_events_changed
+from app.calendar.recurrence import compute_fire_at, iter_occurrences, next_occurrence, to_naive_utc
+
+
+# 발생 시작 후 이 시간이 지난 알림은 보내지 않는다 (서버 중단 등으로 밀린 알림)
+REMINDER_GRACE = timedelta(minutes=1)
+
+
+def user_room(user_id):
+    """사용자 개인 알림용 Socket.IO 룸 이름"""
+    return f'user_{user_id}'
+
+
+class NotificationScheduler:
+    """fire_at 기준 최소 힙 기반 알림 스케줄러
+
+    힙에는 horizon 이내의 알림만 올려 메모리를 제한하고,
+    refill_interval마다 DB에서 다음 구간을 다시 읽는다.
+    변경/삭제된 항목은 힙에서 바로 빼지 않고 _scheduled와 비교해 무시한다.
+    """
+
+    def __init__(self, horizon=timedelta(hours=6), refill_interval=timedelta(minutes=30),
+                 max_sleep=1.0):
+        self.horizon = horizon
+        self.refill_interval = refill_interval
+        self.max_sleep = max_sleep
+        self._heap = []          # (fire_at, event_id)
+        self._scheduled = {}     # event_id -> fire_at (유효한 항목)
+        self._loaded_until = None
+        self._next_refill = None
+        self._lock = threading.Lock()
+        self._app = None
+        self._started = False
+
+    def start(self, app):
+        """백그라운드 작업 시작 (여러 번 호출해도 한 번만 실행)"""
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+            self._app = app
+        socketio.start_background_task(self._run)
+
+    def schedule(self, event_id, fire_at):
+        with self._lock:
+            if fire_at is None:
+                self._scheduled.pop(event_id, None)
+                return
+            fire_at = to_naive_utc(fire_at)
+            # 아직 읽어오지 않은 구간은 다음 refill 때 DB에서 가져온다
+            if self._loaded_until is not None and fire_at > self._loaded_until:
+                self._scheduled.pop(event_id, None)
+                return
+            self._scheduled[event_id] = fire_at
+            heapq.heappush(self._heap, (fire_at, event_id))
+
+    def unschedule(self, event_id):
+        with self._lock:
+            self._scheduled.pop(event_id, None)
+
+    def request_refill(self):
+        """대량 변경 후 다음 루프에서 DB로부터 힙을 다시 만들도록 요청"""
+        with self._lock:
+            self._next_refill = None
+
+    def _refill(self, now):
+        loaded_until = now + self.horizon
+        rows = db.session.query(Event.id, Event.fire_at).filter(
+            Event.fire_at.isnot(None),
+            Event.fire_at <= loaded_until
+        ).all()
+        db.session.rollback()
+
+        with self._lock:
+            self._heap = [(row.fire_at, row.id) for row in rows]
+            heapq.heapify(self._heap)
+            self._scheduled = {row.id: row.fire_at for row in rows}
+            self._loaded_until = loaded_until
+            self._next_refill = now + self.refill_interval
+
+    def _pop_due(self, now):
+        due = []
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now:
+                fire_at, event_id = heapq.heappop(self._heap)
+                if self._scheduled.get(event_id) == fire_at:
+                    del self._scheduled[event_id]
+                    due.append((event_id, fire_at))
+            next_fire = self._heap[0][0] if self._heap else None
+        return due, next_fire
+
+    def _fire(self, due, now):
+        expected = dict(due)
+        events = Event.query.filter(Event.id.in_(list(expected))).all()
+        if not events:
+            db.session.rollback()
+            return
+
+        shares = db.session.query(EventShare.event_id, EventShare.shared_with_user_id).filter(
+            EventShare.event_id.in_([event.id for event in events])
+        ).all()
+        recipients = {}
+        for share in shares:
+            recipients.setdefault(share.event_id, []).append(share.shared_with_user_id)
+
+        for event in events:
+            fire_at = expected[event.id]
+            start_time = to_naive_utc(event.start_time)
+            repeat_until = to_naive_utc(event.repeat_until)
+            lead = timedelta(minutes=event.notification_minutes or 0)
+            # [fire_at, fire_at + 알림 분] 구간에서 가장 늦게 시작하는 발생이 이번 알림의 대상
+            # (알림 분이 반복 주기보다 길면 구간에 여러 발생이 들어온다)
+            occurrence = None
+            for occurrence in iter_occurrences(start_time, event.repeat, repeat_until,
+                                               window_start=fire_at, window_end=fire_at + lead):
+                pass
+            if occurrence is None:
+                occurrence = next_occurrence(start_time, event.repeat, repeat_until, after=fire_at)
+            if occurrence is None or occurrence < now - REMINDER_GRACE:
+                # 이미 시작한 발생(다운타임 동안 밀린 알림)은 보내지 않고 지금 이후의 발생으로 넘긴다
+                occurrence = None
+                next_fire_at = compute_fire_at(event.start_time, event.repeat, event.repeat_until,
+                                               event.notification_minutes, now=now)
+            else:
+                # 알림 시각이 이미 지난 발생은 건너뛰고, 알림 시각이 미래인 첫 발생으로 넘어간다
+                next_fire_at = compute_fire_at(
+                    event.start_time, event.repeat, event.repeat_until, event.notification_minutes,
+                    now=now, after=max(occurrence, now + lead) + timedelta(microseconds=1)
+                )
+
+            # 여러 워커가 같은 알림을 보내지 않도록 조건부 갱신으로 선점
+            claimed = Event.query.filter(
+                Event.id == event.id,
+                Event.fire_at == fire_at
+            ).update({'fire_at': next_fire_at}, synchronize_session=False)
+            db.session.commit()
+            if not claimed:
+                continue
+
+            if occurrence is not None:
+                # REMINDER_GRACE 안에서 막 시작한 발생만 0 (곧 시작)
+                minutes_until = max(0, int((occurrence - now).total_seconds() // 60))
+                payload = {
+                    'event_id': event.id,
+                    'title': event.title,
+                    'start_time': occurrence.isoformat(),
+                    'location': event.location,
+                    'category': event.category,
+                    'priority': event.priority,
+                    'minutes_until': minutes_until
+                }
+                for user_id in [event.user_id] + recipients.get(event.id, []):
+                    socketio.emit('event_reminder', payload, room=user_room(user_id))
+
+            self.schedule(event.id, next_fire_at)
+
+    def _run(self):
+        with self._app.app_context():
+            while True:
+                now = datetime.utcnow()
+                try:
+                    if self._next_refill is None or now >= self._next_refill:
+                        self._refill(now)
+                    due, next_fire = self._pop_due(now)
+                    if due:
+                        self._fire(due, now)
+                except Exception as e:
+                    db.session.rollback()
+                    print(f'알림 스케줄러 오류: {e}')
+                    due, next_fire = [], None
+
+                delay = self.max_sleep
+                if next_fire is not None:
+                    delay = min(delay, max(0.0, (next_fire - datetime.utcnow()).total_seconds()))
+                socketio.sleep(delay)
+
+
+notification_scheduler = NotificationScheduler()
+
+
+@on_events_changed
+def _reschedule(changes, reset_users, versions):
+    for before, after in changes:
+        if after is None:
+            notification_scheduler.unschedule(before['id'])
+        else:
+            notification_scheduler.schedule(after['id'], after['fire_at'])
+    if reset_users:
+        notification_scheduler.request_refill()
@@ -0,0 +1,112 @@
+"""
+반복 이벤트 전개 유틸리티
+반복 이벤트는 마스터 한 건만 저장하고, 필요한 구간에서만 발생 시각을 계산한다.
+"""
+
+import calendar
+from datetime import datetime, timedelta, timezone
+
+REPEAT_RULES = ('daily', 'weekly', 'monthly')
+
+# 종료일이 없는 반복 이벤트를 전개할 기본 범위 (create_recurring_events와 동일)
+DEFAULT_REPEAT_SPAN = timedelta(days=180)
+
+# 한 번의 전개에서 생성할 최대 발생 수
+MAX_OCCURRENCES = 1000
+
+
+def to_naive_utc(value):
+    """timezone 정보가 있는 datetime을 UTC naive datetime으로 변환"""
+    if value is not None and value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def is_recurring(repeat):
+    return repeat in REPEAT_RULES
+
+
+def _add_months(value, months):
+    month_index = value.month - 1 + months
+    year = value.year + month_index // 12
+    month = month_index % 12 + 1
+    # 31일 같은 날짜는 해당 월의 마지막 날로 맞춤
+    day = min(value.day, calendar.monthrange(year, month)[1])
+    return value.replace(year=year, month=month, day=day)
+
+
+def occurrence_at(start_time, repeat, index):
+    """index번째 발생 시작 시각 (0번째는 원래 시작 시각)"""
+    if repeat == 'daily':
+        return start_time + timedelta(days=index)
+    if repeat == 'weekly':
+        return start_time + timedelta(weeks=index)
+    if repeat == 'monthly':
+        return _add_months(start_time, index)
+    return start_time
+
+
+def _first_index_near(start_time, repeat, moment):
+    """moment 직전 발생의 인덱스 추정값 (앞부분을 건너뛰기 위함)"""
+    if moment <= start_time:
+        return 0
+    if repeat == 'daily':
+        return (moment - start_time).days
+    if repeat == 'weekly':
+        return (moment - start_time).days // 7
+    if repeat == 'monthly':
+        return max(0, (moment.year - start_time.year) * 12 + moment.month - start_time.month - 1)
+    return 0
+
+
+def iter_occurrences(start_time, repeat, repeat_until=None, window_start=None, window_end=None,
+                     limit=MAX_OCCURRENCES):
+    """[window_start, window_end] 구간에 시작하는 발생 시각들을 순서대로 생성
+
+    반복이 아닌 이벤트는 시작 시각이 구간 안에 있을 때 한 번만 생성한다.
+    """
+    if not is_recurring(repeat):
+        if (window_start is None or start_time >= window_start) and \
+                (window_end is None or start_time <= window_end):
+            yield start_time
+        return
+
+    until = repeat_until or (start_time + DEFAULT_REPEAT_SPAN)
+    if window_end is not None:
+        until = min(until, window_end)
+
+    index = _first_index_near(start_time, repeat, window_start) if window_start else 0
+    produced = 0
+    while produced < limit:
+        occurrence = occurrence_at(start_time, repeat, index)
+        if occurrence > until:
+            break
+        index += 1
+        if window_start is not None and occurrence < window_start:
+            continue
+        produced += 1
+        yield occurrence
+
+
+def next_occurrence(start_time, repeat, repeat_until=None, after=None):
+    """after 이후(포함) 처음 시작하는 발생 시각, 없으면 None"""
+    return next(iter_occurrences(start_time, repeat, repeat_until, window_start=after, limit=1), None)
+
+
+def compute_fire_at(start_time, repeat, repeat_until, notification_minutes, now=None, after=None):
+    """다음 알림 발송 시각 계산
+
+    after가 주어지면 그 시각 이후에 시작하는 발생부터 찾는다.
+    이미 알림 시각이 지났지만 아직 시작 전인 발생은 즉시(now) 발송한다.
+    """
+    if notification_minutes is None or start_time is None:
+        return None
+
+    now = now or datetime.utcnow()
+    start_time = to_naive_utc(start_time)
+    repeat_until = to_naive_utc(repeat_until)
+
+    occurrence = next_occurrence(start_time, repeat, repeat_until, after=max(now, after) if after else now)
+    if occurrence is None:
+        return None
+    return max(occurrence - timedelta(minutes=notification_minutes), now)
@@ -1,12 +1,92 @@
-from flask import Blueprint, request, jsonify, render_template
+from flask import Blueprint, Response, request, jsonify, render_template, stream_with_context
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from datetime import datetime, timedelta, date
 from app.models import Event, User, EventShare, db
+from app.calendar.ical import LineTooLong, UnsupportedEvent, iter_ics, iter_vevents, own_event_id, vevent_to_mapping
+from app.calendar.listeners import SNAPSHOT_FIELDS, dispatch, snapshot, touch
+from app.calendar.notifications import notification_scheduler  # 변경 리스너 등록
+from app.calendar.recurrence import compute_fire_at, next_occurrence, to_naive_utc
+from app.calendar.stats import stats_cache
+from app.calendar.conflicts import conflict_detector
+from app.routing import read_replica
+from app.conditional import conditional
+from app.serialization import STREAM_CHUNK_SIZE, compile_serializer, list_response
 import calendar
 import uuid
 
 calendar_bp = Blueprint('calendar', __name__)
 
+# 이벤트 목록 응답의 컬럼 순서
+EVENT_FIELDS = (
+    ('id', 'raw'), ('title', 'raw'), ('description', 'raw'), ('start_time', 'datetime'),
+    ('end_time', 'datetime'), ('repeat', 'raw'), ('category', 'raw'), ('location', 'raw'),
+    ('is_all_day', 'raw'), ('created_at', 'datetime'), ('updated_at', 'datetime'),
+    ('repeat_group_id', 'raw'), ('is_repeat_master', 'raw'), ('repeat_until', 'datetime'),
+    ('notification_minutes', 'raw'), ('color', 'raw'), ('priority', 'raw'),
+)
+EVENT_COLUMNS = tuple(getattr(Event, key) for key, _ in EVENT_FIELDS)
+serialize_event = compile_serializer(
+    EVENT_FIELDS + (('is_shared_with_me', 'bool'), ('share_permission', 'raw'), ('owner_username', 'raw')),
+    name='serialize_event'
+)
+
+# 배치 API 한 번에 처리 가능한 최대 작업 수
+BATCH_MAX_OPERATIONS = 10000
+# IN (...) 절에 한 번에 넣을 id 수 (SQLite 변수 개수 제한 대비)
+BATCH_CHUNK_SIZE = 500
+# iCalendar 내보내기 시 서버 측 커서에서 한 번에 읽을 행 수
+ICS_EXPORT_CHUNK_SIZE = 500
+# iCalendar 가져오기 시 한 트랜잭션에 저장할 이벤트 수
+ICS_IMPORT_BATCH_SIZE = 1000
+# 가져오기 응답에 담는 지원하지 않는 이벤트 목록의 최대 길이
+ICS_IMPORT_MAX_REPORTED = 50
+
+def _parse_datetime(value):
+    """ISO 8601 문자열을 datetime 객체로 변환"""
+    return datetime.fromisoformat(value.replace('Z', '+00:00'))
+
+def _chunks(items, size=BATCH_CHUNK_SIZE):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+def _build_event_mapping(data, user_id):
+    """요청 데이터로부터 Event 컬럼 딕셔너리 생성"""
+    start_time = _parse_datetime(data['start_time'])
+    end_time = _parse_datetime(data['end_time']) if data.get('end_time') else None
+    repeat_until = _parse_datetime(data['repeat_until']) if data.get('repeat_until') else None
+
+    # 반복 이벤트인 경우 그룹 ID 생성
+    repeat_group_id = None
+    if data.get('repeat') and data.get('repeat') != 'none':
+        repeat_group_id = str(uuid.uuid4())
+
+    repeat = data.get('repeat')
+    notification_minutes = data.get('notification_minutes', 15)
+
+    return {
+        'title': data['title'],
+        'description': data.get('description'),
+        'start_time': start_time,
+        'end_time': end_time,
+        'repeat': repeat,
+        'category': data.get('category', 'general'),
+        'location': data.get('location'),
+        'is_all_day': data.get('is_all_day', False),
+        'user_id': user_id,
+        'repeat_group_id': repeat_group_id,
+        'is_repeat_master': bool(repeat_group_id),
+        'repeat_until': repeat_until,
+        'notification_minutes': notification_minutes,
+        'fire_at': compute_fire_at(start_time, repeat, repeat_until, notification_minutes),
+        'color': data.get('color', '#3788d8'),
+        'priority': data.get('priority', 'normal')
+    }
+
+def _refresh_fire_at(event):
+    """이벤트 시간이 바뀐 뒤 다음 알림 시각을 다시 계산"""
+    event.fire_at = compute_fire_at(event.start_time, event.repeat, event.repeat_until,
+                                    event.notification_minutes)
+
 @calendar_bp.route('/calendar')
 @jwt_required()
 def calendar_view():
@@ -19,56 +99,50 @@ def create_event():
     user_id = int(get_jwt_identity())
     
     try:
-        # 날짜 문자열을 datetime 객체로 변환
-        start_time = datetime.fromisoformat(data['start_time'].replace('Z', '+00:00'))
-        end_time = None
-        if data.get('end_time'):
-            end_time = datetime.fromisoformat(data['end_time'].replace('Z', '+00:00'))
-        
-        repeat_until = None
-        if data.get('repeat_until'):
-            repeat_until = datetime.fromisoformat(data['repeat_until'].replace('Z', '+00:00'))
-        
-        # 반복 이벤트인 경우 그룹 ID 생성
-        repeat_group_id = None
-        if data.get('repeat') and data.get('repeat') != 'none':
-            repeat_group_id = str(uuid.uuid4())
-        
-        event = Event(
-            title=data['title'],
-            description=data.get('description'),
-            start_time=start_time,
-            end_time=end_time,
-            repeat=data.get('repeat'),
-            category=data.get('category', 'general'),
-            location=data.get('location'),
-            is_all_day=data.get('is_all_day', False),
-            user_id=user_id,
-            repeat_group_id=repeat_group_id,
-            is_repeat_master=bool(repeat_group_id),
-            repeat_until=repeat_until,
-            notification_minutes=data.get('notification_minutes', 15),
-            color=data.get('color', '#3788d8'),
-            priority=data.get('priority', 'normal')
-        )
+        event = Event(**_build_event_mapping(data, user_id))
         db.session.add(event)
         db.session.flush()  # event.id를 얻기 위해
+        versions = touch(user_ids=[user_id])
         
         db.session.commit()
+        after = snapshot(event)
+        dispatch([(None, after)], versions=versions)
         
         return jsonify({
             'message': '이벤트가 생성되었습니다.', 
             'event_id': event.id,
             'events_created': 1,  # 마스터 이벤트만 생성
-            'repeat_group_id': repeat_group_id,
-            'is_recurring': bool(repeat_group_id)
+            'repeat_group_id': event.repeat_group_id,
+            'is_recurring': bool(event.repeat_group_id),
+            'conflicts': conflict_detector.find_conflicts(user_id, after)
         }), 201
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': '이벤트 생성에 실패했습니다.'}), 400
 
+def _events_validator():
+    """이벤트 목록 ETag 검증 값 - 보이는 이벤트와 받은 공유의 개수/최대 id/수정 시각
+
+    쿼리 문자열의 필터는 ETag에 따로 들어가므로 여기서는 필터 없이 전체를 본다.
+    """
+    user_id = int(get_jwt_identity())
+    shared_event_ids = db.select(EventShare.event_id).where(EventShare.shared_with_user_id == user_id)
+    events = db.session.execute(
+        db.select(db.func.count(Event.id), db.func.max(Event.id), db.func.max(Event.updated_at))
+        .where(db.or_(Event.user_id == user_id, Event.id.in_(shared_event_ids)))
+    ).one()
+    shares = db.session.execute(
+        db.select(db.func.count(EventShare.id), db.func.max(EventShare.id), db.func.max(EventShare.shared_at),
+                  db.func.sum(db.case((EventShare.permission == 'edit', 1), else_=0)))
+        .where(EventShare.shared_with_user_id == user_id)
+    ).one()
+    last_modified = max((value for value in (events[2], shares[2]) if value is not None), default=None)
+    return (user_id, tuple(events), tuple(shares)), last_modified
+
 @calendar_bp.route('/api/calendar/events', methods=['GET'])
 @jwt_required()
+@read_replica
+@conditional(_events_validator)
 def get_events():
     user_id = int(get_jwt_identity())
     
@@ -78,68 +152,45 @@ def get_events():
     category = request.args.get('category')
     include_shared = request.args.get('include_shared', 'true').lower() == 'true'
     
-    # 본인 이벤트 쿼리
-    query = Event.query.filter_by(user_id=user_id)
+    # 컬럼 튜플로 조회 - 공유 권한과 소유자 이름도 같은 쿼리에서 가져온다
+    is_shared_with_me = Event.user_id != user_id
+    query = (db.select(
+                *EVENT_COLUMNS,
+                is_shared_with_me,
+                db.case((is_shared_with_me, db.func.coalesce(EventShare.permission, 'view')), else_=None),
+                db.case((is_shared_with_me, User.username), else_=None))
+             .outerjoin(EventShare, db.and_(EventShare.event_id == Event.id,
+                                            EventShare.shared_with_user_id == user_id))
+             .outerjoin(User, User.id == Event.user_id))
     
     # 공유된 이벤트도 포함하는 경우
     if include_shared:
-        shared_event_ids = db.session.query(EventShare.event_id).filter_by(shared_with_user_id=user_id).subquery()
-        query = Event.query.filter(
+        shared_event_ids = db.select(EventShare.event_id).where(EventShare.shared_with_user_id == user_id)
+        query = query.where(
             db.or_(
                 Event.user_id == user_id,
                 Event.id.in_(shared_event_ids)
             )
         )
+    else:
+        query = query.where(Event.user_id == user_id)
     
     # 날짜 범위 필터링
     if start_date:
         start_dt = datetime.fromisoformat(start_date.replace('Z', '+00:00'))
-        query = query.filter(Event.start_time >= start_dt)
+        query = query.where(Event.start_time >= start_dt)
     
     if end_date:
         end_dt = datetime.fromisoformat(end_date.replace('Z', '+00:00'))
-        query = query.filter(Event.start_time <= end_dt)
+        query = query.where(Event.start_time <= end_dt)
     
     # 카테고리 필터링
     if category and category != 'all':
-        query = query.filter(Event.category == category)
-    
-    events = query.order_by(Event.start_time).all()
-    
-    event_list = []
-    for event in events:
-        # 공유된 이벤트인지 확인
-        is_shared_with_me = event.user_id != user_id
-        share_permission = None
-        if is_shared_with_me:
-            share = EventShare.query.filter_by(event_id=event.id, shared_with_user_id=user_id).first()
-            share_permission = share.permission if share else 'view'
-        
-        event_data = {
-            'id': event.id,
-            'title': event.title,
-            'description': event.description,
-            'start_time': event.start_time.isoformat(),
-            'end_time': event.end_time.isoformat() if event.end_time else None,
-            'repeat': event.repeat,
-            'category': event.category,
-            'location': event.location,
-            'is_all_day': event.is_all_day,
-            'created_at': event.created_at.isoformat(),
-            'updated_at': event.updated_at.isoformat(),
-            'repeat_group_id': event.repeat_group_id,
-            'is_repeat_master': event.is_repeat_master,
-            'repeat_until': event.repeat_until.isoformat() if event.repeat_until else None,
-            'notification_minutes': event.notification_minutes,
-            'color': event.color,
-            'priority': event.priority,
-            'is_shared_with_me': is_shared_with_me,
-            'share_permission': share_permission,
-            'owner_username': User.query.get(event.user_id).username if is_shared_with_me else None
-        }
-        event_list.append(event_data)
-    
-    return jsonify(event_list)
+        query = query.where(Event.category == category)
+    
+    rows = db.session.execute(query.order_by(Event.start_time)
+                              .execution_options(yield_per=STREAM_CHUNK_SIZE))
+    return list_response(rows, serialize_event)
 
 @calendar_bp.route('/api/calendar/events/<int:event_id>', methods=['PUT'])
 @jwt_required()
@@ -151,6 +202,7 @@ def update_event(event_id):
         return jsonify({'error': '이벤트를 찾을 수 없습니다.'}), 404
     
     data = request.get_json()
+    before = snapshot(event)
     
     try:
         event.title = data['title']
@@ -165,9 +217,16 @@ def update_event(event_id):
         event.location = data.get('location')
         event.is_all_day = data.get('is_all_day', False)
         event.updated_at = datetime.utcnow()
+        _refresh_fire_at(event)
+        versions = touch(event_ids=[event.id])
         
         db.session.commit()
-        return jsonify({'message': '이벤트가 수정되었습니다.'})
+        after = snapshot(event)
+        dispatch([(before, after)], versions=versions)
+        return jsonify({
+            'message': '이벤트가 수정되었습니다.',
+            'conflicts': conflict_detector.find_conflicts(user_id, after)
+        })
     except Exception as e:
         return jsonify({'error': '이벤트 수정에 실패했습니다.'}), 400
 
@@ -180,8 +239,11 @@ def delete_event(event_id):
     if not event:
         return jsonify({'error': '이벤트를 찾을 수 없습니다.'}), 404
     
+    before = snapshot(event)
+    versions = touch(event_ids=[event.id])  # 공유받은 사용자를 찾을 수 있도록 삭제 전에
     db.session.delete(event)
     db.session.commit()
+    dispatch([(before, None)], versions=versions)
     return jsonify({'message': '이벤트가 삭제되었습니다.'})
 
 @calendar_bp.route('/api/calendar/events/<int:event_id>/move', methods=['PUT'])
@@ -210,6 +272,7 @@ def move_event(event_id):
     if not can_edit:
         return jsonify({'error': '이벤트 수정 권한이 없습니다.'}), 403
     
+    before = snapshot(event)
     try:
         # 시간 변경
         old_start = event.start_time
@@ -227,8 +290,12 @@ def move_event(event_id):
         event.start_time = new_start
         event.end_time = new_end
         event.updated_at = datetime.utcnow()
+        _refresh_fire_at(event)
+        versions = touch(event_ids=[event.id])
         
         db.session.commit()
+        after = snapshot(event)
+        dispatch([(before, after)], versions=versions)
         
         return jsonify({
             'message': '이벤트 시간이 변경되었습니다.',
@@ -236,13 +303,337 @@ def move_event(event_id):
                 'id': event.id,
                 'start_time': event.start_time.isoformat(),
                 'end_time': event.end_time.isoformat() if event.end_time else None
-            }
+            },
+            'conflicts': conflict_detector.find_conflicts(user_id, after)
         })
         
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': '이벤트 시간 변경에 실패했습니다.'}), 500
 
+@calendar_bp.route('/api/calendar/events/batch', methods=['POST'])
+@jwt_required()
+def batch_events():
+    """여러 이벤트 생성/수정/이동/삭제를 하나의 트랜잭션으로 처리
+
+    요청 형식:
+        {"operations": [{"op": "create", "data": {...}},
+                        {"op": "update", "event_id": 1, "data": {...}},
+                        {"op": "move", "event_id": 2, "new_start_time": "...", "new_end_time": "..."},
+                        {"op": "delete", "event_id": 3}],
+         "atomic": false}
+
+    atomic이 true이면 하나라도 실패할 경우 아무것도 반영하지 않는다.
+    """
+    user_id = int(get_jwt_identity())
+    data = request.get_json() or {}
+    operations = data.get('operations')
+    atomic = bool(data.get('atomic', False))
+
+    if not isinstance(operations, list) or not operations:
+        return jsonify({'error': '작업 목록이 필요합니다.'}), 400
+    if len(operations) > BATCH_MAX_OPERATIONS:
+        return jsonify({'error': f'한 번에 최대 {BATCH_MAX_OPERATIONS}개의 작업만 처리할 수 있습니다.'}), 400
+
+    # 1. 대상 이벤트와 권한 정보를 한 번에 조회
+    target_ids = set()
+    for op in operations:
+        if isinstance(op, dict) and op.get('op') in ('update', 'move', 'delete'):
+            if isinstance(op.get('event_id'), int):
+                target_ids.add(op['event_id'])
+
+    snapshot_columns = [getattr(Event, field) for field in SNAPSHOT_FIELDS]
+    current = {}
+    for chunk in _chunks(list(target_ids)):
+        rows = db.session.query(*snapshot_columns).filter(Event.id.in_(chunk)).all()
+        for row in rows:
+            current[row.id] = snapshot(row)
+    originals = {event_id: dict(row) for event_id, row in current.items()}
+
+    editable_shared = set()
+    foreign_ids = [event_id for event_id, row in current.items() if row['user_id'] != user_id]
+    for chunk in _chunks(foreign_ids):
+        rows = db.session.query(EventShare.event_id).filter(
+            EventShare.shared_with_user_id == user_id,
+            EventShare.permission == 'edit',
+            EventShare.event_id.in_(chunk)
+        ).all()
+        editable_shared.update(row.event_id for row in rows)
+
+    # 2. 작업을 순서대로 검증하고 최종 상태를 메모리에서 계산
+    results = []
+    creates = []  # (결과 인덱스, 매핑)
+    updates = {}  # event_id -> 변경 컬럼
+    deletes = set()
+    now = datetime.utcnow()
+
+    for index, op in enumerate(operations):
+        result = {'index': index, 'op': op.get('op') if isinstance(op, dict) else None}
+        results.append(result)
+        try:
+            if not isinstance(op, dict):
+                raise ValueError('잘못된 작업 형식입니다.')
+            kind = op.get('op')
+
+            if kind == 'create':
+                creates.append((result, _build_event_mapping(op.get('data') or {}, user_id)))
+                result['status'] = 'ok'
+                continue
+
+            if kind not in ('update', 'move', 'delete'):
+                raise ValueError('지원하지 않는 작업입니다.')
+
+            event_id = op.get('event_id')
+            result['event_id'] = event_id
+            row = current.get(event_id)
+            if row is None or event_id in deletes:
+                result['status'] = 'error'
+                result['error'] = '이벤트를 찾을 수 없습니다.'
+                continue
+
+            is_owner = row['user_id'] == user_id
+            # 수정/삭제는 소유자만, 이동은 편집 권한이 있는 공유 사용자도 가능
+            if not is_owner and not (kind == 'move' and event_id in editable_shared):
+                result['status'] = 'error'
+                result['error'] = '이벤트 수정 권한이 없습니다.'
+                continue
+
+            if kind == 'update':
+                payload = op.get('data') or {}
+                changes = {
+                    'title': payload['title'],
+                    'description': payload.get('description'),
+                    'start_time': _parse_datetime(payload['start_time']),
+                    'end_time': _parse_datetime(payload['end_time']) if payload.get('end_time') else None,
+                    'repeat': payload.get('repeat'),
+                    'location': payload.get('location'),
+                    'is_all_day': payload.get('is_all_day', False),
+                    'updated_at': now
+                }
+                if 'category' in payload:
+                    changes['category'] = payload['category']
+            elif kind == 'move':
+                if not op.get('new_start_time'):
+                    raise ValueError('새 시작 시간이 필요합니다.')
+                new_start = _parse_datetime(op['new_start_time'])
+                # 종료 시간 계산 (기존 이벤트 길이 유지)
+                if row['end_time'] and op.get('new_end_time'):
+                    new_end = _parse_datetime(op['new_end_time'])
+                elif row['end_time']:
+                    new_end = new_start + (row['end_time'] - row['start_time'])
+                else:
+                    new_end = None
+                changes = {'start_time': new_start, 'end_time': new_end, 'updated_at': now}
+            else:
+                deletes.add(event_id)
+                updates.pop(event_id, None)
+                result['status'] = 'ok'
+                continue
+
+            row.update((key, value) for key, value in changes.items() if key in row)
+            changes['fire_at'] = row['fire_at'] = compute_fire_at(
+                row['start_time'], row['repeat'], row['repeat_until'], row['notification_minutes']
+            )
+            updates.setdefault(event_id, {'id': event_id}).update(changes)
+            result['status'] = 'ok'
+        except (KeyError, ValueError, TypeError, AttributeError) as e:
+            result['status'] = 'error'
+            result['error'] = str(e) if isinstance(e, ValueError) else '잘못된 작업 데이터입니다.'
+
+    failed = sum(1 for result in results if result['status'] != 'ok')
+    if atomic and failed:
+        return jsonify({'error': '일부 작업이 유효하지 않아 반영되지 않았습니다.', 'results': results}), 400
+
+    # 3. 하나의 트랜잭션에서 대량 반영
+    try:
+        if creates:
+            mappings = [mapping for _, mapping in creates]
+            db.session.bulk_insert_mappings(Event, mappings, return_defaults=True)
+            for (result, _), mapping in zip(creates, mappings):
+                result['event_id'] = mapping.get('id')
+
+        if updates:
+            db.session.bulk_update_mappings(Event, list(updates.values()))
+
+        delete_ids = list(deletes)
+        versions = touch(user_ids=[user_id], event_ids=list(updates) + delete_ids)
+        for chunk in _chunks(delete_ids):
+            EventShare.query.filter(EventShare.event_id.in_(chunk)).delete(synchronize_session=False)
+            Event.query.filter(Event.id.in_(chunk)).delete(synchronize_session=False)
+
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': '일괄 작업 처리에 실패했습니다.'}), 500
+
+    changes = [(None, snapshot(mapping)) for _, mapping in creates]
+    changes.extend((originals[event_id], current[event_id]) for event_id in updates)
+    changes.extend((originals[event_id], None) for event_id in deletes)
+    dispatch(changes, versions=versions)
+
+    return jsonify({
+        'message': '일괄 작업이 처리되었습니다.',
+        'results': results,
+        'applied': len(results) - failed,
+        'failed': failed
+    })
+
+@calendar_bp.route('/api/calendar/export.ics', methods=['GET'])
+@jwt_required()
+def export_ics():
+    """캘린더를 iCalendar 형식으로 스트리밍 내보내기"""
+    user_id = int(get_jwt_identity())
+    include_shared = request.args.get('include_shared', 'false').lower() == 'true'
+
+    owner_filter = Event.user_id == user_id
+    if include_shared:
+        shared_event_ids = db.session.query(EventShare.event_id).filter_by(shared_with_user_id=user_id)
+        owner_filter = db.or_(owner_filter, Event.id.in_(shared_event_ids))
+
+    # 반복 이벤트는 마스터만 내보내고 RRULE로 반복을 표현
+    query = db.session.query(
+        Event.id, Event.title, Event.description, Event.start_time, Event.end_time,
+        Event.repeat, Event.repeat_until, Event.category, Event.location, Event.is_all_day,
+        Event.created_at, Event.updated_at, Event.notification_minutes, Event.color, Event.priority,
+        Event.ical_uid
+    ).filter(
+        owner_filter,
+        db.or_(Event.repeat_group_id.is_(None), Event.is_repeat_master == True)
+    ).order_by(Event.id).execution_options(stream_results=True).yield_per(ICS_EXPORT_CHUNK_SIZE)
+
+    return Response(
+        stream_with_context(iter_ics(query)),
+        mimetype='text/calendar',
+        headers={'Content-Disposition': 'attachment; filename="calendar.ics"'}
+    )
+
+def _save_import_batch(user_id, batch):
+    """가져온 이벤트를 UID 기준으로 저장 - (새로 만든 수, 갱신한 이벤트 id 목록)
+
+    이미 가져온 UID나 이 서버가 내보낸 UID(event-<id>@integration)의 본인 이벤트는 새로 만들지 않고 덮어쓴다.
+    같은 배치 안에서 UID가 겹치면 마지막 이벤트를 사용한다.
+    """
+    by_uid = {}
+    inserts = []
+    for mapping in batch:
+        if mapping['ical_uid']:
+            by_uid[mapping['ical_uid']] = mapping
+        else:
+            inserts.append(mapping)
+
+    existing = {}
+    uids = list(by_uid)
+    for chunk in _chunks(uids):
+        own_ids = {own_event_id(uid): uid for uid in chunk if own_event_id(uid) is not None}
+        rows = db.session.execute(
+            db.select(Event.id, Event.ical_uid, Event.repeat_group_id).where(
+                Event.user_id == user_id,
+                db.or_(Event.ical_uid.in_(chunk), Event.id.in_(list(own_ids)))
+            )
+        ).all()
+        for row in rows:
+            uid = row.ical_uid if row.ical_uid in by_uid else own_ids.get(row.id)
+            if uid is not None:
+                existing.setdefault(uid, row)
+
+    updates = []
+    for uid, mapping in by_uid.items():
+        row = existing.get(uid)
+        if row is None:
+            inserts.append(mapping)
+            continue
+        changes = {key: value for key, value in mapping.items()
+                   if key not in ('user_id', 'created_at', 'is_shared', 'ical_uid')}
+        changes['id'] = row.id
+        if changes['repeat_group_id'] and row.repeat_group_id:
+            changes['repeat_group_id'] = row.repeat_group_id
+        updates.append(changes)
+
+    if inserts:
+        db.session.execute(Event.__table__.insert(), inserts)
+    if updates:
+        db.session.bulk_update_mappings(Event, updates)
+    return len(inserts), [changes['id'] for changes in updates]
+
+def _vevent_label(vevent):
+    """보고용 이벤트 식별자 - UID, 없으면 제목"""
+    return (vevent.get('UID') or vevent.get('SUMMARY') or ({}, ''))[1][:200]
+
+@calendar_bp.route('/api/calendar/import', methods=['POST'])
+@jwt_required()
+def import_ics():
+    """iCalendar 파일을 점진적으로 파싱하여 배치 단위로 저장
+
+    multipart 업로드(file 필드) 또는 text/calendar 본문을 받는다.
+    """
+    user_id = int(get_jwt_identity())
+
+    upload = request.files.get('file')
+    stream = upload.stream if upload else request.stream
+
+    imported = 0
+    updated = 0
+    skipped = 0
+    unsupported = []  # (UID 또는 제목, 이유) - 응답에는 앞의 ICS_IMPORT_MAX_REPORTED개만
+    batch = []
+    versions = {}  # 갱신된 공유 이벤트의 수신자도 포함 - 모두 다시 읽도록 reset_users로 보낸다
+
+    def save(batch):
+        nonlocal imported, updated, versions
+        inserted, updated_ids = _save_import_batch(user_id, batch)
+        versions = touch(user_ids=[user_id], event_ids=updated_ids)
+        db.session.commit()
+        imported += inserted
+        updated += len(updated_ids)
+
+    try:
+        for vevent in iter_vevents(stream):
+            try:
+                batch.append(vevent_to_mapping(vevent, user_id))
+            except UnsupportedEvent as e:
+                unsupported.append({'event': _vevent_label(vevent), 'reason': str(e)})
+                continue
+            except (ValueError, KeyError):
+                skipped += 1
+                continue
+
+            if len(batch) >= ICS_IMPORT_BATCH_SIZE:
+                save(batch)
+                batch = []
+
+        if batch:
+            save(batch)
+    except LineTooLong as e:
+        db.session.rollback()
+        dispatch(reset_users={user_id, *versions} if imported or updated else (), versions=versions)
+        return jsonify({
+            'error': f'잘못된 iCalendar 파일입니다: {e}',
+            'imported': imported,
+            'updated': updated,
+            'skipped': skipped
+        }), 400
+    except Exception as e:
+        db.session.rollback()
+        dispatch(reset_users={user_id, *versions} if imported or updated else (), versions=versions)
+        return jsonify({
+            'error': '캘린더 가져오기 중 오류가 발생했습니다.',
+            'imported': imported,
+            'updated': updated,
+            'skipped': skipped,
+            'unsupported_count': len(unsupported),
+            'unsupported': unsupported[:ICS_IMPORT_MAX_REPORTED]
+        }), 500
+
+    dispatch(reset_users={user_id, *versions} if imported or updated else (), versions=versions)
+    return jsonify({
+        'message': f'{imported}개의 이벤트를 가져왔습니다.' + (f' ({updated}개 갱신)' if updated else ''),
+        'imported': imported,
+        'updated': updated,
+        'skipped': skipped,
+        'unsupported_count': len(unsupported),
+        'unsupported': unsupported[:ICS_IMPORT_MAX_REPORTED]
+    }), 201
+
 @calendar_bp.route('/api/calendar/events/<int:event_id>/share', methods=['POST'])
 @jwt_required()
 def share_event(event_id):
@@ -290,7 +681,9 @@ def share_event(event_id):
             
         # 이벤트를 공유됨으로 표시
         event.is_shared = True
+        versions = touch(user_ids=[share_with_user.id])
         db.session.commit()
+        dispatch(reset_users=[share_with_user.id], versions=versions)
         
         return jsonify({
             'message': f'이벤트가 {share_with_username}님과 공유되었습니다.',
@@ -333,6 +726,7 @@ def unshare_event(event_id):
         return jsonify({'error': '공유되지 않은 이벤트입니다.'}), 404
     
     try:
+        versions = touch(user_ids=[unshare_with_user.id])
         db.session.delete(event_share)
         
         # 다른 공유가 없으면 is_shared를 False로 변경
@@ -341,6 +735,7 @@ def unshare_event(event_id):
             event.is_shared = False
             
         db.session.commit()
+        dispatch(reset_users=[unshare_with_user.id], versions=versions)
         
         return jsonify({
             'message': f'{unshare_with_username}님과의 이벤트 공유가 해제되었습니다.'
@@ -402,49 +797,12 @@ def get_upcoming_events():
 @calendar_bp.route('/api/calendar/stats', methods=['GET'])
 @jwt_required()
 def get_calendar_stats():
+    """이번 달/오늘 이벤트 통계 (공유 이벤트와 반복 발생 포함)
+
+    월별 롤업 캐시에서 바로 응답하며, 캐시가 없을 때만 집계 쿼리를 실행한다.
+    """
     user_id = int(get_jwt_identity())
-    
-    # 이번 달 이벤트 수
-    now = datetime.utcnow()
-    start_of_month = datetime(now.year, now.month, 1)
-    if now.month == 12:
-        end_of_month = datetime(now.year + 1, 1, 1) - timedelta(seconds=1)
-    else:
-        end_of_month = datetime(now.year, now.month + 1, 1) - timedelta(seconds=1)
-    
-    month_events = Event.query.filter(
-        Event.user_id == user_id,
-        Event.start_time >= start_of_month,
-        Event.start_time <= end_of_month
-    ).count()
-    
-    # 카테고리별 이벤트 수
-    category_stats = db.session.query(
-        Event.category, 
-        db.func.count(Event.id)
-    ).filter(
-        Event.user_id == user_id,
-        Event.start_time >= start_of_month,
-        Event.start_time <= end_of_month
-    ).group_by(Event.category).all()
-    
-    # 오늘의 이벤트 수
-    today = date.today()
-    start_of_day = datetime.combine(today, datetime.min.time())
-    end_of_day = datetime.combine(today, datetime.max.time())
-    
-    today_events = Event.query.filter(
-        Event.user_id == user_id,
-        Event.start_time >= start_of_day,
-        Event.start_time <= end_of_day
-    ).count()
-    
-    return jsonify({
-        'month_events': month_events,
-        'today_events': today_events,
-        'category_stats': dict(category_stats),
-        'month': now.strftime('%B %Y')
-    })
+    return jsonify(stats_cache.get(user_id).to_dict())
 
 def create_recurring_events(base_event, repeat_until=None):
     """반복 이벤트 생성 함수"""
@@ -515,10 +873,13 @@ def delete_repeat_group(repeat_group_id):
     
     try:
         # 모든 이벤트 삭제
+        befores = [snapshot(event) for event in events]
+        versions = touch(event_ids=[event.id for event in events])
         for event in events:
             db.session.delete(event)
         
         db.session.commit()
+        dispatch(((before, None) for before in befores), versions=versions)
         
         return jsonify({
             'message': f'{len(events)}개의 반복 이벤트가 삭제되었습니다.',
@@ -529,46 +890,73 @@ def delete_repeat_group(repeat_group_id):
         db.session.rollback()
         return jsonify({'error': '반복 이벤트 삭제에 실패했습니다.'}), 500
 
+def _notification_data(event, now):
+    """알림 응답 항목 생성 (다음 발생 기준)"""
+    occurrence = next_occurrence(to_naive_utc(event.start_time), event.repeat,
+                                 to_naive_utc(event.repeat_until), after=event.fire_at or now)
+    if occurrence is None:
+        return None
+
+    time_until_event = max(occurrence - now, timedelta(0))
+    hours_until = int(time_until_event.total_seconds() // 3600)
+    minutes_until = int((time_until_event.total_seconds() % 3600) // 60)
+    return {
+        'event_id': event.id,
+        'title': event.title,
+        'start_time': occurrence.isoformat(),
+        'fire_at': event.fire_at.isoformat() if event.fire_at else None,
+        'notification_minutes': event.notification_minutes,
+        'location': event.location,
+        'category': event.category,
+        'priority': event.priority,
+        'hours_until': hours_until,
+        'minutes_until': minutes_until,
+        'time_until_text': f'{hours_until}시간 {minutes_until}분 후' if hours_until > 0 else f'{minutes_until}분 후'
+    }
+
 @calendar_bp.route('/api/calendar/events/<int:event_id>/notifications', methods=['GET'])
 @jwt_required()
-def get_event_notifications():
-    """다가오는 이벤트 알림 조회"""
+def get_event_notifications(event_id):
+    """특정 이벤트의 다음 알림 조회"""
+    user_id = int(get_jwt_identity())
+    
+    event = Event.query.filter_by(id=event_id).first()
+    if not event:
+        return jsonify({'error': '이벤트를 찾을 수 없습니다.'}), 404
+    
+    if event.user_id != user_id:
+        share = EventShare.query.filter_by(event_id=event_id, shared_with_user_id=user_id).first()
+        if not share:
+            return jsonify({'error': '이벤트를 찾을 수 없습니다.'}), 404
+    
+    notification = _notification_data(event, datetime.utcnow()) if event.fire_at else None
+    return jsonify({
+        'notifications': [notification] if notification else [],
+        'count': 1 if notification else 0
+    })
+
+@calendar_bp.route('/api/calendar/notifications', methods=['GET'])
+@jwt_required()
+def get_upcoming_notifications():
+    """앞으로 24시간 이내에 발송될 알림 조회
+
+    알림은 스케줄러가 Socket.IO(event_reminder)로 푸시하므로,
+    이 API는 페이지 로드 시 초기 상태를 가져올 때만 사용한다.
+    """
     user_id = int(get_jwt_identity())
     
-    # 현재 시간부터 24시간 이내의 이벤트들
     now = datetime.utcnow()
     tomorrow = now + timedelta(hours=24)
     
+    # 인덱스가 걸린 fire_at 범위 조회
     events = Event.query.filter(
         Event.user_id == user_id,
-        Event.start_time >= now,
-        Event.start_time <= tomorrow
-    ).order_by(Event.start_time).all()
-    
-    notifications = []
-    for event in events:
-        # 알림 시간 계산
-        notification_time = event.start_time - timedelta(minutes=event.notification_minutes)
-        
-        # 알림 시간이 현재 시간 이후라면 포함
-        if notification_time <= now:
-            time_until_event = event.start_time - now
-            hours_until = int(time_until_event.total_seconds() // 3600)
-            minutes_until = int((time_until_event.total_seconds() % 3600) // 60)
-            
-            notifications.append({
-                'event_id': event.id,
-                'title': event.title,
-                'start_time': event.start_time.isoformat(),
-                'location': event.location,
-                'category': event.category,
-                'priority': event.priority,
-                'hours_until': hours_until,
-                'minutes_until': minutes_until,
-                'time_until_text': f'{hours_until}시간 {minutes_until}분 후' if hours_until > 0 else f'{minutes_until}분 후'
-            })
+        Event.fire_at.isnot(None),
+        Event.fire_at <= tomorrow
+    ).order_by(Event.fire_at).all()
     
+    notifications = [data for data in (_notification_data(event, now) for event in events) if data]
     return jsonify({
         'notifications': notifications,
         'count': len(notifications)
-    })
\ No newline at end of file
+    })
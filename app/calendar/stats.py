@@ -0,0 +1,218 @@
+"""
+캘린더 통계 월별 롤업 캐시
+(사용자, 월) 단위로 통계를 한 번 집계해 두고, 이벤트 변경 시 증감만 반영해
+통계 조회를 O(1)로 처리한다.
+
+캐시는 워커마다 따로 있으므로 롤업마다 집계 시점의 user.calendar_version을 기록하고,
+조회 때 DB의 버전과 다르면(다른 워커가 이벤트를 바꿈) 다시 집계한다.
+"""
+
+import threading
+from collections import Counter, OrderedDict
+from datetime import datetime, timedelta
+
+from app.models import Event, EventShare, db
+from app.calendar.listeners import SNAPSHOT_FIELDS, calendar_version, on_events_changed, snapshot
+from app.calendar.recurrence import REPEAT_RULES, iter_occurrences, to_naive_utc
+
+
+def month_bounds(year, month):
+    """해당 월의 [시작, 다음 달 시작) 구간"""
+    start = datetime(year, month, 1)
+    end = datetime(year + 1, 1, 1) if month == 12 else datetime(year, month + 1, 1)
+    return start, end
+
+
+def _occurrence_counts(snap, month_start, month_end, day_start, day_end):
+    """이벤트 하나가 이번 달/오늘에 발생하는 횟수"""
+    start_time = to_naive_utc(snap['start_time'])
+    if start_time is None:
+        return 0, 0
+    month_count = 0
+    today_count = 0
+    for occurrence in iter_occurrences(start_time, snap['repeat'], to_naive_utc(snap['repeat_until']),
+                                       window_start=month_start,
+                                       window_end=month_end - timedelta(microseconds=1)):
+        month_count += 1
+        if day_start <= occurrence < day_end:
+            today_count += 1
+    return month_count, today_count
+
+
+class MonthlyRollup:
+    """한 사용자의 한 달 통계"""
+
+    __slots__ = ('user_id', 'month_start', 'month_end', 'day', 'version', 'total_events', 'month_events',
+                 'today_events', 'shared_events', 'category_stats', 'shared_ids')
+
+    def __init__(self, user_id, month_start, month_end, day, version=0):
+        self.user_id = user_id
+        self.version = version  # 집계 시점의 user.calendar_version
+        self.month_start = month_start
+        self.month_end = month_end
+        self.day = day
+        self.total_events = 0
+        self.month_events = 0
+        self.today_events = 0
+        self.shared_events = 0
+        self.category_stats = Counter()
+        self.shared_ids = set()  # 이 롤업에 포함된 공유 이벤트 id
+
+    def _day_bounds(self):
+        day_start = datetime.combine(self.day, datetime.min.time())
+        return day_start, day_start + timedelta(days=1)
+
+    def apply(self, snap, sign):
+        """스냅샷 하나의 기여분을 더하거나(sign=1) 뺀다(sign=-1)"""
+        day_start, day_end = self._day_bounds()
+        month_count, today_count = _occurrence_counts(snap, self.month_start, self.month_end,
+                                                      day_start, day_end)
+        self.total_events += sign
+        self.month_events += sign * month_count
+        self.today_events += sign * today_count
+        if month_count:
+            self.category_stats[snap['category']] += sign * month_count
+            if self.category_stats[snap['category']] <= 0:
+                del self.category_stats[snap['category']]
+
+    def to_dict(self):
+        return {
+            'total_events': self.total_events,
+            'month_events': self.month_events,
+            'today_events': self.today_events,
+            'shared_events': self.shared_events,
+            'category_stats': dict(self.category_stats),
+            'month': self.month_start.strftime('%B %Y')
+        }
+
+
+def load_rollup(user_id, year, month, day, version=0):
+    """DB에서 롤업을 새로 집계
+
+    반복이 아닌 이벤트는 조건부 합계를 사용하는 집계 쿼리 한 번으로 계산하고,
+    이번 달에 걸치는 반복 이벤트(마스터)만 메모리에서 전개한다.
+    version은 집계 전에 읽은 calendar_version - 집계 도중 바뀌었다면 다음 조회에서 다시 집계된다.
+    """
+    month_start, month_end = month_bounds(year, month)
+    rollup = MonthlyRollup(user_id, month_start, month_end, day, version)
+    day_start, day_end = rollup._day_bounds()
+
+    rollup.shared_ids = {row.event_id for row in db.session.query(EventShare.event_id).filter_by(
+        shared_with_user_id=user_id
+    )}
+    visible = Event.user_id == user_id
+    if rollup.shared_ids:
+        visible = db.or_(visible, Event.id.in_(rollup.shared_ids))
+
+    recurring = db.func.coalesce(Event.repeat, '').in_(REPEAT_RULES)
+    single = db.not_(recurring)
+    in_month = db.and_(single, Event.start_time >= month_start, Event.start_time < month_end)
+    in_today = db.and_(single, Event.start_time >= day_start, Event.start_time < day_end)
+
+    rows = db.session.query(
+        Event.category,
+        db.func.count(Event.id),
+        db.func.sum(db.case((in_month, 1), else_=0)),
+        db.func.sum(db.case((in_today, 1), else_=0)),
+        db.func.sum(db.case((Event.user_id != user_id, 1), else_=0))
+    ).filter(visible).group_by(Event.category).all()
+
+    for category, total, month_count, today_count, shared_count in rows:
+        rollup.total_events += total
+        rollup.month_events += month_count or 0
+        rollup.today_events += today_count or 0
+        rollup.shared_events += shared_count or 0
+        if month_count:
+            rollup.category_stats[category] += month_count
+
+    # 이번 달과 겹치는 반복 이벤트 전개
+    masters = db.session.query(*[getattr(Event, field) for field in SNAPSHOT_FIELDS]).filter(
+        visible,
+        recurring,
+        Event.start_time < month_end,
+        db.or_(Event.repeat_until.is_(None), Event.repeat_until >= month_start)
+    ).all()
+    for row in masters:
+        snap = snapshot(row)
+        month_count, today_count = _occurrence_counts(snap, month_start, month_end, day_start, day_end)
+        rollup.month_events += month_count
+        rollup.today_events += today_count
+        if month_count:
+            rollup.category_stats[snap['category']] += month_count
+
+    return rollup
+
+
+class StatsCache:
+    """(user_id, year, month) -> MonthlyRollup LRU 캐시"""
+
+    def __init__(self, max_entries=10000):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id, now=None):
+        now = now or datetime.utcnow()
+        key = (user_id, now.year, now.month)
+        version = calendar_version(user_id)
+        with self._lock:
+            rollup = self._entries.get(key)
+            if rollup is not None and rollup.version == version and rollup.day == now.date():
+                self._entries.move_to_end(key)
+                return rollup
+
+        rollup = load_rollup(user_id, now.year, now.month, now.date(), version)
+        with self._lock:
+            # 동시에 놓친 요청이 더 새 버전을 먼저 넣었다면 덮어쓰지 않는다
+            current = self._entries.get(key)
+            if current is None or (current.version, current.day) <= (rollup.version, rollup.day):
+                self._entries[key] = rollup
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return rollup
+
+    def apply_changes(self, changes, reset_users=(), versions=None):
+        """같은 워커의 변경을 롤업에 반영
+
+        증감은 롤업이 이 변경 직전 버전(versions[user_id] - 1)일 때만 적용한다.
+        그 사이 다른 워커의 변경이 끼어 있으면 버리고 다음 조회에서 다시 집계한다.
+        """
+        versions = versions or {}
+        with self._lock:
+            stale = {key for key, rollup in self._entries.items()
+                     if key[0] in reset_users
+                     or (key[0] in versions and rollup.version != versions[key[0]] - 1)}
+
+            by_user = {}
+            shared_index = {}
+            for key, rollup in self._entries.items():
+                if key in stale:
+                    continue
+                by_user.setdefault(key[0], []).append(rollup)
+                for event_id in rollup.shared_ids:
+                    shared_index.setdefault(event_id, []).append(key)
+
+            for before, after in changes:
+                snap = after or before
+                for rollup in by_user.get(snap['user_id'], ()):
+                    if before is not None:
+                        rollup.apply(before, -1)
+                    if after is not None:
+                        rollup.apply(after, 1)
+                # 공유받은 이벤트는 다음 조회 때 다시 집계
+                stale.update(shared_index.get(snap['id'], ()))
+
+            for key in stale:
+                self._entries.pop(key, None)
+            for key, rollup in self._entries.items():
+                if key[0] in versions:
+                    rollup.version = versions[key[0]]
+
+
+stats_cache = StatsCache()
+
+
+@on_events_changed
+def _update_rollups(changes, reset_users, versions):
+    stats_cache.apply_changes(changes, reset_users, versions)
@@ -0,0 +1,271 @@
+"""
+메시지 보관 (콜드 스토리지)
+- 일정 기간이 지난 메시지를 방별 압축 세그먼트 파일(JSON Lines + gzip)로 옮기고
+  message 테이블에서는 일괄 삭제한다. 세그먼트는 추가만 하고 다시 쓰지 않는다.
+- 보관은 항상 방의 가장 오래된 메시지부터(id 순) 진행하므로, 기록 조회는
+  DB 메시지를 먼저 읽고 모자란 만큼 세그먼트에서 이어 읽으면 된다.
+- 보관된 메시지는 읽기 전용이다 (수정/삭제/검색 대상에서 빠진다).
+
+    flask --app run archive-messages --days 90
+"""
+
+import gzip
+import json
+import os
+import shutil
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+from flask import current_app
+
+from app.chat import attachments
+from app.chat import search as message_search
+from app.models import (ChatRoom, Conversation, Message, MessageArchiveSegment, MessageSearchToken, UserGroupKey,
+                        db, room_participants)
+
+# 세그먼트에 저장하는 Message 컬럼
+ARCHIVE_FIELDS = (
+    'id', 'content', 'message_type', 'file_url', 'file_name', 'timestamp', 'user_id',
+    'is_read', 'is_edited', 'edited_at', 'reply_to_id', 'is_encrypted', 'seq'
+)
+DATETIME_FIELDS = ('timestamp', 'edited_at')
+
+# IN (...) 절에 한 번에 넣을 id 수 (SQLite 변수 개수 제한 대비)
+DELETE_CHUNK_SIZE = 500
+
+
+def archive_dir(app=None):
+    app = app or current_app
+    return app.config.get('MESSAGE_ARCHIVE_DIR') or os.path.join(app.instance_path, 'message_archive')
+
+
+def _encode(row):
+    record = {field: getattr(row, field) for field in ARCHIVE_FIELDS}
+    for field in DATETIME_FIELDS:
+        if record[field] is not None:
+            record[field] = record[field].isoformat()
+    return record
+
+
+def _decode(record):
+    """세그먼트 한 줄 -> Message와 같은 속성으로 읽을 수 있는 객체"""
+    # 순번(seq) 도입 전에 만든 세그먼트에는 seq가 없다
+    record.setdefault('seq', None)
+    for field in DATETIME_FIELDS:
+        if record.get(field):
+            record[field] = datetime.fromisoformat(record[field])
+    return SimpleNamespace(**record)
+
+
+class SegmentCache:
+    """최근에 읽은 세그먼트 파일의 내용을 보관하는 LRU 캐시 (세그먼트는 바뀌지 않음)"""
+
+    def __init__(self, max_segments=32):
+        self.max_segments = max_segments
+        self._segments = OrderedDict()
+        self._lock = threading.Lock()
+
+    def read(self, path):
+        """세그먼트의 메시지 목록 (오래된 순, 읽기 전용으로 다룰 것)"""
+        with self._lock:
+            if path in self._segments:
+                self._segments.move_to_end(path)
+                return self._segments[path]
+
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            records = tuple(_decode(json.loads(line)) for line in f if line.strip())
+
+        with self._lock:
+            self._segments[path] = records
+            while len(self._segments) > self.max_segments:
+                self._segments.popitem(last=False)
+        return records
+
+    def evict_prefix(self, prefix):
+        with self._lock:
+            for path in [path for path in self._segments if path.startswith(prefix)]:
+                del self._segments[path]
+
+
+segment_cache = SegmentCache()
+
+
+def _chunks(items, size):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+# ---------------------------------------------------------------------------
+# 보관
+# ---------------------------------------------------------------------------
+
+def _write_segment(room_id, rows):
+    """메시지 행들을 새 세그먼트 파일로 쓰고 보관 디렉터리 기준 상대 경로를 반환"""
+    relative = os.path.join(str(room_id), f'{rows[0].id:012d}-{rows[-1].id:012d}.jsonl.gz')
+    path = os.path.join(archive_dir(), relative)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    # 임시 파일에 다 쓴 뒤 이름을 바꿔, 중간에 실패해도 깨진 세그먼트가 남지 않게 한다
+    tmp_path = path + '.tmp'
+    with gzip.open(tmp_path, 'wt', encoding='utf-8') as f:
+        for row in rows:
+            f.write(json.dumps(_encode(row), ensure_ascii=False, separators=(',', ':')))
+            f.write('\n')
+    os.replace(tmp_path, path)
+    return relative
+
+
+def archive_boundary(room_id, cutoff):
+    """보관할 메시지의 id 상한 (이 id 미만을 보관, None이면 방 전체)
+
+    cutoff 이후 첫 메시지가 경계이며, 남겨 둘 메시지가 답글로 참조하는
+    이전 메시지가 있으면 경계를 그 앞으로 당겨 답글 대상이 DB에 남도록 한다.
+    """
+    boundary = db.session.execute(
+        db.select(db.func.min(Message.id)).where(Message.room_id == room_id, Message.timestamp >= cutoff)
+    ).scalar()
+    if boundary is None:
+        return None
+
+    referenced = db.session.execute(
+        db.select(db.func.min(Message.reply_to_id))
+        .where(Message.room_id == room_id, Message.id >= boundary, Message.reply_to_id < boundary)
+    ).scalar()
+    return min(boundary, referenced) if referenced is not None else boundary
+
+
+def archive_room(room_id, cutoff, segment_size=5000):
+    """방의 cutoff 이전 메시지를 세그먼트로 옮긴다 - 보관한 메시지 수 반환"""
+    boundary = archive_boundary(room_id, cutoff)
+    columns = [getattr(Message, field) for field in ARCHIVE_FIELDS]
+    archived = 0
+
+    while True:
+        query = db.select(*columns).where(Message.room_id == room_id)
+        if boundary is not None:
+            query = query.where(Message.id < boundary)
+        rows = db.session.execute(query.order_by(Message.id).limit(segment_size)).all()
+        if not rows:
+            break
+
+        relative = _write_segment(room_id, rows)
+        try:
+            db.session.add(MessageArchiveSegment(
+                room_id=room_id,
+                path=relative,
+                first_message_id=rows[0].id,
+                last_message_id=rows[-1].id,
+                first_timestamp=rows[0].timestamp,
+                last_timestamp=rows[-1].timestamp,
+                message_count=len(rows)
+            ))
+            for ids in _chunks([row.id for row in rows], DELETE_CHUNK_SIZE):
+                message_search.remove_tokens(ids)
+                db.session.execute(Message.__table__.delete().where(Message.id.in_(ids)))
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            os.remove(os.path.join(archive_dir(), relative))
+            raise
+
+        archived += len(rows)
+        if len(rows) < segment_size:
+            break
+    return archived
+
+
+def archive_messages(days=None, room_id=None):
+    """days일이 지난 메시지 보관 - {room_id: 보관한 메시지 수}"""
+    days = current_app.config.get('MESSAGE_ARCHIVE_AFTER_DAYS', 90) if days is None else days
+    segment_size = current_app.config.get('MESSAGE_ARCHIVE_SEGMENT_SIZE', 5000)
+    cutoff = datetime.utcnow() - timedelta(days=days)
+
+    if room_id is not None:
+        room_ids = [room_id]
+    else:
+        room_ids = db.session.execute(db.select(ChatRoom.id).order_by(ChatRoom.id)).scalars().all()
+
+    results = {}
+    for rid in room_ids:
+        count = archive_room(rid, cutoff, segment_size)
+        if count:
+            results[rid] = count
+    return results
+
+
+# ---------------------------------------------------------------------------
+# 읽기
+# ---------------------------------------------------------------------------
+
+def archived_count(room_id):
+    return db.session.execute(
+        db.select(db.func.coalesce(db.func.sum(MessageArchiveSegment.message_count), 0))
+        .where(MessageArchiveSegment.room_id == room_id)
+    ).scalar()
+
+
+def read_archived(room_id, skip, limit):
+    """보관된 메시지를 최신순으로 skip개 건너뛰고 최대 limit개 반환"""
+    if limit <= 0:
+        return []
+    segments = db.session.execute(
+        db.select(MessageArchiveSegment.path, MessageArchiveSegment.message_count)
+        .where(MessageArchiveSegment.room_id == room_id)
+        .order_by(MessageArchiveSegment.last_message_id.desc())
+    ).all()
+
+    base = archive_dir()
+    records = []
+    for segment in segments:
+        if skip >= segment.message_count:
+            skip -= segment.message_count
+            continue
+        newest_first = segment_cache.read(os.path.join(base, segment.path))[::-1]
+        records.extend(newest_first[skip:skip + limit - len(records)])
+        skip = 0
+        if len(records) >= limit:
+            break
+    return records
+
+
+def find_archived(room_id, message_id):
+    """보관된 메시지 하나 (답글 원본 표시용)"""
+    path = db.session.execute(
+        db.select(MessageArchiveSegment.path).where(
+            MessageArchiveSegment.room_id == room_id,
+            MessageArchiveSegment.first_message_id <= message_id,
+            MessageArchiveSegment.last_message_id >= message_id)
+    ).scalar()
+    if path is None:
+        return None
+    for record in segment_cache.read(os.path.join(archive_dir(), path)):
+        if record.id == message_id:
+            return record
+    return None
+
+
+# ---------------------------------------------------------------------------
+# 방 삭제
+# ---------------------------------------------------------------------------
+
+def delete_room(room_id):
+    """채팅방과 관련 데이터를 ORM으로 읽지 않고 일괄 삭제"""
+    db.session.execute(MessageSearchToken.__table__.delete().where(MessageSearchToken.room_id == room_id))
+    db.session.execute(Message.__table__.delete().where(Message.room_id == room_id))
+    db.session.execute(UserGroupKey.__table__.delete().where(UserGroupKey.room_id == room_id))
+    db.session.execute(room_participants.delete().where(room_participants.c.chat_room_id == room_id))
+    db.session.execute(MessageArchiveSegment.__table__.delete().where(MessageArchiveSegment.room_id == room_id))
+    db.session.execute(Conversation.__table__.delete().where(Conversation.room_id == room_id))
+    attachment_hashes, upload_ids = attachments.delete_room_attachments(room_id)
+    db.session.execute(ChatRoom.__table__.delete().where(ChatRoom.id == room_id))
+    db.session.commit()
+
+    # 다른 방에서 참조하지 않는 첨부 파일 정리
+    attachments.remove_files(attachment_hashes, upload_ids)
+
+    # DB 커밋이 끝난 뒤 세그먼트 파일 정리
+    room_dir = os.path.join(archive_dir(), str(room_id))
+    segment_cache.evict_prefix(room_dir + os.sep)
+    shutil.rmtree(room_dir, ignore_errors=True)
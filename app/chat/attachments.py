@@ -0,0 +1,432 @@
+"""
+첨부 파일 저장소 (분할/이어 올리기, 내용 주소 저장)
+ATTACHMENT_DIR(없으면 인스턴스 폴더의 attachments) 아래에
+    parts/<업로드 id>.part       진행 중인 업로드 (받은 청크를 순서대로 이어 씀)
+    blobs/<해시 앞 2자리>/<해시>  완료된 파일 (SHA-256 이름, 같은 내용은 한 번만 저장)
+    thumbs/<해시>.jpg            이미지 미리보기 (Pillow가 있을 때, 요청 밖 OS 스레드에서 생성)
+를 둔다.
+
+- 청크는 요청 본문을 64KB씩 읽어 바로 파일에 쓰므로 파일 전체가 메모리에 올라오지 않는다
+- 업로드는 offset이 지금까지 받은 바이트 수와 같은 청크만 받으며, 끊기면 받은 위치부터 다시 올린다
+  (같은 업로드에 동시에 쓰는 요청은 부분 파일 잠금으로 하나만 통과)
+- SHA-256은 청크를 쓰면서 이어 계산한다 (다른 워커가 받은 청크가 섞였거나 재시작했으면 완료할 때 파일을 다시 읽음)
+- 완료할 때는 Attachment 행을 먼저 커밋하고 파일을 옮기며, 정리(remove_files)는 파일을 치운 뒤 참조를
+  다시 확인해 그 사이 커밋된 행이 있으면 되돌린다 (정리와 완료가 겹쳐도 행만 남고 파일이 사라지지 않음)
+- 같은 사용자가 이미 올린 내용(해시)을 다시 올리면 전송 없이 바로 완료한다
+  (다른 사용자의 파일은 해시만으로 가져갈 수 없도록 업로드를 받은 뒤에만 저장을 공유한다)
+- 암호화된 파일은 클라이언트가 chunk_size 단위로 나눠 각각 AES-GCM으로 암호화한 바이트열이라
+  서버는 내용을 볼 수 없고 미리보기도 만들지 않는다
+"""
+
+import hashlib
+import os
+import threading
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+from flask import current_app
+from sqlalchemy.exc import InvalidRequestError
+
+from app.models import Attachment, AttachmentUpload, db
+from app.utils import os_modules
+
+try:
+    from PIL import Image
+except ImportError:  # 선택 의존성 (미리보기 없이 동작)
+    Image = None
+
+try:
+    import fcntl
+except ImportError:  # Windows - 업로드별 잠금 없이 DB의 조건부 갱신에만 의존
+    fcntl = None
+
+CHUNK_READ_SIZE = 64 * 1024
+HASH_READ_SIZE = 1024 * 1024
+THUMBNAIL_SIZE = (320, 320)
+# 브라우저에서 바로 보여 줘도 되는 형식 (나머지는 내려받기로, SVG/HTML은 스크립트 실행 위험)
+INLINE_MIME_TYPES = frozenset({'image/png', 'image/jpeg', 'image/gif', 'image/webp'})
+
+# 미리보기를 동시에 만드는 최대 스레드 수
+_thumbnail_slots = threading.BoundedSemaphore(2)
+
+# 업로드 id -> (받은 바이트 수, 거기까지의 sha256 객체) - 프로세스마다 따로, 오래 쓰지 않은 것부터 버림
+RUNNING_HASH_MAX = 256
+_running_hashes = OrderedDict()
+_running_hashes_lock = threading.Lock()
+
+
+class UploadOffsetError(Exception):
+    """청크의 offset이 지금까지 받은 위치와 다름 (클라이언트는 offset부터 다시 올림)"""
+
+    def __init__(self, offset):
+        super().__init__(f'offset {offset}부터 올려야 합니다.')
+        self.offset = offset
+
+
+def attachment_dir():
+    return current_app.config.get('ATTACHMENT_DIR') or os.path.join(current_app.instance_path, 'attachments')
+
+
+def part_path(upload_id):
+    return os.path.join(attachment_dir(), 'parts', f'{upload_id}.part')
+
+
+def blob_path(sha256):
+    return os.path.join(attachment_dir(), 'blobs', sha256[:2], sha256)
+
+
+def thumbnail_path(sha256):
+    return os.path.join(attachment_dir(), 'thumbs', f'{sha256}.jpg')
+
+
+def _clean_sha256(value):
+    if value is None:
+        return None
+    value = str(value).lower()
+    if len(value) != 64 or any(char not in '0123456789abcdef' for char in value):
+        raise ValueError('sha256은 64자리 16진수여야 합니다.')
+    return value
+
+
+# ---------------------------------------------------------------------------
+# 업로드
+# ---------------------------------------------------------------------------
+
+def start_upload(room_id, user_id, data):
+    """업로드 시작 - (이미 올린 같은 파일의 Attachment 또는 None, 새 AttachmentUpload 또는 None)
+
+    data: file_name, size, mime_type, sha256(선택), is_encrypted, chunk_size(암호화된 파일)
+    """
+    try:
+        file_name = str(data['file_name'])[:200]
+        size = int(data['size'])
+    except (KeyError, TypeError, ValueError):
+        raise ValueError('file_name과 size가 필요합니다.')
+    if not file_name or size < 0 or size > current_app.config.get('ATTACHMENT_MAX_SIZE', 100 * 1024 * 1024):
+        raise ValueError('파일 크기가 허용 범위를 벗어났습니다.')
+    sha256 = _clean_sha256(data.get('sha256'))
+    is_encrypted = bool(data.get('is_encrypted'))
+    chunk_size = data.get('chunk_size')
+    if is_encrypted:
+        if not isinstance(chunk_size, int) or chunk_size <= 0:
+            raise ValueError('암호화된 파일은 chunk_size가 필요합니다.')
+    else:
+        chunk_size = None
+    mime_type = str(data.get('mime_type') or 'application/octet-stream')[:100]
+
+    if sha256:
+        # 같은 사용자가 같은 내용을 이미 올렸으면 다시 받을 필요가 없다 (저장 파일을 공유)
+        existing = Attachment.query.filter_by(sha256=sha256, size=size, uploaded_by=user_id).first()
+        if existing is not None and os.path.exists(blob_path(sha256)):
+            attachment = _new_attachment(existing.sha256, size, file_name, mime_type, chunk_size, is_encrypted,
+                                         room_id, user_id)
+            db.session.commit()
+            # 커밋 전에 정리가 파일을 지웠으면 (행이 보이기 전에 참조를 확인함) 새로 올려 받는다
+            if os.path.exists(blob_path(sha256)):
+                return attachment, None
+            db.session.delete(attachment)
+            db.session.commit()
+
+    upload = AttachmentUpload(
+        id=uuid.uuid4().hex, room_id=room_id, user_id=user_id, file_name=file_name, mime_type=mime_type,
+        size=size, received=0, sha256=sha256, chunk_size=chunk_size, is_encrypted=is_encrypted
+    )
+    db.session.add(upload)
+    db.session.commit()
+    # 행을 먼저 커밋해야 정리(purge)가 이 부분 파일을 주인 없는 파일로 보지 않는다
+    os.makedirs(os.path.dirname(part_path(upload.id)), exist_ok=True)
+    open(part_path(upload.id), 'wb').close()
+    _store_running_hash(upload.id, 0, hashlib.sha256())
+    return None, upload
+
+
+def _lock_part(f):
+    """부분 파일 배타 잠금 (다른 요청이 쓰는 중이면 False) - 파일을 닫으면 풀린다"""
+    if fcntl is None:
+        return True
+    try:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        return False
+    return True
+
+
+def _store_running_hash(upload_id, received, hasher):
+    with _running_hashes_lock:
+        _running_hashes[upload_id] = (received, hasher)
+        _running_hashes.move_to_end(upload_id)
+        while len(_running_hashes) > RUNNING_HASH_MAX:
+            _running_hashes.popitem(last=False)
+
+
+def _forget_running_hash(upload_id):
+    with _running_hashes_lock:
+        _running_hashes.pop(upload_id, None)
+
+
+def _take_running_hash(upload_id, received):
+    """received 바이트까지 이어 계산한 sha256 객체 (없거나 위치가 다르면 None)"""
+    with _running_hashes_lock:
+        entry = _running_hashes.pop(upload_id, None)
+    return entry[1] if entry is not None and entry[0] == received else None
+
+
+def write_chunk(upload, offset, stream, length):
+    """요청 본문(stream)의 청크를 offset 위치에 이어 쓴다 - 새로 받은 전체 바이트 수 반환"""
+    if offset != upload.received:
+        raise UploadOffsetError(upload.received)
+    if not length or length <= 0:
+        raise ValueError('청크 크기(Content-Length)가 필요합니다.')
+    if length > current_app.config.get('ATTACHMENT_CHUNK_MAX', 8 * 1024 * 1024):
+        raise ValueError('청크가 너무 큽니다.')
+    if offset + length > upload.size:
+        raise ValueError('파일 크기를 넘는 청크입니다.')
+
+    with open(part_path(upload.id), 'r+b') as f:
+        # 같은 업로드에 동시에 쓰는 요청은 하나만 통과 (나머지는 409로 받은 위치를 다시 확인)
+        if not _lock_part(f):
+            raise UploadOffsetError(upload.received)
+        # 잠금을 얻기 전에 끝난 요청이 있으면 받은 위치가 달라졌다
+        try:
+            db.session.refresh(upload)
+        except InvalidRequestError:
+            raise ValueError('업로드가 취소되었습니다.')
+        if offset != upload.received:
+            raise UploadOffsetError(upload.received)
+
+        base = _take_running_hash(upload.id, offset)
+        hasher = base.copy() if base is not None else None
+        written = 0
+        f.seek(offset)
+        while written < length:
+            data = stream.read(min(CHUNK_READ_SIZE, length - written))
+            if not data:
+                break
+            f.write(data)
+            if hasher is not None:
+                hasher.update(data)
+            written += len(data)
+        # 이전에 끊긴 요청이 남긴 뒷부분 제거
+        f.truncate()
+        if written != length:
+            if base is not None:
+                _store_running_hash(upload.id, offset, base)
+            raise ValueError('청크 전송이 중간에 끊겼습니다.')
+
+        # 잠금이 없는 환경에서 같은 위치를 동시에 올린 요청이 있으면 한쪽만 반영
+        updated = db.session.execute(
+            AttachmentUpload.__table__.update()
+            .where(AttachmentUpload.id == upload.id, AttachmentUpload.received == offset)
+            .values(received=offset + length, updated_at=datetime.utcnow())
+        ).rowcount
+        db.session.commit()
+        if not updated:
+            db.session.refresh(upload)
+            raise UploadOffsetError(upload.received)
+        if hasher is not None:
+            _store_running_hash(upload.id, offset + length, hasher)
+    upload.received = offset + length
+    return offset + length
+
+
+def _file_sha256(path):
+    hasher = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(HASH_READ_SIZE), b''):
+            hasher.update(block)
+    return hasher.hexdigest()
+
+
+def finish_upload(upload):
+    """다 받은 업로드를 해시 이름으로 옮기고 Attachment 생성 (같은 내용이 있으면 그 파일을 공유)"""
+    path = part_path(upload.id)
+    hasher = _take_running_hash(upload.id, upload.size)
+    sha256 = hasher.hexdigest() if hasher is not None else _file_sha256(path)
+    if upload.sha256 and upload.sha256 != sha256:
+        abort_upload(upload)
+        raise ValueError('파일 해시가 일치하지 않습니다.')
+
+    # 행을 먼저 커밋한 뒤 파일을 옮긴다 - 정리가 참조를 확인한 뒤에 이 파일이 생기거나,
+    # 정리가 같은 내용의 기존 파일을 지우더라도 아래 os.replace가 다시 채운다
+    attachment = _new_attachment(sha256, upload.size, upload.file_name, upload.mime_type, upload.chunk_size,
+                                 upload.is_encrypted, upload.room_id, upload.user_id)
+    db.session.delete(upload)
+    db.session.commit()
+
+    target = blob_path(sha256)
+    try:
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        # 같은 내용의 파일이 이미 있어도 덮어쓴다 (내용이 같으므로 읽는 쪽에 영향 없음)
+        os.replace(path, target)
+    except OSError:
+        db.session.delete(attachment)
+        db.session.commit()
+        raise
+    schedule_thumbnail(attachment)
+    return attachment
+
+
+def abort_upload(upload):
+    path = part_path(upload.id)
+    _forget_running_hash(upload.id)
+    db.session.delete(upload)
+    db.session.commit()
+    if os.path.exists(path):
+        os.remove(path)
+
+
+def _new_attachment(sha256, size, file_name, mime_type, chunk_size, is_encrypted, room_id, user_id):
+    attachment = Attachment(
+        sha256=sha256, size=size, file_name=file_name, mime_type=mime_type, chunk_size=chunk_size,
+        is_encrypted=is_encrypted, room_id=room_id, uploaded_by=user_id
+    )
+    db.session.add(attachment)
+    return attachment
+
+
+def serialize_attachment(attachment):
+    return {
+        'id': attachment.id,
+        'file_name': attachment.file_name,
+        'mime_type': attachment.mime_type,
+        'size': attachment.size,
+        'is_encrypted': attachment.is_encrypted,
+        'chunk_size': attachment.chunk_size,
+        'url': f'/api/chat/attachments/{attachment.id}',
+        'has_thumbnail': os.path.exists(thumbnail_path(attachment.sha256)),
+    }
+
+
+def message_file_fields(attachment_id, room_id, user_id):
+    """메시지에 붙일 첨부 파일 -> (message_type, file_url, file_name)
+
+    자기가 이 방에 올린 첨부 파일만 붙일 수 있다.
+    """
+    attachment = db.session.get(Attachment, attachment_id) if isinstance(attachment_id, int) else None
+    if attachment is None or attachment.room_id != room_id or attachment.uploaded_by != user_id:
+        raise ValueError('첨부 파일을 찾을 수 없습니다.')
+    message_type = 'image' if (attachment.mime_type or '').startswith('image/') else 'file'
+    return message_type, f'/api/chat/attachments/{attachment.id}', attachment.file_name
+
+
+# ---------------------------------------------------------------------------
+# 미리보기
+# ---------------------------------------------------------------------------
+
+def schedule_thumbnail(attachment):
+    """암호화되지 않은 이미지의 미리보기를 요청 밖 OS 스레드에서 생성"""
+    if (Image is None or attachment.is_encrypted or attachment.mime_type not in INLINE_MIME_TYPES
+            or not current_app.config.get('ATTACHMENT_THUMBNAILS', True)):
+        return
+    target = thumbnail_path(attachment.sha256)
+    if os.path.exists(target):
+        return
+    # eventlet 그린 스레드에서 이미지를 디코딩하면 이벤트 루프가 멈추므로 실제 OS 스레드를 쓴다
+    os_threading, _ = os_modules()
+    os_threading.Thread(target=_make_thumbnail, args=(blob_path(attachment.sha256), target), daemon=True).start()
+
+
+def _make_thumbnail(source, target):
+    with _thumbnail_slots:
+        try:
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            temp = f'{target}.{uuid.uuid4().hex}.tmp'
+            with Image.open(source) as image:
+                image.thumbnail(THUMBNAIL_SIZE)
+                image.convert('RGB').save(temp, 'JPEG', quality=80)
+            os.replace(temp, target)
+        except Exception as e:
+            print(f'미리보기 생성 오류 ({os.path.basename(source)}): {e}')
+
+
+# ---------------------------------------------------------------------------
+# 정리
+# ---------------------------------------------------------------------------
+
+def delete_room_attachments(room_id):
+    """방의 첨부 파일/업로드 행 삭제 (커밋은 호출한 쪽) - 정리할 (해시 목록, 업로드 id 목록) 반환"""
+    hashes = set(db.session.execute(db.select(Attachment.sha256).where(Attachment.room_id == room_id)).scalars())
+    upload_ids = list(db.session.execute(
+        db.select(AttachmentUpload.id).where(AttachmentUpload.room_id == room_id)
+    ).scalars())
+    db.session.execute(Attachment.__table__.delete().where(Attachment.room_id == room_id))
+    db.session.execute(AttachmentUpload.__table__.delete().where(AttachmentUpload.room_id == room_id))
+    return hashes, upload_ids
+
+
+def _referenced(hashes):
+    return set(db.session.execute(
+        db.select(Attachment.sha256).where(Attachment.sha256.in_(hashes))
+    ).scalars())
+
+
+def _remove_blob(sha256):
+    """참조가 없는 저장 파일 삭제 - 치운 뒤 참조를 다시 확인해 그 사이 커밋된 첨부 파일이 있으면 되돌린다"""
+    path = blob_path(sha256)
+    trash = f'{path}.{uuid.uuid4().hex}.gc'
+    try:
+        os.rename(path, trash)
+    except FileNotFoundError:
+        return 0
+    if _referenced({sha256}):
+        # 같은 내용이 다시 들어왔을 수 있지만 내용이 같으므로 덮어써도 된다
+        os.replace(trash, path)
+        return 0
+    os.remove(trash)
+    removed = 1
+    if os.path.exists(thumbnail_path(sha256)):
+        os.remove(thumbnail_path(sha256))
+        removed += 1
+    return removed
+
+
+def remove_files(hashes=(), upload_ids=()):
+    """더 이상 참조하는 Attachment가 없는 파일과 업로드 임시 파일 삭제 (DB 커밋 후 호출)"""
+    removed = 0
+    for upload_id in upload_ids:
+        _forget_running_hash(upload_id)
+        if os.path.exists(part_path(upload_id)):
+            os.remove(part_path(upload_id))
+            removed += 1
+    hashes = set(hashes)
+    if hashes:
+        hashes -= _referenced(hashes)
+    for sha256 in hashes:
+        removed += _remove_blob(sha256)
+    return removed
+
+
+def purge(expire_before):
+    """expire_before 이전에 멈춘 업로드와 참조가 없는 파일 정리 - 삭제한 파일 수 반환"""
+    upload_ids = list(db.session.execute(
+        db.select(AttachmentUpload.id).where(AttachmentUpload.updated_at < expire_before)
+    ).scalars())
+    if upload_ids:
+        db.session.execute(AttachmentUpload.__table__.delete().where(AttachmentUpload.id.in_(upload_ids)))
+        db.session.commit()
+
+    # DB에 없는 업로드의 임시 파일과 Attachment가 없는 저장 파일
+    # (파일 목록을 먼저 읽어야 그 뒤에 시작한 업로드 - 행을 커밋한 뒤 파일을 만든다 - 를 지우지 않는다)
+    parts_dir = os.path.join(attachment_dir(), 'parts')
+    part_names = os.listdir(parts_dir) if os.path.isdir(parts_dir) else []
+    live_uploads = set(db.session.execute(db.select(AttachmentUpload.id)).scalars())
+    for name in part_names:
+        upload_id = name[:-len('.part')]
+        if name.endswith('.part') and upload_id not in live_uploads:
+            upload_ids.append(upload_id)
+    blobs_dir = os.path.join(attachment_dir(), 'blobs')
+    hashes = []
+    removed = 0
+    for prefix in os.listdir(blobs_dir) if os.path.isdir(blobs_dir) else ():
+        for name in os.listdir(os.path.join(blobs_dir, prefix)):
+            if name.endswith('.gc'):
+                # 이전 정리가 중간에 멈추며 남긴 파일 (지금 다른 정리가 쓰는 중일 수 있으므로 오래된 것만,
+                # 이름을 바꾸면 ctime이 갱신된다)
+                path = os.path.join(blobs_dir, prefix, name)
+                if os.stat(path).st_ctime < expire_before.replace(tzinfo=timezone.utc).timestamp():
+                    os.remove(path)
+                    removed += 1
+            else:
+                hashes.append(name)
+    return removed + remove_files(hashes, set(upload_ids))
@@ -0,0 +1,200 @@
+"""
+소켓 이벤트 방송 (소켓별 마이크로 배치)
+emit(event, data, room=room)은 이벤트마다 받는 소켓 수만큼 프레임을 보낸다.
+broadcaster.emit()은 받을 소켓마다 이벤트를 모아 두었다가 BROADCAST_BATCH_WINDOW(기본 5ms)마다
+소켓당 프레임 하나로 보낸다. 모인 이벤트가 하나면 원래 이벤트 그대로, 여러 개면
+'batch' 이벤트에 [[event, data], ...] 목록으로 보내며, 같은 목록을 받는 소켓들은 묶어서 한 번만 인코딩한다.
+
+- typing_state, user_status_changed처럼 최신 값만 의미 있는 이벤트는 대기 중인 같은 키의 이벤트를 바꾼다
+- 소켓별 대기 이벤트 수(Engine.IO가 아직 보내지 못한 패킷 포함)는 BROADCAST_MAX_PENDING개로 제한한다.
+  넘치면 버려도 되는 이벤트(타이핑/상태 알림)부터 버리고, 버릴 수 없는 이벤트가 넘치면
+  너무 뒤처진 소비자로 보고 연결을 끊는다 (클라이언트는 재연결 후 resume으로 따라잡는다)
+
+MessagePack을 요청한 연결에는 'batch' 데이터를 MessagePack 바이트로 보낸다 (app/chat/codec.py).
+
+BROADCAST_BATCHING=false이면 기존처럼 바로 emit한다. 대기열은 프로세스마다 따로 관리된다.
+"""
+
+import threading
+
+from app import socketio
+from app.chat import codec as socket_codec
+from app.chat.sessions import socket_sessions
+
+# 대기 중인 이벤트를 최신 값으로 바꾸는 이벤트 -> 키로 쓰는 데이터 항목
+COALESCE_KEYS = {
+    'typing_state': 'room',
+    'user_status_changed': 'username',
+}
+# 대기열이 넘칠 때 버려도 되는 이벤트
+DROPPABLE_EVENTS = frozenset(COALESCE_KEYS) | {'status', 'user_joined', 'user_left'}
+
+
+def _transport_backlog(eio_sid):
+    """Engine.IO 소켓 송신 큐에 남은 패킷 수 (느린 클라이언트일수록 커짐)"""
+    eio_socket = socketio.server.eio.sockets.get(eio_sid)
+    return eio_socket.queue.qsize() if eio_socket is not None else 0
+
+
+def _codec(sid):
+    session = socket_sessions.get(sid)
+    return session.codec if session is not None else 'json'
+
+
+class _Outbox:
+    __slots__ = ('frames', 'keys')
+
+    def __init__(self):
+        self.frames = []  # [event, data]
+        self.keys = {}  # (event, 키) -> frames 위치
+
+
+class Broadcaster:
+    def __init__(self, window=0.005, max_pending=256):
+        self.enabled = True
+        self.window = window
+        self.max_pending = max_pending
+        self._outboxes = {}  # sid -> _Outbox
+        self._slow = set()  # 연결을 끊을 sid
+        self._lock = threading.Lock()
+        self._wake = None
+        self._started = False
+        # 통계
+        self.events = 0
+        self.frames = 0
+        self.coalesced = 0
+        self.dropped = 0
+        self.disconnected = 0
+
+    def init_app(self, app):
+        self.enabled = app.config.get('BROADCAST_BATCHING', self.enabled)
+        self.window = app.config.get('BROADCAST_BATCH_WINDOW', self.window)
+        self.max_pending = app.config.get('BROADCAST_MAX_PENDING', self.max_pending)
+
+    def start(self):
+        """백그라운드 전송 작업 시작 (여러 번 호출해도 한 번만 실행)"""
+        from app.storage import async_primitives
+
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+            _, create_event, _, start_task = async_primitives()
+            self._wake = create_event()
+        start_task(self._run)
+
+    def emit(self, event, data, room=None, skip_sid=None):
+        """room(없으면 연결된 모든 소켓)에 이벤트 보내기 - skip_sid는 받지 않을 소켓"""
+        if not self.enabled:
+            socketio.emit(event, data, to=room, skip_sid=skip_sid)
+            return
+        if not self._started:
+            self.start()
+
+        manager = socketio.server.manager
+        if '/' not in manager.rooms:
+            return  # 연결된 소켓이 없음
+        key = (event, data.get(COALESCE_KEYS[event])) if event in COALESCE_KEYS else None
+        with self._lock:
+            self.events += 1
+            for sid, eio_sid in manager.get_participants('/', room):
+                if sid != skip_sid and sid not in self._slow:
+                    self._enqueue(sid, eio_sid, event, data, key)
+        self._wake.set()
+
+    def _enqueue(self, sid, eio_sid, event, data, key):
+        outbox = self._outboxes.get(sid)
+        if outbox is None:
+            outbox = self._outboxes[sid] = _Outbox()
+        elif key is not None and key in outbox.keys:
+            outbox.frames[outbox.keys[key]][1] = data
+            self.coalesced += 1
+            return
+
+        if len(outbox.frames) + _transport_backlog(eio_sid) >= self.max_pending:
+            if event in DROPPABLE_EVENTS:
+                self.dropped += 1
+                return
+            # 대기 중인 버려도 되는 이벤트를 빼서 자리를 만든다
+            for index, (pending, _) in enumerate(outbox.frames):
+                if pending in DROPPABLE_EVENTS:
+                    del outbox.frames[index]
+                    outbox.keys = {k: i - (i > index) for k, i in outbox.keys.items() if i != index}
+                    self.dropped += 1
+                    break
+            else:
+                self._outboxes.pop(sid)
+                self._slow.add(sid)
+                return
+
+        if key is not None:
+            outbox.keys[key] = len(outbox.frames)
+        outbox.frames.append([event, data])
+
+    def discard(self, sid):
+        """연결이 끊긴 소켓의 대기열 제거"""
+        with self._lock:
+            self._outboxes.pop(sid, None)
+            self._slow.discard(sid)
+
+    def flush(self):
+        with self._lock:
+            outboxes, self._outboxes = self._outboxes, {}
+            slow, self._slow = self._slow, set()
+
+        # 같은 이벤트 목록(같은 data 객체들)을 받는 소켓끼리 묶어 한 번에 보낸다
+        groups = {}
+        for sid, outbox in outboxes.items():
+            signature = tuple((event, id(data)) for event, data in outbox.frames)
+            group = groups.get(signature)
+            if group is None:
+                groups[signature] = (outbox.frames, [sid])
+            else:
+                group[1].append(sid)
+
+        for frames, sids in groups.values():
+            binary = [sid for sid in sids if _codec(sid) == 'msgpack']
+            if binary:
+                socketio.emit('batch', socket_codec.pack_frames(frames), to=binary)
+                self.frames += len(binary)
+                if len(binary) == len(sids):
+                    continue
+                binary = set(binary)
+                sids = [sid for sid in sids if sid not in binary]
+            if len(frames) == 1:
+                socketio.emit(frames[0][0], frames[0][1], to=sids)
+            else:
+                socketio.emit('batch', frames, to=sids)
+            self.frames += len(sids)
+
+        for sid in slow:
+            self.disconnected += 1
+            print(f'느린 소켓 연결 종료: {sid}')
+            socketio.server.disconnect(sid, namespace='/')
+
+    def _run(self):
+        while True:
+            self._wake.wait()
+            self._wake.clear()
+            socketio.sleep(self.window)
+            try:
+                self.flush()
+            except Exception as e:
+                print(f'소켓 이벤트 전송 오류: {e}')
+
+    def stats(self):
+        return {
+            'pending': sum(len(outbox.frames) for outbox in list(self._outboxes.values())),
+            'events': self.events,
+            'frames': self.frames,
+            'coalesced': self.coalesced,
+            'dropped': self.dropped,
+            'disconnected': self.disconnected,
+        }
+
+
+broadcaster = Broadcaster()
+
+
+def init_broadcaster(app):
+    broadcaster.init_app(app)
@@ -0,0 +1,59 @@
+"""
+소켓 이벤트 바이너리 인코딩 (선택 사항, `pip install msgpack`)
+Socket.IO 패킷 형식은 그대로 JSON을 쓰고, 연결할 때 auth.codec='msgpack'을 보낸 클라이언트에게만
+방송 이벤트 묶음을 MessagePack 바이트 하나로 만들어 Socket.IO 바이너리 첨부로 보낸다
+('batch' 이벤트의 데이터가 [[event, data], ...] 대신 ArrayBuffer).
+- 암호화된 메시지 본문(base64 문자열)은 원래 바이트로 넣어 base64로 늘어난 크기와 디코딩 비용을 없앤다
+- msgpack이 없거나 SOCKET_BINARY_CODEC=false이면 요청과 상관없이 JSON으로 보낸다
+  (클라이언트는 'batch' 데이터가 배열인지 바이트인지로 구분하므로 따로 응답하지 않는다)
+클라이언트가 보낸 message 이벤트의 content가 바이트이면 base64 문자열로 바꿔 저장한다.
+"""
+
+import base64
+import binascii
+
+try:
+    import msgpack
+except ImportError:  # 선택 의존성
+    msgpack = None
+
+# 암호화된 content를 바이트로 보내는 이벤트
+BINARY_CONTENT_EVENTS = frozenset({'message', 'message_updated'})
+
+
+def available(enabled=True):
+    """서버가 MessagePack 방송을 지원하는지 (클라이언트 라이브러리를 내려줄지 결정)"""
+    return bool(enabled) and msgpack is not None
+
+
+def negotiate(auth, enabled=True):
+    """연결 요청의 auth.codec -> 이 연결에 쓸 인코딩 ('msgpack' | 'json')"""
+    if available(enabled) and (auth or {}).get('codec') == 'msgpack':
+        return 'msgpack'
+    return 'json'
+
+
+def _raw_content(payload):
+    """암호화된 메시지/수정 페이로드의 base64 content -> 바이트 (답글 미리보기는 잘린 값이라 그대로 둔다)"""
+    content = payload.get('content')
+    if not payload.get('is_encrypted') or not isinstance(content, str):
+        return payload
+    try:
+        return {**payload, 'content': base64.b64decode(content, validate=True)}
+    except (binascii.Error, ValueError):
+        return payload
+
+
+def pack_frames(frames):
+    """[[event, data], ...] -> MessagePack 바이트"""
+    return msgpack.packb(
+        [[event, _raw_content(data) if event in BINARY_CONTENT_EVENTS else data] for event, data in frames],
+        use_bin_type=True
+    )
+
+
+def text_content(content):
+    """클라이언트가 보낸 content (바이트면 base64 문자열로)"""
+    if isinstance(content, (bytes, bytearray)):
+        return base64.b64encode(content).decode('ascii')
+    return content
@@ -0,0 +1,117 @@
+"""
+1:1 대화 색인
+두 사용자 사이의 1:1 채팅방을 (작은 user id, 큰 user id) 유일 키로 바로 찾고, 대화 목록(마지막 활동 순)과
+읽지 않은 메시지 수를 메시지 테이블을 훑지 않고 conversation 행에서 읽는다.
+메시지 자체는 기존처럼 1:1 채팅방(Message, 그룹 키로 암호화)에 저장된다.
+- 메시지를 저장할 때 record_message로 마지막 활동 시각과 받는 사람의 읽지 않은 수를 같은 트랜잭션에서 갱신
+- 방의 메시지 목록을 읽으면 mark_read로 읽은 사람의 수를 0으로
+- 한 명이라도 방을 나가거나 방이 삭제되면 unlink로 색인에서 뺀다 (다음 대화 때 새 방을 만든다)
+"""
+
+import heapq
+
+from app.models import Conversation, db
+
+
+def user_pair(user_id, other_id):
+    """정규화된 (작은 id, 큰 id)"""
+    return (user_id, other_id) if user_id < other_id else (other_id, user_id)
+
+
+def find(user_id, other_id):
+    low, high = user_pair(user_id, other_id)
+    return db.session.execute(
+        db.select(Conversation).where(Conversation.user_low_id == low, Conversation.user_high_id == high)
+    ).scalar_one_or_none()
+
+
+def link(room_id, user_id, other_id, last_activity=None):
+    """새 1:1 채팅방을 대화로 등록 (커밋은 호출한 쪽, 같은 쌍이 이미 있으면 커밋할 때 IntegrityError)"""
+    low, high = user_pair(user_id, other_id)
+    conversation = Conversation(user_low_id=low, user_high_id=high, room_id=room_id)
+    if last_activity is not None:
+        conversation.last_activity = last_activity
+    db.session.add(conversation)
+    return conversation
+
+
+def unlink(room_id):
+    db.session.execute(Conversation.__table__.delete().where(Conversation.room_id == room_id))
+
+
+def record_message(room_id, sender_id, message_id, timestamp):
+    """방이 1:1 대화면 마지막 활동을 갱신하고 받는 사람의 읽지 않은 수를 1 늘린다 (그룹 방은 갱신할 행이 없음)"""
+    db.session.execute(
+        Conversation.__table__.update().where(Conversation.room_id == room_id).values(
+            last_activity=timestamp,
+            last_message_id=message_id,
+            low_unread=Conversation.low_unread + db.case((Conversation.user_low_id != sender_id, 1), else_=0),
+            high_unread=Conversation.high_unread + db.case((Conversation.user_high_id != sender_id, 1), else_=0),
+        )
+    )
+
+
+def forget_unread(room_id, sender_id):
+    """읽지 않은 메시지가 삭제되면 받는 사람의 수를 1 줄인다"""
+    db.session.execute(
+        Conversation.__table__.update().where(Conversation.room_id == room_id).values(
+            low_unread=db.case(
+                (db.and_(Conversation.user_low_id != sender_id, Conversation.low_unread > 0),
+                 Conversation.low_unread - 1),
+                else_=Conversation.low_unread),
+            high_unread=db.case(
+                (db.and_(Conversation.user_high_id != sender_id, Conversation.high_unread > 0),
+                 Conversation.high_unread - 1),
+                else_=Conversation.high_unread),
+        )
+    )
+
+
+def mark_read(room_id, user_id):
+    """user_id가 방의 메시지를 모두 읽음 (커밋은 호출한 쪽)"""
+    db.session.execute(
+        Conversation.__table__.update().where(Conversation.room_id == room_id).values(
+            low_unread=db.case((Conversation.user_low_id == user_id, 0), else_=Conversation.low_unread),
+            high_unread=db.case((Conversation.user_high_id == user_id, 0), else_=Conversation.high_unread),
+        )
+    )
+
+
+def _side(user_id, mine, other, unread, before, limit):
+    query = db.select(
+        Conversation.id, Conversation.room_id, other.label('other_id'), unread.label('unread_count'),
+        Conversation.last_activity, Conversation.last_message_id
+    ).where(mine == user_id)
+    if before is not None:
+        query = query.where(db.tuple_(Conversation.last_activity, Conversation.id) < before)
+    return db.session.execute(
+        query.order_by(Conversation.last_activity.desc(), Conversation.id.desc()).limit(limit)
+    ).all()
+
+
+def list_for(user_id, limit, before=None):
+    """user_id의 대화 목록 (마지막 활동 역순, 같은 시각이면 id 역순)
+
+    before는 (last_activity, id) 키셋 커서로, 이 위치 이후(더 오래된) 대화만 돌려준다.
+    사용자가 쌍의 어느 쪽인지에 따라 (user_low_id, last_activity) / (user_high_id, last_activity)
+    인덱스를 각각 limit개씩 읽어 합친다.
+    """
+    low = _side(user_id, Conversation.user_low_id, Conversation.user_high_id, Conversation.low_unread,
+                before, limit)
+    high = _side(user_id, Conversation.user_high_id, Conversation.user_low_id, Conversation.high_unread,
+                 before, limit)
+    merged = heapq.merge(low, high, key=lambda row: (row.last_activity, row.id), reverse=True)
+    return [row for _, row in zip(range(limit), merged)]
+
+
+def unread_count(user_id):
+    """모든 1:1 대화의 읽지 않은 메시지 수 합계"""
+    low = db.session.execute(
+        db.select(db.func.coalesce(db.func.sum(Conversation.low_unread), 0))
+        .where(Conversation.user_low_id == user_id)
+    ).scalar()
+    high = db.session.execute(
+        db.select(db.func.coalesce(db.func.sum(Conversation.high_unread), 0))
+        .where(Conversation.user_high_id == user_id)
+    ).scalar()
+    return low + high
@@ -0,0 +1,269 @@
+"""
+최근 메시지 링 버퍼 (방별, 메모리)
+방마다 최근 메시지 페이로드(serialize_message_event 결과)를 seq 순서로 최대 MESSAGE_RING_SIZE개 보관한다.
+- handle_message가 방에 보낸 메시지가 채워 넣고, 버퍼가 없는 방은 첫 페이지 DB 조회 결과로 채운다(fill)
+- 메시지 목록 첫 페이지와 재연결(resume) 시 놓친 범위를 DB 대신 버퍼에서 응답한다
+- 메시지 수정/삭제는 버퍼 안의 페이로드와 답글 미리보기를 그 자리에서 바꾼다
+- 방의 전체 메시지 수(보관분 포함)도 함께 유지해 첫 페이지 응답에 COUNT 쿼리가 필요 없다
+  (seq는 방마다 빈틈없이 증가하므로 top이 늘어난 만큼 더하고, 삭제할 때 뺀다)
+
+버퍼는 [floor, top] 범위의 seq에 대해 "이 범위의 메시지는 전부 갖고 있다"를 보장하며,
+다른 경로로 저장되어 아직 받지 못한 seq는 gaps에 남긴다(삭제된 seq는 빈 자리로 두면 된다).
+응답할 범위에 gap이 있거나 top이 chat_room.last_seq와 다르거나, 버퍼를 만든 뒤 방의 메시지가
+수정/삭제되어 chat_room.version이 달라졌으면 None을 반환해 호출한 쪽이 DB 조회로 대체하게 한다.
+버퍼는 프로세스마다 따로 있으므로 다른 워커에서 일어난 수정/삭제는 version으로만 알 수 있다.
+
+메모리는 방 수(MESSAGE_RING_MAX_ROOMS)와 전체 페이로드 크기 추정치(MESSAGE_RING_MAX_BYTES)로 제한하며,
+넘으면 가장 오래 쓰지 않은 방부터 버린다.
+"""
+
+import threading
+from collections import Counter, OrderedDict, deque
+
+# 페이로드 하나의 고정 크기 추정치 (dict와 짧은 값들, 바이트)
+PAYLOAD_OVERHEAD = 600
+
+
+def _payload_size(payload):
+    size = PAYLOAD_OVERHEAD + len(payload.get('content') or '')
+    reply_to = payload.get('reply_to')
+    if reply_to:
+        size += len(reply_to.get('content') or '')
+    return size
+
+
+class _RoomBuffer:
+    __slots__ = ('entries', 'floor', 'top', 'gaps', 'exhausted', 'size', 'version', 'total')
+
+    def __init__(self, floor, top, exhausted=False, version=None, total=None):
+        self.entries = deque()  # 페이로드 (seq 오름차순)
+        self.floor = floor  # 이 seq부터 top까지는 gaps를 빼고 모두 entries에 있음
+        self.top = top
+        self.gaps = set()  # 범위 안에서 아직 받지 못한 seq
+        self.exhausted = exhausted  # floor보다 오래된 메시지가 없음 (방의 전체 기록)
+        self.size = 0
+        self.version = version  # 버퍼 내용이 반영하는 chat_room.version (None이면 모름 - DB로 채우기 전)
+        self.total = total  # top까지의 방 전체 메시지 수 (보관된 메시지 포함, None이면 모름)
+
+    def boundary(self):
+        """이 seq보다 큰 메시지는 빠짐없이 있음"""
+        return max(self.gaps) if self.gaps else self.floor - 1
+
+
+class MessageRing:
+    def __init__(self, per_room=200, max_rooms=1000, max_bytes=64 * 1024 * 1024):
+        self.per_room = per_room
+        self.max_rooms = max_rooms
+        self.max_bytes = max_bytes
+        self._rooms = OrderedDict()  # room_id -> _RoomBuffer (오래 쓰지 않은 방이 앞)
+        self._size = 0
+        self._generation = 0  # 수정/삭제할 때마다 증가 (fill 도중 바뀐 내용을 덮어쓰지 않기 위함)
+        self._lock = threading.Lock()
+        self.hits = Counter()  # 'page' | 'resume' -> 버퍼에서 응답한 횟수
+        self.misses = Counter()
+
+    def init_app(self, app):
+        self.per_room = app.config.get('MESSAGE_RING_SIZE', self.per_room)
+        self.max_rooms = app.config.get('MESSAGE_RING_MAX_ROOMS', self.max_rooms)
+        self.max_bytes = app.config.get('MESSAGE_RING_MAX_BYTES', self.max_bytes)
+
+    # -- 채우기 ------------------------------------------------------------
+
+    def append(self, room_id, payload):
+        """방에 보낸 메시지 페이로드 추가 (payload['seq'] 필수)"""
+        seq = payload['seq']
+        with self._lock:
+            buffer = self._rooms.get(room_id)
+            if buffer is None or seq - buffer.top > self.per_room:
+                # 처음 보는 방이거나 그 사이 메시지를 너무 많이 놓쳤으면 이 메시지부터 새로 시작
+                # (수정/삭제 버전을 모르므로 DB로 채우기 전까지는 응답에 쓰지 않음)
+                self._drop(room_id)
+                buffer = self._rooms[room_id] = _RoomBuffer(seq, seq - 1)
+            else:
+                self._rooms.move_to_end(room_id)
+            self._insert(buffer, payload)
+            self._evict()
+
+    def fill(self, room_id, payloads, latest_seq, version, total, exhausted, generation):
+        """DB에서 읽은 최근 메시지(seq 오름차순)로 방 버퍼를 다시 만든다
+
+        latest_seq/version은 메시지보다 먼저 읽은 chat_room.last_seq/version, total은 그 시점의 전체 메시지 수,
+        exhausted는 이보다 오래된 메시지가 없는지 여부.
+        generation은 조회 전에 읽은 self.generation() 값이며, 그 사이 수정/삭제가 있었으면 채우지 않는다.
+        """
+        payloads = payloads[-self.per_room:]
+        with self._lock:
+            if generation != self._generation:
+                return
+            old = self._drop(room_id)
+            buffer = self._rooms[room_id] = _RoomBuffer(
+                payloads[0]['seq'] if payloads else latest_seq + 1, latest_seq,
+                exhausted and len(payloads) < self.per_room, version, total
+            )
+            for payload in payloads:
+                buffer.entries.append(payload)
+                buffer.size += _payload_size(payload)
+            self._size += buffer.size
+            # 조회 이후 도착한 메시지는 그대로 이어 붙인다 (사이에 빠진 seq는 gaps로 남음)
+            if old is not None:
+                for payload in old.entries:
+                    if payload['seq'] > latest_seq:
+                        self._insert(buffer, payload)
+            self._evict()
+
+    def _insert(self, buffer, payload):
+        seq = payload['seq']
+        if seq > buffer.top:
+            buffer.gaps.update(range(buffer.top + 1, seq))
+            if buffer.total is not None:
+                buffer.total += seq - buffer.top  # 빈 seq도 다른 경로로 저장된 메시지
+            buffer.top = seq
+            buffer.entries.append(payload)
+        elif seq in buffer.gaps:
+            # 동시에 처리된 메시지는 순서가 바뀌어 들어올 수 있으므로 seq 위치에 끼워 넣는다
+            buffer.gaps.discard(seq)
+            index = len(buffer.entries)
+            while index > 0 and buffer.entries[index - 1]['seq'] > seq:
+                index -= 1
+            buffer.entries.insert(index, payload)
+        else:
+            return  # 범위 밖(더 오래된) 메시지이거나 이미 있는 메시지
+        size = _payload_size(payload)
+        buffer.size += size
+        self._size += size
+
+        while len(buffer.entries) > self.per_room:
+            removed = buffer.entries.popleft()
+            size = _payload_size(removed)
+            buffer.size -= size
+            self._size -= size
+            buffer.floor = removed['seq'] + 1
+            buffer.exhausted = False
+            buffer.gaps = {gap for gap in buffer.gaps if gap >= buffer.floor}
+
+    def _drop(self, room_id):
+        buffer = self._rooms.pop(room_id, None)
+        if buffer is not None:
+            self._size -= buffer.size
+        return buffer
+
+    def _evict(self):
+        """방 수/메모리 한도를 넘으면 가장 오래 쓰지 않은 방부터 제거"""
+        while len(self._rooms) > self.max_rooms or (self._size > self.max_bytes and len(self._rooms) > 1):
+            _, buffer = self._rooms.popitem(last=False)
+            self._size -= buffer.size
+
+    # -- 읽기 --------------------------------------------------------------
+
+    def latest(self, room_id, count, latest_seq, version):
+        """(최근 count개 메시지(seq 오름차순), 방 전체 메시지 수) - 버퍼만으로 응답할 수 없으면 None"""
+        with self._lock:
+            buffer = self._rooms.get(room_id)
+            result = None
+            if self._current(buffer, latest_seq, version) and buffer.total is not None and count <= self.per_room:
+                boundary = buffer.boundary()
+                available = 0
+                for payload in reversed(buffer.entries):
+                    if payload['seq'] <= boundary or available == count:
+                        break
+                    available += 1
+                if available == count or (available == len(buffer.entries) and buffer.exhausted
+                                          and not buffer.gaps):
+                    result = list(buffer.entries)[len(buffer.entries) - available:], buffer.total
+                    self._rooms.move_to_end(room_id)
+            self._count('page', result)
+            return result
+
+    def since(self, room_id, last_seq, latest_seq, version):
+        """last_seq 이후 latest_seq까지의 메시지 - 버퍼에 빠짐없이 있을 때만 목록, 아니면 None"""
+        if last_seq >= latest_seq:
+            return []
+        with self._lock:
+            buffer = self._rooms.get(room_id)
+            result = None
+            if (self._current(buffer, latest_seq, version) and last_seq >= buffer.boundary()
+                    and (last_seq + 1 >= buffer.floor or buffer.exhausted)):
+                result = [payload for payload in buffer.entries if payload['seq'] > last_seq]
+                self._rooms.move_to_end(room_id)
+            self._count('resume', result)
+            return result
+
+    @staticmethod
+    def _current(buffer, latest_seq, version):
+        """버퍼가 DB의 방 상태(마지막 seq, 수정/삭제 버전)와 같은지"""
+        return buffer is not None and buffer.top == latest_seq and buffer.version == version
+
+    def _count(self, kind, result):
+        if result is None:
+            self.misses[kind] += 1
+        else:
+            self.hits[kind] += 1
+
+    # -- 수정/삭제 ---------------------------------------------------------
+
+    def generation(self):
+        return self._generation
+
+    def update(self, room_id, message_id, version, changes, reply_changes):
+        """메시지 페이로드를 바꾸고, 이 메시지를 가리키는 답글 미리보기에 reply_changes를 반영
+
+        version은 수정과 같은 트랜잭션에서 올린 chat_room.version이다.
+        """
+        self._rewrite(room_id, message_id, version, changes, reply_changes)
+
+    def remove(self, room_id, message_id, version):
+        """메시지를 버퍼에서 빼고, 이 메시지에 단 답글의 원본 참조를 지운다 (DB의 reply_to_id도 NULL이 됨)"""
+        self._rewrite(room_id, message_id, version, None, None)
+
+    def _rewrite(self, room_id, message_id, version, changes, reply_changes):
+        # 이미 응답에 쓰인 dict는 건드리지 않도록 바뀐 페이로드는 새 dict로 교체한다
+        with self._lock:
+            self._generation += 1
+            buffer = self._rooms.get(room_id)
+            if buffer is None:
+                return
+            if buffer.version is None or buffer.version != version - 1:
+                # 다른 워커의 수정/삭제를 반영하지 못한 버퍼는 고쳐도 맞지 않으므로 버린다
+                self._drop(room_id)
+                return
+            buffer.version = version
+            if changes is None and buffer.total is not None:
+                buffer.total -= 1
+            entries = deque()
+            size = 0
+            for payload in buffer.entries:
+                if payload['id'] == message_id:
+                    if changes is None:
+                        continue
+                    payload = {**payload, **changes}
+                reply_to = payload.get('reply_to')
+                if payload.get('reply_to_id') == message_id:
+                    if changes is None:
+                        payload = {**payload, 'reply_to_id': None, 'reply_to': None}
+                    elif reply_to:
+                        payload = {**payload, 'reply_to': {**reply_to, **reply_changes}}
+                entries.append(payload)
+                size += _payload_size(payload)
+            buffer.entries = entries
+            self._size += size - buffer.size
+            buffer.size = size
+
+    def discard(self, room_id):
+        with self._lock:
+            self._drop(room_id)
+
+    def stats(self):
+        return {
+            'rooms': len(self._rooms),
+            'messages': sum(len(buffer.entries) for buffer in list(self._rooms.values())),
+            'bytes': self._size,
+            'hits': dict(self.hits),
+            'misses': dict(self.misses),
+        }
+
+
+message_ring = MessageRing()
+
+
+def init_message_ring(app):
+    message_ring.init_app(app)
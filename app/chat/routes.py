@@ -1,18 +1,125 @@
-from flask import Blueprint, request, jsonify, render_template
+from flask import Blueprint, current_app, request, jsonify, render_template, send_file
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from flask_socketio import emit, join_room, leave_room, rooms
 from app import socketio
-from app.models import ChatRoom, Message, User, UserActivity, UserGroupKey, db
-from app.crypto import MessageCrypto, GroupCrypto
-from datetime import datetime
+from app.models import Attachment, AttachmentUpload, ChatRoom, Message, User, UserGroupKey, db, room_participants
+from app.calendar.notifications import notification_scheduler, user_room
+from app.storage import write_queue
+from app.activity import activity_log
+from app.routing import read_replica
+from app.conditional import conditional
+from app.serialization import compile_serializer, object_response
+from app.chat import archive as message_archive
+from app.chat import attachments
+from app.chat import codec as socket_codec
+from app.chat import conversations
+from app.chat import search as message_search
+from app.chat.ring import message_ring
+from app.chat.broadcast import broadcaster
+from app.chat.sessions import room_id_from, socket_sessions
+from app.chat.typing import typing_aggregator
+import os
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from itertools import chain
+from operator import attrgetter
 from sqlalchemy import or_, and_
+from sqlalchemy.exc import IntegrityError
 
 chat_bp = Blueprint('chat', __name__)
 
+# 메시지 목록 응답의 컬럼 순서 (보관된 메시지도 같은 순서의 튜플로 변환)
+MESSAGE_FIELDS = (
+    ('id', 'raw'), ('content', 'raw'), ('message_type', 'raw'), ('timestamp', 'datetime'),
+    ('user_id', 'raw'), ('is_edited', 'raw'), ('edited_at', 'datetime'), ('reply_to_id', 'raw'),
+    ('is_encrypted', 'raw'), ('seq', 'raw'), ('file_url', 'raw'), ('file_name', 'raw'),
+)
+MESSAGE_KEYS = tuple(key for key, _ in MESSAGE_FIELDS)
+MESSAGE_COLUMNS = tuple(getattr(Message, key) for key in MESSAGE_KEYS)
+MESSAGE_USER_ID = MESSAGE_KEYS.index('user_id')
+MESSAGE_REPLY_TO = MESSAGE_KEYS.index('reply_to_id')
+MESSAGE_IS_ENCRYPTED = MESSAGE_KEYS.index('is_encrypted')
+MESSAGE_SEQ = MESSAGE_KEYS.index('seq')
+_message_tuple = attrgetter(*MESSAGE_KEYS)
+serialize_message = compile_serializer(MESSAGE_FIELDS + (('username', 'raw'), ('reply_to', 'raw')),
+                                       name='serialize_message')
+# 소켓 이벤트/링 버퍼용 (datetime을 항상 문자열로)
+serialize_message_event = compile_serializer(MESSAGE_FIELDS + (('username', 'raw'), ('reply_to', 'raw')),
+                                             name='serialize_message_event', portable=True)
+
+# 답글 미리보기에 보여 주는 원본 내용 길이
+REPLY_PREVIEW_LENGTH = 100
+# resume 한 번에 돌려주는 최대 메시지 수 (넘으면 클라이언트가 목록을 새로 읽음)
+RESUME_MAX_MESSAGES = 500
+# 이 시간 안에 활동한 참가자를 온라인으로 본다
+ONLINE_WINDOW = timedelta(minutes=5)
+# (room_id, user_id) -> 이 워커에서 읽음 처리를 마친 chat_room.last_seq (오래 쓰지 않은 항목부터 제거)
+READ_CURSORS_MAX = 10000
+_read_cursors = OrderedDict()
+_read_cursors_lock = threading.Lock()
+
 @chat_bp.route('/chat')
 @jwt_required()
 def chat_view():
-    return render_template('chat.html')
+    # 서버가 MessagePack을 보내지 않으면 클라이언트도 디코더를 받지 않고 JSON을 요청한다
+    msgpack_js = None
+    integrity = current_app.config.get('MSGPACK_JS_INTEGRITY')
+    if integrity and socket_codec.available(current_app.config.get('SOCKET_BINARY_CODEC', True)):
+        msgpack_js = {'src': current_app.config['MSGPACK_JS_URL'], 'integrity': integrity}
+    return render_template('chat.html', msgpack_js=msgpack_js)
+
+def create_room_record(user_id, name, participants=(), description='', is_group=False, is_private=False,
+                       is_encrypted=True):
+    """채팅방을 만들고 참가자에게 그룹 키를 분배 (커밋은 호출한 쪽)
+
+    참가자가 정확히 두 명인 비공개 1:1 방은 대화 색인(app/chat/conversations.py)에도 등록한다.
+    """
+    # 그룹 암호화 키 생성 (순수 바이트, 암호화 백엔드는 필요할 때 로드)
+    from app.crypto import GroupCrypto
+    group_key_bytes = GroupCrypto.generate_group_key()
+    
+    room = ChatRoom(
+        name=name, 
+        description=description,
+        is_group=is_group,
+        is_private=is_private,
+        created_by=user_id,
+        # DB 저장은 Base64 인코딩된 문자열로
+        encryption_key=__import__('base64').b64encode(group_key_bytes).decode('utf-8'),
+        is_encrypted=is_encrypted
+    )
+    db.session.add(room)
+    db.session.flush()  # room.id를 얻기 위해
+    
+    # 방 생성자를 참가자로 추가
+    user = User.query.get(user_id)
+    room.participants.append(user)
+    
+    # 다른 참가자들 추가
+    for username in participants:
+        participant = User.query.filter_by(username=username).first()
+        if participant and participant not in room.participants:
+            room.participants.append(participant)
+    
+    # 모든 참가자들에게 그룹 키 분배
+    if room.is_encrypted:
+        for participant in room.participants:
+            if participant.public_key:
+                encrypted_key_b64 = GroupCrypto.encrypt_group_key_for_user(
+                    group_key_bytes, # 순수 바이트 키를 암호화
+                    participant.public_key
+                )
+                user_group_key = UserGroupKey(
+                    user_id=participant.id,
+                    room_id=room.id,
+                    encrypted_group_key=encrypted_key_b64
+                )
+                db.session.add(user_group_key)
+    
+    if not is_group and is_private and len(room.participants) == 2:
+        conversations.link(room.id, *(participant.id for participant in room.participants))
+    return room
 
 @chat_bp.route('/api/chat/rooms', methods=['POST'])
 @jwt_required()
@@ -27,68 +134,22 @@ def create_room():
         
         # 1:1 채팅방인 경우 기존 방 확인
         if not is_group and len(participants) == 1:
-            other_username = participants[0]
-            other_user = User.query.filter_by(username=other_username).first()
-            
-            if other_user:
-                # 기존 1:1 채팅방 확인
-                existing_room = ChatRoom.query.filter(
-                    ChatRoom.is_group == False,
-                    ChatRoom.is_private == True,
-                    ChatRoom.participants.any(User.id == user_id),
-                    ChatRoom.participants.any(User.id == other_user.id)
-                ).first()
-                
-                if existing_room:
-                    return jsonify({
-                        'message': '기존 채팅방을 사용합니다.',
-                        'room_id': existing_room.id,
-                        'room_name': existing_room.name,
-                        'is_encrypted': existing_room.is_encrypted
-                    }), 200
-        
-        # 그룹 암호화 키 생성 (순수 바이트)
-        group_key_bytes = GroupCrypto.generate_group_key()
-        
-        room = ChatRoom(
-            name=data['name'], 
-            description=data.get('description', ''),
-            is_group=is_group,
-            is_private=is_private,
-            created_by=user_id,
-            # DB 저장은 Base64 인코딩된 문자열로
-            encryption_key=__import__('base64').b64encode(group_key_bytes).decode('utf-8'),
-            is_encrypted=data.get('is_encrypted', True)
-        )
-        db.session.add(room)
-        db.session.flush()  # room.id를 얻기 위해
+            other_user = User.query.filter_by(username=participants[0]).first()
+            existing = _existing_private_room(user_id, other_user) if other_user else None
+            if existing:
+                return existing
         
-        # 방 생성자를 참가자로 추가
-        user = User.query.get(user_id)
-        room.participants.append(user)
-        
-        # 다른 참가자들 추가
-        for username in participants:
-            participant = User.query.filter_by(username=username).first()
-            if participant and participant not in room.participants:
-                room.participants.append(participant)
-        
-        # 모든 참가자들에게 그룹 키 분배
-        if room.is_encrypted:
-            for participant in room.participants:
-                if participant.public_key:
-                    encrypted_key_b64 = GroupCrypto.encrypt_group_key_for_user(
-                        group_key_bytes, # 순수 바이트 키를 암호화
-                        participant.public_key
-                    )
-                    user_group_key = UserGroupKey(
-                        user_id=participant.id,
-                        room_id=room.id,
-                        encrypted_group_key=encrypted_key_b64
-                    )
-                    db.session.add(user_group_key)
-        
-        db.session.commit()
+        room = create_room_record(user_id, data['name'], participants, data.get('description', ''),
+                                  is_group, is_private, data.get('is_encrypted', True))
+        try:
+            db.session.commit()
+        except IntegrityError:
+            # 같은 두 사용자가 동시에 1:1 방을 만들면 먼저 만들어진 방을 사용
+            db.session.rollback()
+            existing = _existing_private_room(user_id, User.query.filter_by(username=participants[0]).first())
+            if existing:
+                return existing
+            raise
         
         return jsonify({
             'message': '채팅방이 생성되었습니다.', 
@@ -101,11 +162,56 @@ def create_room():
         db.session.rollback()
         return jsonify({'error': f'채팅방 생성 중 오류가 발생했습니다: {str(e)}'}), 500
 
+def _existing_private_room(user_id, other_user):
+    """두 사용자의 기존 1:1 채팅방 응답 (없으면 None)"""
+    conversation = conversations.find(user_id, other_user.id) if other_user.id != user_id else None
+    if conversation is None:
+        return None
+    room = db.session.get(ChatRoom, conversation.room_id)
+    return jsonify({
+        'message': '기존 채팅방을 사용합니다.',
+        'room_id': room.id,
+        'room_name': room.name,
+        'is_encrypted': room.is_encrypted
+    }), 200
+
+def _rooms_validator():
+    """채팅방 목록 ETag 검증 값 - 방마다 마지막 메시지, 읽지 않은 수, 참가자/온라인 수"""
+    user_id = int(get_jwt_identity())
+    online_since = datetime.utcnow() - ONLINE_WINDOW
+    my_rooms = db.select(room_participants.c.chat_room_id).where(room_participants.c.user_id == user_id)
+    last_message = (db.select(Message.id, Message.edited_at)
+                    .where(Message.room_id == ChatRoom.id)
+                    .order_by(Message.timestamp.desc())
+                    .limit(1))
+    participants = db.select(db.func.count()).select_from(room_participants).where(
+        room_participants.c.chat_room_id == ChatRoom.id)
+
+    rows = db.session.execute(
+        db.select(
+            ChatRoom.id, ChatRoom.name, ChatRoom.description, ChatRoom.last_activity,
+            last_message.with_only_columns(Message.id).scalar_subquery(),
+            last_message.with_only_columns(Message.edited_at).scalar_subquery(),
+            db.select(db.func.count()).where(
+                Message.room_id == ChatRoom.id, Message.user_id != user_id, Message.is_read == False
+            ).scalar_subquery(),
+            participants.scalar_subquery(),
+            participants.join(User, User.id == room_participants.c.user_id)
+            .where(User.last_seen >= online_since).scalar_subquery())
+        .where(ChatRoom.id.in_(my_rooms))
+        .order_by(ChatRoom.id)
+    ).all()
+    last_modified = max((row.last_activity for row in rows if row.last_activity), default=None)
+    return (user_id, [tuple(row) for row in rows]), last_modified
+
 @chat_bp.route('/api/chat/rooms', methods=['GET'])
 @jwt_required()
+@read_replica
+@conditional(_rooms_validator)
 def get_rooms():
     user_id = int(get_jwt_identity())
     user = User.query.get(user_id)
+    online_since = datetime.utcnow() - ONLINE_WINDOW
     
     rooms = []
     for room in user.chat_rooms:
@@ -121,7 +227,7 @@ def get_rooms():
         
         # 온라인 참가자 수 계산 (실제 구현에서는 Redis 등을 사용)
         online_count = len([p for p in room.participants if p.last_seen and 
-                           (datetime.utcnow() - p.last_seen).seconds < 300])  # 5분 이내
+                           p.last_seen >= online_since])  # 5분 이내
         
         rooms.append({
             'id': room.id,
@@ -144,83 +250,188 @@ def get_rooms():
     
     return jsonify(rooms)
 
+def _reply_preview(content):
+    if len(content) > REPLY_PREVIEW_LENGTH:
+        return content[:REPLY_PREVIEW_LENGTH] + '...'
+    return content
+
+def _message_rows(room_id, items, usernames=None):
+    """메시지 튜플 목록에 작성자 이름과 답글 원본을 붙인 행 목록 (serialize_message 입력)
+
+    답글 원본과 작성자 이름은 한 번에 조회하며, usernames로 이미 아는 이름을 넘기면 조회하지 않는다.
+    """
+    # 답글 원본을 한 번에 조회 (DB에 없으면 보관된 메시지에서)
+    reply_ids = {item[MESSAGE_REPLY_TO] for item in items if item[MESSAGE_REPLY_TO]}
+    replies = {row[0]: tuple(row) for row in db.session.execute(
+        db.select(*MESSAGE_COLUMNS).where(Message.id.in_(reply_ids))
+    )} if reply_ids else {}
+    for reply_id in reply_ids - replies.keys():
+        record = message_archive.find_archived(room_id, reply_id)
+        if record:
+            replies[reply_id] = _message_tuple(record)
+    
+    # 작성자 이름을 한 번에 조회
+    usernames = dict(usernames or {})
+    user_ids = {item[MESSAGE_USER_ID] for item in chain(items, replies.values())} - usernames.keys()
+    if user_ids:
+        usernames.update(db.session.execute(
+            db.select(User.id, User.username).where(User.id.in_(user_ids))
+        ).all())
+    
+    rows = []
+    for item in items:
+        reply_to = replies.get(item[MESSAGE_REPLY_TO]) if item[MESSAGE_REPLY_TO] else None
+        if reply_to:
+            reply_to = {
+                'id': reply_to[MESSAGE_KEYS.index('id')],
+                'content': _reply_preview(reply_to[MESSAGE_KEYS.index('content')]),
+                'username': usernames.get(reply_to[MESSAGE_USER_ID]),
+                'is_encrypted': reply_to[MESSAGE_IS_ENCRYPTED]
+            }
+        rows.append(item + (usernames.get(item[MESSAGE_USER_ID]), reply_to))
+    return rows
+
+def _message_event(room_id, item, user_id, username):
+    """새 메시지 튜플 -> 소켓 이벤트 페이로드 (최근 메시지 링 버퍼에도 추가)"""
+    row, = _message_rows(room_id, [item], {user_id: username})
+    payload = serialize_message_event(row)
+    message_ring.append(room_id, payload)
+    return payload
+
+def _mark_room_read(room_id, user_id, last_seq):
+    """user_id가 방의 메시지를 last_seq까지 읽음 - 이 워커에서 이미 처리했으면 쓰기 없이 넘어간다
+
+    다른 사람이 보낸 메시지는 last_seq를 올리므로, 커서가 last_seq와 같으면 읽지 않은 메시지가 없다.
+    """
+    key = (room_id, user_id)
+    with _read_cursors_lock:
+        if _read_cursors.get(key) == last_seq:
+            _read_cursors.move_to_end(key)
+            return
+
+    Message.query.filter(
+        Message.room_id == room_id,
+        Message.user_id != user_id,
+        Message.is_read == False
+    ).update({'is_read': True})
+    conversations.mark_read(room_id, user_id)
+    db.session.commit()
+
+    with _read_cursors_lock:
+        _read_cursors[key] = last_seq
+        _read_cursors.move_to_end(key)
+        while len(_read_cursors) > READ_CURSORS_MAX:
+            _read_cursors.popitem(last=False)
+
 @chat_bp.route('/api/chat/rooms/<int:room_id>/messages', methods=['GET'])
 @jwt_required()
+@read_replica
 def get_messages(room_id):
     user_id = int(get_jwt_identity())
     
-    # 사용자가 이 방의 참가자인지 확인
-    room = ChatRoom.query.get(room_id)
-    user = User.query.get(user_id)
+    # 방 상태와 참가 여부를 한 번에 확인 (기본키 조회 + 참가자 기본키 조회)
+    room = db.session.execute(
+        db.select(ChatRoom.last_seq, ChatRoom.version)
+        .join(room_participants, room_participants.c.chat_room_id == ChatRoom.id)
+        .where(ChatRoom.id == room_id, room_participants.c.user_id == user_id)
+    ).first()
     
-    if not room or user not in room.participants:
+    if room is None:
         return jsonify({'error': '접근 권한이 없습니다.'}), 403
     
     # 페이지네이션 파라미터
     page = request.args.get('page', 1, type=int)
     per_page = request.args.get('per_page', 50, type=int)
     
-    messages_query = Message.query.filter_by(room_id=room_id).order_by(Message.timestamp.desc())
-    messages = messages_query.paginate(page=page, per_page=per_page, error_out=False)
+    page = max(page, 1)
+    per_page = max(per_page, 1)
+    
+    # 첫 페이지는 최근 메시지 링 버퍼에서 (방의 마지막 seq까지 빠짐없이 있을 때만)
+    # 버퍼가 전체 메시지 수도 갖고 있으므로 COUNT/보관 개수 조회 없이 응답한다
+    generation = message_ring.generation()
+    cached = message_ring.latest(room_id, per_page, room.last_seq, room.version) if page == 1 else None
+    if cached is not None:
+        payloads, total = cached
+        _mark_room_read(room_id, user_id, room.last_seq)
+        # 암호화된 메시지는 암호화된 상태로 전송하고 클라이언트에서 복호화
+        return object_response({'has_more': per_page < total, 'total': total}, 'messages', payloads, dict)
+    
+    # 컬럼 튜플로 조회 (ORM 객체를 만들지 않음)
+    # 전체 수는 앞에서 읽은 last_seq까지만 센다 (버퍼에 넣은 뒤 도착하는 메시지는 링 버퍼가 더한다)
+    hot_total = db.session.execute(
+        db.select(db.func.count(Message.id)).where(Message.room_id == room_id, Message.seq <= room.last_seq)
+    ).scalar()
+    items = [tuple(row) for row in db.session.execute(
+        db.select(*MESSAGE_COLUMNS).where(Message.room_id == room_id)
+        .order_by(Message.timestamp.desc())
+        .limit(per_page).offset((page - 1) * per_page)
+    )]
+    
+    # DB 메시지가 모자라는 페이지는 보관된(더 오래된) 메시지에서 이어 읽기
+    archived_total = message_archive.archived_count(room_id)
+    if len(items) < per_page and archived_total:
+        skip = max(0, (page - 1) * per_page - hot_total)
+        items.extend(_message_tuple(record) for record in
+                     message_archive.read_archived(room_id, skip, per_page - len(items)))
+    total = hot_total + archived_total
+    fields = {'has_more': page * per_page < total, 'total': total}
+    
+    _mark_room_read(room_id, user_id, room.last_seq)
+    
+    rows = _message_rows(room_id, items[::-1])  # 시간순 정렬
+    if page == 1 and all(row[MESSAGE_SEQ] is not None for row in rows):
+        message_ring.fill(room_id, [serialize_message_event(row) for row in rows], room.last_seq, room.version,
+                          total, not fields['has_more'], generation)
+    return object_response(fields, 'messages', rows, serialize_message)
+
+@chat_bp.route('/api/chat/rooms/<int:room_id>/search', methods=['GET'])
+@jwt_required()
+@read_replica
+def search_room_messages(room_id):
+    """채팅방 메시지 검색
+    q: 평문 메시지 전문 검색 (관련도순)
+    tokens: 암호화된 메시지용 블라인드 토큰 (쉼표 구분, 클라이언트가 방 키로 계산, 최신순)
+    """
+    user_id = int(get_jwt_identity())
     
-    # 메시지를 읽음으로 표시
-    Message.query.filter(
-        Message.room_id == room_id,
-        Message.user_id != user_id,
-        Message.is_read == False
-    ).update({'is_read': True})
-    db.session.commit()
+    room = ChatRoom.query.get(room_id)
+    user = User.query.get(user_id)
     
-    # 사용자의 그룹 키 가져오기 (암호화된 채팅방인 경우)
-    user_group_key = None
-    if room.is_encrypted:
-        user_key_record = UserGroupKey.query.filter_by(user_id=user_id, room_id=room_id).first()
-        if user_key_record:
-            # 클라이언트에서 개인키를 제공해야 복호화 가능 (보안을 위해 서버에 저장하지 않음)
-            pass
-    
-    message_list = []
-    for message in reversed(messages.items):  # 시간순 정렬
-        content = message.content
-        
-        # 암호화된 메시지인 경우 복호화 필요 (클라이언트에서 처리)
-        # 여기서는 암호화된 상태로 전송하고 클라이언트에서 복호화
-        
-        message_data = {
-            'id': message.id,
-            'content': content,
-            'message_type': message.message_type,
-            'username': User.query.get(message.user_id).username,
-            'timestamp': message.timestamp.isoformat(),
-            'user_id': message.user_id,
-            'is_edited': message.is_edited,
-            'edited_at': message.edited_at.isoformat() if message.edited_at else None,
-            'reply_to_id': message.reply_to_id,
-            'is_encrypted': message.is_encrypted
-        }
-        
-        # 답글인 경우 원본 메시지 정보 추가
-        if message.reply_to_id:
-            reply_to = Message.query.get(message.reply_to_id)
-            if reply_to:
-                reply_content = reply_to.content
-                if len(reply_content) > 100:
-                    reply_content = reply_content[:100] + '...'
-                    
-                message_data['reply_to'] = {
-                    'id': reply_to.id,
-                    'content': reply_content,
-                    'username': User.query.get(reply_to.user_id).username,
-                    'is_encrypted': reply_to.is_encrypted
-                }
-        
-        message_list.append(message_data)
+    if not room or user not in room.participants:
+        return jsonify({'error': '접근 권한이 없습니다.'}), 403
     
-    return jsonify({
-        'messages': message_list,
-        'has_more': messages.has_next,
-        'total': messages.total
-    })
+    limit = request.args.get('limit', 20, type=int)
+    cursor = request.args.get('cursor')
+    tokens = request.args.get('tokens')
+    
+    try:
+        if tokens:
+            result = message_search.search_tokens(room_id, tokens.split(','), limit=limit, cursor=cursor)
+        else:
+            result = message_search.search_text(user_id, request.args.get('q', ''), room_id=room_id,
+                                                limit=limit, cursor=cursor)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    return jsonify(result)
+
+@chat_bp.route('/api/chat/search', methods=['GET'])
+@jwt_required()
+@read_replica
+def search_messages():
+    """참여한 모든 채팅방의 평문 메시지 검색
+    (암호화된 메시지의 토큰은 방마다 키가 달라 방별 검색에서만 지원)
+    """
+    user_id = int(get_jwt_identity())
+    
+    try:
+        result = message_search.search_text(user_id, request.args.get('q', ''),
+                                            limit=request.args.get('limit', 20, type=int),
+                                            cursor=request.args.get('cursor'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    return jsonify(result)
 
 @chat_bp.route('/api/chat/rooms/<int:room_id>/participants', methods=['GET'])
 @jwt_required()
@@ -264,6 +475,7 @@ def join_chat_room(room_id):
         
         # 암호화된 채팅방인 경우 사용자에게 그룹 키 분배
         if room.is_encrypted and user.public_key and room.encryption_key:
+            from app.crypto import GroupCrypto
             encrypted_key = GroupCrypto.encrypt_group_key_for_user(room.encryption_key, user.public_key)
             user_group_key = UserGroupKey(
                 user_id=user_id,
@@ -271,6 +483,8 @@ def join_chat_room(room_id):
                 encrypted_group_key=encrypted_key
             )
             db.session.add(user_group_key)
+        # 세 번째 참가자가 생기면 더 이상 두 사람의 1:1 대화가 아니다
+        conversations.unlink(room_id)
         
         db.session.commit()
         
@@ -304,8 +518,11 @@ def leave_chat_room(room_id):
         user_group_key = UserGroupKey.query.filter_by(user_id=user_id, room_id=room_id).first()
         if user_group_key:
             db.session.delete(user_group_key)
+        # 1:1 방을 나가면 더 이상 두 사람의 대화가 아니다 (다음에는 새 방을 만든다)
+        conversations.unlink(room_id)
         
         db.session.commit()
+        socket_sessions.forget_room(room_id, user_id)
         
         return jsonify({'message': '채팅방을 나갔습니다.'})
         
@@ -313,6 +530,30 @@ def leave_chat_room(room_id):
         db.session.rollback()
         return jsonify({'error': '채팅방 나가기 중 오류가 발생했습니다.'}), 500
 
+@chat_bp.route('/api/chat/rooms/<int:room_id>', methods=['DELETE'])
+@jwt_required()
+def delete_chat_room(room_id):
+    """채팅방 삭제 (방 생성자 또는 관리자) - 메시지/보관 세그먼트까지 일괄 삭제"""
+    user_id = int(get_jwt_identity())
+    
+    room = ChatRoom.query.get(room_id)
+    user = User.query.get(user_id)
+    
+    if not room:
+        return jsonify({'error': '채팅방을 찾을 수 없습니다.'}), 404
+    
+    if room.created_by != user_id and not user.is_admin:
+        return jsonify({'error': '채팅방을 삭제할 권한이 없습니다.'}), 403
+    
+    try:
+        message_archive.delete_room(room_id)
+        socket_sessions.forget_room(room_id)
+        message_ring.discard(room_id)
+        return jsonify({'message': '채팅방이 삭제되었습니다.'})
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': '채팅방 삭제 중 오류가 발생했습니다.'}), 500
+
 @chat_bp.route('/api/chat/messages/<int:message_id>', methods=['PUT'])
 @jwt_required()
 def edit_message(message_id):
@@ -323,11 +564,30 @@ def edit_message(message_id):
         return jsonify({'error': '메시지를 찾을 수 없습니다.'}), 404
     
     data = request.get_json()
-    message.content = data['content']
+    try:
+        tokens = message_search.clean_tokens(data.get('search_tokens'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    room_id, content, edited_at = message.room_id, data['content'], datetime.utcnow()
+    seq, is_encrypted = message.seq, message.is_encrypted
+    message.content = content
     message.is_edited = True
-    message.edited_at = datetime.utcnow()
+    message.edited_at = edited_at
+    # 내용이 바뀌었으므로 이전 검색 토큰은 버린다 (평문은 FTS 트리거가 갱신)
+    message_search.replace_tokens(message.id, room_id, tokens if is_encrypted else [])
+    version = _bump_version(room_id)
     
     db.session.commit()
+    message_ring.update(room_id, message_id, version,
+                        {'content': content, 'is_edited': True, 'edited_at': edited_at.isoformat()},
+                        {'content': _reply_preview(content)})
+    
+    # 방 참가자는 목록을 다시 읽지 않고 이 메시지와 이를 인용한 답글 미리보기만 고친다
+    broadcaster.emit('message_updated', {
+        'room': room_id, 'id': message_id, 'seq': seq, 'content': content,
+        'is_encrypted': is_encrypted, 'edited_at': edited_at.isoformat()
+    }, room=room_id)
     
     return jsonify({'message': '메시지가 수정되었습니다.'})
 
@@ -340,8 +600,17 @@ def delete_message(message_id):
     if not message:
         return jsonify({'error': '메시지를 찾을 수 없습니다.'}), 404
     
+    room_id, seq = message.room_id, message.seq
+    if not message.is_read:
+        conversations.forget_unread(room_id, user_id)
+    message_search.remove_tokens([message.id])
     db.session.delete(message)
+    version = _bump_version(room_id)
     db.session.commit()
+    message_ring.remove(room_id, message_id, version)
+    
+    # 답글의 원본 참조도 함께 지워졌으므로 클라이언트는 이 메시지를 인용한 미리보기도 뺀다
+    broadcaster.emit('message_deleted', {'room': room_id, 'id': message_id, 'seq': seq}, room=room_id)
     
     return jsonify({'message': '메시지가 삭제되었습니다.'})
 
@@ -391,6 +660,11 @@ def send_encrypted_message():
     if not room_id or not encrypted_content:
         return jsonify({'error': '방 ID와 암호화된 내용이 필요합니다.'}), 400
     
+    try:
+        tokens = message_search.clean_tokens(data.get('search_tokens'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
     # 권한 확인
     room = ChatRoom.query.get(room_id)
     user = User.query.get(user_id)
@@ -398,24 +672,41 @@ def send_encrypted_message():
     if not room or user not in room.participants:
         return jsonify({'error': '접근 권한이 없습니다.'}), 403
     
+    file_url = file_name = None
+    if data.get('attachment_id') is not None:
+        try:
+            message_type, file_url, file_name = attachments.message_file_fields(data['attachment_id'], room.id, user_id)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+    
     try:
         # 메시지 저장
+        now = datetime.utcnow()
         message = Message(
             content=encrypted_content,
             message_type=message_type,
+            file_url=file_url,
+            file_name=file_name,
             room_id=room_id,
             user_id=user_id,
             is_encrypted=True,
-            reply_to_id=reply_to_id
+            reply_to_id=reply_to_id,
+            timestamp=now,
+            # 방 활동 시간도 함께 업데이트
+            seq=_next_seq(room_id, now)
         )
         db.session.add(message)
+        user.last_seen = now
         
-        # 방 활동 시간 업데이트
-        room.last_activity = datetime.utcnow()
-        user.last_seen = datetime.utcnow()
-        
+        db.session.flush()
+        message_search.index_tokens(message.id, room_id, tokens)
+        conversations.record_message(room.id, user_id, message.id, now)
         db.session.commit()
         
+        # 소켓으로 보내지는 않지만 링 버퍼의 seq 범위가 끊기지 않도록 추가
+        _message_event(room.id, (message.id, encrypted_content, message_type, now, user_id, False, None,
+                                 reply_to_id, True, message.seq, file_url, file_name), user_id, user.username)
+        
         return jsonify({
             'message': '메시지가 전송되었습니다.',
             'message_id': message.id,
@@ -426,6 +717,141 @@ def send_encrypted_message():
         db.session.rollback()
         return jsonify({'error': '메시지 전송 중 오류가 발생했습니다.'}), 500
 
+def _is_participant(room_id, user_id):
+    return db.session.execute(
+        db.select(room_participants.c.user_id).where(room_participants.c.chat_room_id == room_id,
+                                                     room_participants.c.user_id == user_id)
+    ).first() is not None
+
+def _upload_status(upload):
+    return {'upload_id': upload.id, 'offset': upload.received, 'size': upload.size}
+
+def _user_upload(upload_id):
+    upload = db.session.get(AttachmentUpload, upload_id)
+    if upload is None or upload.user_id != int(get_jwt_identity()):
+        return None
+    return upload
+
+def _finished_upload(attachment):
+    return jsonify({'complete': True, 'attachment': attachments.serialize_attachment(attachment)}), 201
+
+@chat_bp.route('/api/chat/rooms/<int:room_id>/uploads', methods=['POST'])
+@jwt_required()
+def create_upload(room_id):
+    """첨부 파일 분할 업로드 시작 (app/chat/attachments.py)
+
+    같은 사용자가 같은 내용(sha256)을 이미 올렸으면 바로 완료된 첨부 파일을 돌려준다.
+    아니면 upload_id로 PUT /api/chat/uploads/<upload_id>?offset=N 에 청크를 차례로 올린다.
+    """
+    user_id = int(get_jwt_identity())
+    if not _is_participant(room_id, user_id):
+        return jsonify({'error': '접근 권한이 없습니다.'}), 403
+    
+    try:
+        attachment, upload = attachments.start_upload(room_id, user_id, request.get_json() or {})
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    if attachment is not None:
+        return _finished_upload(attachment)
+    return jsonify({'complete': False, **_upload_status(upload)}), 201
+
+@chat_bp.route('/api/chat/uploads/<upload_id>', methods=['GET'])
+@jwt_required()
+def get_upload(upload_id):
+    """이어 올릴 위치 확인 (연결이 끊긴 뒤 offset부터 다시 올림)"""
+    upload = _user_upload(upload_id)
+    if upload is None:
+        return jsonify({'error': '업로드를 찾을 수 없습니다.'}), 404
+    return jsonify(_upload_status(upload))
+
+@chat_bp.route('/api/chat/uploads/<upload_id>', methods=['PUT'])
+@jwt_required()
+def put_upload_chunk(upload_id):
+    """청크 올리기 - 본문은 바이트 그대로, offset은 지금까지 받은 바이트 수와 같아야 한다 (다르면 409)
+
+    마지막 청크를 받으면 해시를 확인해 첨부 파일을 만든다.
+    """
+    upload = _user_upload(upload_id)
+    if upload is None:
+        return jsonify({'error': '업로드를 찾을 수 없습니다.'}), 404
+    
+    offset = request.args.get('offset', type=int)
+    try:
+        received = attachments.write_chunk(upload, offset, request.stream, request.content_length)
+        if received < upload.size:
+            return jsonify(_upload_status(upload))
+        attachment = attachments.finish_upload(upload)
+    except attachments.UploadOffsetError as e:
+        return jsonify({'error': str(e), 'offset': e.offset}), 409
+    except ValueError as e:
+        # 해시가 맞지 않으면 업로드가 취소되므로 offset 없이 응답
+        upload = db.session.get(AttachmentUpload, upload_id)
+        return jsonify({'error': str(e), 'offset': upload.received if upload else None}), 400
+    return _finished_upload(attachment)
+
+@chat_bp.route('/api/chat/uploads/<upload_id>', methods=['DELETE'])
+@jwt_required()
+def delete_upload(upload_id):
+    upload = _user_upload(upload_id)
+    if upload is None:
+        return jsonify({'error': '업로드를 찾을 수 없습니다.'}), 404
+    attachments.abort_upload(upload)
+    return jsonify({'message': '업로드를 취소했습니다.'})
+
+def _room_attachment(attachment_id):
+    """참가한 방의 첨부 파일 (없거나 권한이 없으면 None)"""
+    attachment = db.session.get(Attachment, attachment_id)
+    if attachment is None or not _is_participant(attachment.room_id, int(get_jwt_identity())):
+        return None
+    return attachment
+
+@chat_bp.route('/api/chat/attachments/<int:attachment_id>', methods=['GET'])
+@jwt_required()
+def download_attachment(attachment_id):
+    """첨부 파일 내려받기 - Range 요청(206)과 ETag(해시)를 지원해 이어 받기/청크별 복호화가 가능
+
+    파일은 스트리밍으로 보내며, USE_X_SENDFILE을 켜면 프록시(nginx 등)가 직접 보낸다.
+    """
+    attachment = _room_attachment(attachment_id)
+    if attachment is None:
+        return jsonify({'error': '첨부 파일을 찾을 수 없습니다.'}), 404
+    
+    # 형식은 업로드한 사람이 알려 준 값이므로, 바로 보여 주는 이미지 외에는 모두 내려받기로 보내고
+    # 브라우저가 내용을 보고 형식을 추측(스니핑)하지 않게 한다
+    inline = not attachment.is_encrypted and attachment.mime_type in attachments.INLINE_MIME_TYPES
+    response = send_file(
+        attachments.blob_path(attachment.sha256),
+        mimetype=attachment.mime_type if inline else 'application/octet-stream',
+        as_attachment=not inline,
+        download_name=attachment.file_name,
+        conditional=True,
+        etag=attachment.sha256,
+        max_age=3600
+    )
+    response.cache_control.private = True
+    response.headers['X-Content-Type-Options'] = 'nosniff'
+    return response
+
+@chat_bp.route('/api/chat/attachments/<int:attachment_id>/info', methods=['GET'])
+@jwt_required()
+def get_attachment_info(attachment_id):
+    attachment = _room_attachment(attachment_id)
+    if attachment is None:
+        return jsonify({'error': '첨부 파일을 찾을 수 없습니다.'}), 404
+    return jsonify(attachments.serialize_attachment(attachment))
+
+@chat_bp.route('/api/chat/attachments/<int:attachment_id>/thumbnail', methods=['GET'])
+@jwt_required()
+def get_attachment_thumbnail(attachment_id):
+    attachment = _room_attachment(attachment_id)
+    path = attachments.thumbnail_path(attachment.sha256) if attachment is not None else None
+    if path is None or not os.path.exists(path):
+        return jsonify({'error': '미리보기가 없습니다.'}), 404
+    response = send_file(path, mimetype='image/jpeg', conditional=True, etag=attachment.sha256, max_age=86400)
+    response.cache_control.private = True
+    response.headers['X-Content-Type-Options'] = 'nosniff'
+    return response
+
 @chat_bp.route('/api/chat/private-room/<username>', methods=['GET'])
 @jwt_required()
 def get_private_room(username):
@@ -441,13 +867,9 @@ def get_private_room(username):
     if other_user.id == user_id:
         return jsonify({'error': '자기 자신과는 채팅할 수 없습니다.'}), 400
     
-    # 두 사용자가 모두 참여한 개인 채팅방 찾기
-    room = ChatRoom.query.filter(
-        ChatRoom.is_group == False,
-        ChatRoom.is_private == True,
-        ChatRoom.participants.any(User.id == user_id),
-        ChatRoom.participants.any(User.id == other_user.id)
-    ).first()
+    # (작은 id, 큰 id) 유일 키로 두 사용자의 1:1 채팅방 찾기
+    conversation = conversations.find(user_id, other_user.id)
+    room = db.session.get(ChatRoom, conversation.room_id) if conversation else None
     
     if room:
         return jsonify({
@@ -501,6 +923,8 @@ def invite_user_to_room(room_id):
                 encrypted_group_key=encrypted_key
             )
             db.session.add(user_group_key)
+        # 1:1 방에 초대하면 그룹 방이 되므로 대화 색인에서 뺀다
+        conversations.unlink(room_id)
         
         db.session.commit()
         
@@ -513,192 +937,266 @@ def invite_user_to_room(room_id):
         db.session.rollback()
         return jsonify({'error': '초대 중 오류가 발생했습니다.'}), 500
 
-# SocketIO 이벤트들 
+# 소켓 핫패스 쓰기 작업 (write_queue를 통해 실행, 커밋은 writer가 담당)
+def _touch_last_seen(user_id):
+    User.query.filter_by(id=user_id).update({'last_seen': datetime.utcnow()}, synchronize_session=False)
+
+def _next_seq(room_id, now):
+    """방의 다음 메시지 순번 할당 (채팅방 마지막 활동 시간도 함께 업데이트)
+
+    같은 트랜잭션 안에서 chat_room 행을 먼저 갱신하므로 동시에 보낸 메시지도 순번이 겹치지 않는다.
+    """
+    db.session.execute(
+        ChatRoom.__table__.update().where(ChatRoom.id == room_id)
+        .values(last_seq=ChatRoom.last_seq + 1, last_activity=now)
+    )
+    return db.session.execute(db.select(ChatRoom.last_seq).where(ChatRoom.id == room_id)).scalar()
+
+def _bump_version(room_id):
+    """방의 메시지 수정/삭제 버전 증가 - 다른 워커의 링 버퍼는 버전이 달라져 DB 조회로 넘어간다"""
+    db.session.execute(
+        ChatRoom.__table__.update().where(ChatRoom.id == room_id).values(version=ChatRoom.version + 1)
+    )
+    return db.session.execute(db.select(ChatRoom.version).where(ChatRoom.id == room_id)).scalar()
+
+def _store_message(room_id, user_id, content, reply_to_id, is_encrypted, search_tokens=(), attachment_id=None):
+    now = datetime.utcnow()
+    message_type, file_url, file_name = 'text', None, None
+    if attachment_id is not None:
+        message_type, file_url, file_name = attachments.message_file_fields(attachment_id, room_id, user_id)
+    message = Message(
+        content=content,
+        message_type=message_type,
+        file_url=file_url,
+        file_name=file_name,
+        room_id=room_id,
+        user_id=user_id,
+        timestamp=now,
+        reply_to_id=reply_to_id,
+        is_encrypted=is_encrypted,  # 클라이언트에서 받은 값 그대로 사용
+        seq=_next_seq(room_id, now)
+    )
+    db.session.add(message)
+    
+    # 사용자 마지막 접속 시간 업데이트
+    _touch_last_seen(user_id)
+    
+    db.session.flush()
+    if is_encrypted:
+        message_search.index_tokens(message.id, room_id, search_tokens)
+    conversations.record_message(room_id, user_id, message.id, now)
+    return {'id': message.id, 'timestamp': now, 'is_encrypted': message.is_encrypted, 'seq': message.seq,
+            'message_type': message_type, 'file_url': file_url, 'file_name': file_name}
+
+# SocketIO 이벤트들
+# 사용자 정보는 연결 시 JWT로 확인한 소켓 세션(app/chat/sessions.py)에서 읽는다
 @socketio.on('connect')
 def on_connect(auth):
-    """사용자 연결 이벤트"""
-    if auth and 'token' in auth and 'username' in auth:
-        try:
-            # JWT 토큰 검증 (간단한 방법)
-            username = auth['username']
-            user = User.query.filter_by(username=username).first()
-            
-            if user:
-                user.last_seen = datetime.utcnow()
-                db.session.commit()
-                
-                # 모든 사용자에게 온라인 상태 변경 알림
-                emit('user_status_changed', {
-                    'username': username,
-                    'is_online': True
-                }, broadcast=True)
-                
-                print(f'{username} 연결됨')
-        except Exception as e:
-            print(f'연결 오류: {e}')
+    """사용자 연결 이벤트 - 토큰이 없거나 유효하지 않으면 연결 거부"""
+    session = socket_sessions.authenticate(auth)
+    if session is None:
+        return False
+    
+    write_queue.submit(_touch_last_seen, session.user_id, wait=False)
+    
+    # 이벤트 알림 수신용 개인 룸 참가 및 알림 스케줄러 시작
+    join_room(user_room(session.user_id))
+    notification_scheduler.start(current_app._get_current_object())
+    
+    # 모든 사용자에게 온라인 상태 변경 알림
+    broadcaster.emit('user_status_changed', {
+        'username': session.username,
+        'is_online': True
+    })
+    
+    print(f'{session.username} 연결됨')
 
 @socketio.on('disconnect')
 def on_disconnect():
     """사용자 연결 해제 이벤트"""
     # 연결 해제된 사용자의 온라인 상태 업데이트는 주기적 체크로 처리
-    print('사용자 연결 해제됨')
+    session = socket_sessions.remove()
+    typing_aggregator.remove(request.sid)
+    broadcaster.discard(request.sid)
+    if session is not None:
+        print(f'{session.username} 연결 해제됨')
+
+def _room_session(data):
+    """이벤트의 방에 접근할 수 있으면 (세션, 방 id), 아니면 (None, None)"""
+    session = socket_sessions.get()
+    room = room_id_from(data)
+    if session is None or room is None or not socket_sessions.can_access(session, room):
+        return None, None
+    return session, room
 
 @socketio.on('join')
 def on_join(data):
-    room = data['room']
-    username = data.get('username', 'Anonymous')
+    session, room = _room_session(data)
+    if session is None:
+        emit('status', {'msg': '채팅방에 참여할 권한이 없습니다.'})
+        return
     join_room(room)
     
     # 사용자 활동 기록
-    user = User.query.filter_by(username=username).first()
-    if user:
-        user.last_seen = datetime.utcnow()
-        activity = UserActivity(user_id=user.id, activity_type='join_room', 
-                              details=f'Joined room {room}')
-        db.session.add(activity)
-        db.session.commit()
+    activity_log.record(session.user_id, 'join_room', f'Joined room {room}')
+    write_queue.submit(_touch_last_seen, session.user_id, wait=False)
+    
+    broadcaster.emit('status', {'msg': f'{session.username}님이 채팅방에 참여했습니다.'}, room=room,
+                     skip_sid=request.sid)
+    broadcaster.emit('user_joined', {'username': session.username}, room=room, skip_sid=request.sid)
     
-    emit('status', {'msg': f'{username}님이 채팅방에 참여했습니다.'}, room=room, include_self=False)
-    emit('user_joined', {'username': username}, room=room, include_self=False)
+    # 이미 입력 중인 사용자가 있으면 새로 들어온 사용자에게만 현재 상태를 알려 준다
+    typers = typing_aggregator.usernames(room)
+    if typers:
+        emit('typing_state', {'room': room, 'usernames': typers})
 
 @socketio.on('leave')
 def on_leave(data):
-    room = data['room']
-    username = data.get('username', 'Anonymous')
+    session = socket_sessions.get()
+    room = room_id_from(data)
+    if session is None or room is None:
+        return
     leave_room(room)
+    typing_aggregator.remove(request.sid, room)
     
     # 사용자 활동 기록
-    user = User.query.filter_by(username=username).first()
-    if user:
-        activity = UserActivity(user_id=user.id, activity_type='leave_room', 
-                              details=f'Left room {room}')
-        db.session.add(activity)
-        db.session.commit()
+    activity_log.record(session.user_id, 'leave_room', f'Left room {room}')
     
-    emit('user_left', {'username': username}, room=room)
+    broadcaster.emit('user_left', {'username': session.username}, room=room)
+
+def deliver_message(room_id, user_id, username, content, reply_to_id=None, is_encrypted=False,
+                    search_tokens=(), attachment_id=None):
+    """메시지를 저장하고 방 참가자에게 보낸다 - 소켓 이벤트 페이로드 반환"""
+    # 데이터베이스에 메시지 저장 (단일 writer를 통해 그룹 커밋)
+    message = write_queue.submit(_store_message, room_id, user_id, content,
+                                 reply_to_id, is_encrypted, search_tokens, attachment_id)
+    
+    # 방 참가자에게 보낼 페이로드 (메시지 목록 API와 같은 형식)
+    item = (message['id'], content, message['message_type'], message['timestamp'], user_id, False, None,
+            reply_to_id, message['is_encrypted'], message['seq'], message['file_url'], message['file_name'])
+    payload = _message_event(room_id, item, user_id, username)
+    
+    # 모든 방 참가자에게 메시지 전송 (소켓별로 모아서 보냄, app/chat/broadcast.py)
+    broadcaster.emit('message', payload, room=room_id)
+    return payload
 
 @socketio.on('message')
 def handle_message(data):
-    room = data['room']
-    content = data['content']
-    username = data['username']
+    session, room = _room_session(data)
+    if session is None:
+        return
+    content = socket_codec.text_content(data['content'])  # 바이너리 인코딩 클라이언트는 암호문을 바이트로 보냄
     reply_to_id = data.get('reply_to_id')
     # 암호화 여부는 클라이언트에서 명시적으로 받아옴. 없으면 False.
     is_encrypted = data.get('is_encrypted', False)
     
-    # 사용자 ID 가져오기
-    user = User.query.filter_by(username=username).first()
-    if not user:
+    try:
+        deliver_message(room, session.user_id, session.username, content, reply_to_id, is_encrypted,
+                        message_search.clean_tokens(data.get('search_tokens')), data.get('attachment_id'))
+    except Exception as e:
+        print(f'메시지 저장 오류: {e}')
         return
-    
-    # 채팅방 정보 확인
-    chat_room = ChatRoom.query.get(room)
-    if not chat_room:
+    typing_aggregator.remove(request.sid, room)
+
+def _missed_messages(room_id, last_seq):
+    """last_seq 이후 메시지 - (페이로드 목록, 빠짐없이 다 담았는지)
+
+    링 버퍼에 범위가 모두 있으면 버퍼에서, 아니면 (room_id, seq) 인덱스로 DB에서 읽는다.
+    """
+    state = db.session.execute(
+        db.select(ChatRoom.last_seq, ChatRoom.version).where(ChatRoom.id == room_id)
+    ).first()
+    latest_seq, version = state or (0, 0)
+    cached = message_ring.since(room_id, last_seq, latest_seq, version)
+    if cached is not None:
+        return cached, True
+    
+    items = [tuple(row) for row in db.session.execute(
+        db.select(*MESSAGE_COLUMNS)
+        .where(Message.room_id == room_id, Message.seq > last_seq)
+        .order_by(Message.seq)
+        .limit(RESUME_MAX_MESSAGES + 1)
+    )]
+    complete = len(items) <= RESUME_MAX_MESSAGES
+    return [serialize_message_event(row) for row in _message_rows(room_id, items[:RESUME_MAX_MESSAGES])], complete
+
+@socketio.on('resume')
+def handle_resume(data):
+    """재연결 후 방에 다시 들어가면서 놓친 메시지 받기
+
+    data: {'rooms': {방 id: 마지막으로 받은 seq}}
+    방마다 'resume' 이벤트로 {'room', 'messages', 'complete'}를 보낸다.
+    complete가 False면 놓친 메시지가 너무 많으므로 클라이언트가 목록을 새로 읽어야 한다.
+    """
+    session = socket_sessions.get()
+    if session is None:
         return
-    
-    # 데이터베이스에 메시지 저장
-    message = Message(
-        content=content, 
-        room_id=room, 
-        user_id=user.id,
-        timestamp=datetime.utcnow(),
-        reply_to_id=reply_to_id,
-        is_encrypted=is_encrypted # 클라이언트에서 받은 값 그대로 사용
-    )
-    db.session.add(message)
-    
-    # 채팅방 마지막 활동 시간 업데이트
-    chat_room.last_activity = datetime.utcnow()
-    
-    # 사용자 마지막 접속 시간 업데이트
-    user.last_seen = datetime.utcnow()
-    
-    db.session.commit()
-    
-    # 답글 정보 추가
-    reply_info = None
-    if reply_to_id:
-        reply_to = Message.query.get(reply_to_id)
-        if reply_to:
-            reply_content = reply_to.content
-            if len(reply_content) > 100:
-                reply_content = reply_content[:100] + '...'
-            reply_info = {
-                'id': reply_to.id,
-                'content': reply_content,
-                'username': User.query.get(reply_to.user_id).username,
-                'is_encrypted': reply_to.is_encrypted
-            }
-    
-    # 모든 방 참가자에게 메시지 전송
-    emit('message', {
-        'id': message.id,
-        'content': content, 
-        'username': username,
-        'timestamp': message.timestamp.isoformat(),
-        'user_id': user.id,
-        'reply_to': reply_info,
-        'is_encrypted': message.is_encrypted
-    }, room=room)
+    for room_key, last_seq in (data.get('rooms') or {}).items():
+        room = room_id_from({'room': room_key})
+        if room is None or not socket_sessions.can_access(session, room):
+            continue
+        try:
+            last_seq = max(int(last_seq or 0), 0)
+        except (TypeError, ValueError):
+            continue
+        join_room(room)
+        messages, complete = _missed_messages(room, last_seq)
+        emit('resume', {'room': room, 'messages': messages, 'complete': complete})
 
 @socketio.on('typing')
 def handle_typing(data):
-    room = data['room']
-    username = data['username']
-    is_typing = data['is_typing']
-    
-    emit('typing', {
-        'username': username,
-        'is_typing': is_typing
-    }, room=room, include_self=False)
-
-@socketio.on('disconnect')
-def on_disconnect():
-    print('User disconnected')
+    session, room = _room_session(data)
+    if session is None:
+        return
+    # 바로 중계하지 않고 모아서 typing_state로 보낸다 (app/chat/typing.py)
+    typing_aggregator.update(request.sid, room, session.username, bool(data.get('is_typing')))
 
 # 온라인 사용자 상태 업데이트를 위한 주기적 핑
 @socketio.on('ping')
-def handle_ping(data):
-    username = data.get('username')
-    if username:
-        user = User.query.filter_by(username=username).first()
-        if user:
-            user.last_seen = datetime.utcnow()
-            db.session.commit()
-            
-            # 온라인 상태 브로드캐스트
-            emit('user_status_changed', {
-                'username': username,
-                'is_online': True
-            }, broadcast=True)
+def handle_ping(data=None):
+    session = socket_sessions.get()
+    if session is None:
+        return
+    write_queue.submit(_touch_last_seen, session.user_id, wait=False)
+    
+    # 온라인 상태 브로드캐스트
+    broadcaster.emit('user_status_changed', {
+        'username': session.username,
+        'is_online': True
+    })
 
 @socketio.on('user_invited')
 def handle_user_invited(data):
     """사용자 초대 이벤트 처리"""
-    room = data['room']
+    session, room = _room_session(data)
+    if session is None:
+        return
     invited_user = data['invited_user']
-    invited_by = data['invited_by']
     
     # 채팅방의 모든 참가자에게 알림
     emit('status', {
-        'msg': f'{invited_by}님이 {invited_user}님을 초대했습니다.'
+        'msg': f'{session.username}님이 {invited_user}님을 초대했습니다.'
     }, room=room)
 
 @socketio.on('request_online_users')
 def handle_online_users_request():
-    """온라인 사용자 목록 요청 처리"""
-    from datetime import timedelta
-    cutoff_time = datetime.utcnow() - timedelta(minutes=5)
-    
-    users = User.query.all()
-    online_users = []
-    
-    for user in users:
-        is_online = user.last_seen and user.last_seen > cutoff_time
-        online_users.append({
-            'username': user.username,
-            'is_online': is_online,
-            'last_seen': user.last_seen.isoformat() if user.last_seen else None
-        })
-    
+    """온라인 사용자 목록 요청 처리 - 같은 채팅방에 참가한 사용자만"""
+    session = socket_sessions.get()
+    if session is None:
+        return
+    cutoff_time = datetime.utcnow() - ONLINE_WINDOW
+    my_rooms = db.select(room_participants.c.chat_room_id).where(room_participants.c.user_id == session.user_id)
+    rows = db.session.execute(
+        db.select(User.username, User.last_seen)
+        .join(room_participants, room_participants.c.user_id == User.id)
+        .where(room_participants.c.chat_room_id.in_(my_rooms))
+        .distinct()
+    ).all()
+
+    online_users = [{
+        'username': row.username,
+        'is_online': bool(row.last_seen and row.last_seen > cutoff_time),
+        'last_seen': row.last_seen.isoformat() if row.last_seen else None
+    } for row in rows]
+
     emit('online_users_update', {'users': online_users})
\ No newline at end of file
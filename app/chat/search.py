@@ -0,0 +1,245 @@
+"""
+메시지 검색
+- 평문 메시지(is_encrypted=False): SQLite FTS5 전문 검색 인덱스(message_fts)
+  message 테이블의 INSERT/UPDATE/DELETE 트리거가 인덱스를 자동으로 맞춘다.
+  FTS5를 쓸 수 없는 DB에서는 LIKE 검색으로 대체한다.
+- 암호화된 메시지: 클라이언트가 방 키로 계산한 키워드 HMAC 토큰(블라인드 토큰)을
+  message_search_token에 저장하고, 같은 방식으로 계산한 검색어 토큰과 일치시킨다.
+
+결과는 관련도(bm25) 순 또는 최신순이며, 커서 기반으로 페이지를 넘긴다.
+"""
+
+import base64
+import json
+import re
+
+from sqlalchemy import column, table, text
+from sqlalchemy.exc import OperationalError
+
+from app.models import Message, MessageSearchToken, User, db, room_participants
+
+MAX_QUERY_TERMS = 8
+MAX_TOKENS_PER_MESSAGE = 64
+MAX_SEARCH_LIMIT = 100
+TOKEN_PATTERN = re.compile(r'^[0-9a-f]{16,64}$')
+
+FTS_TABLE = 'message_fts'
+
+# message 테이블을 원본으로 쓰는 external content FTS5 테이블과 동기화 트리거
+# (암호화된 메시지는 인덱싱하지 않는다)
+FTS_SCHEMA = (
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+    f"content, content='message', content_rowid='id', tokenize='unicode61')",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON message "
+    f"WHEN new.is_encrypted = 0 BEGIN "
+    f"INSERT INTO {FTS_TABLE}(rowid, content) VALUES (new.id, new.content); END",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON message "
+    f"WHEN old.is_encrypted = 0 BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, content) VALUES ('delete', old.id, old.content); END",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF content, is_encrypted ON message BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, content) "
+    f"SELECT 'delete', old.id, old.content WHERE old.is_encrypted = 0; "
+    f"INSERT INTO {FTS_TABLE}(rowid, content) SELECT new.id, new.content WHERE new.is_encrypted = 0; END",
+)
+
+_fts_available = {}
+
+
+# ---------------------------------------------------------------------------
+# 인덱스 관리
+# ---------------------------------------------------------------------------
+
+def create_fts_index(conn):
+    """FTS5 테이블/트리거를 만들고 기존 평문 메시지를 채운다 (FTS5가 없으면 False)"""
+    if conn.dialect.name != 'sqlite':
+        return False
+    exists = conn.execute(text("SELECT 1 FROM sqlite_master WHERE name = :name"),
+                          {'name': FTS_TABLE}).first()
+    try:
+        for statement in FTS_SCHEMA:
+            conn.execute(text(statement))
+    except OperationalError as e:
+        print(f'FTS5를 사용할 수 없어 LIKE 검색으로 대체합니다: {e}')
+        return False
+    if not exists:
+        rebuild_fts_index(conn)
+    return True
+
+
+def rebuild_fts_index(conn):
+    """평문 메시지로 전문 검색 인덱스를 다시 만든다"""
+    conn.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('delete-all')"))
+    conn.execute(text(f"INSERT INTO {FTS_TABLE}(rowid, content) "
+                      f"SELECT id, content FROM message WHERE is_encrypted = 0"))
+    conn.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('optimize')"))
+
+
+def fts_enabled():
+    engine = db.engine
+    if engine.url not in _fts_available:
+        enabled = False
+        if engine.dialect.name == 'sqlite':
+            enabled = db.session.execute(text("SELECT 1 FROM sqlite_master WHERE name = :name"),
+                                         {'name': FTS_TABLE}).first() is not None
+        _fts_available[engine.url] = enabled
+    return _fts_available[engine.url]
+
+
+def clean_tokens(tokens):
+    """클라이언트가 보낸 블라인드 토큰 검증 (16~64자리 소문자 hex, 중복 제거)"""
+    if not tokens:
+        return []
+    if not isinstance(tokens, list):
+        raise ValueError('search_tokens는 배열이어야 합니다.')
+    cleaned = []
+    for token in tokens:
+        if not isinstance(token, str) or not TOKEN_PATTERN.match(token):
+            raise ValueError('잘못된 검색 토큰입니다.')
+        if token not in cleaned:
+            cleaned.append(token)
+    return cleaned[:MAX_TOKENS_PER_MESSAGE]
+
+
+def index_tokens(message_id, room_id, tokens):
+    """암호화된 메시지의 블라인드 토큰 저장 (커밋은 호출한 쪽에서)"""
+    if tokens:
+        db.session.execute(MessageSearchToken.__table__.insert(), [
+            {'message_id': message_id, 'room_id': room_id, 'token': token} for token in tokens
+        ])
+
+
+def replace_tokens(message_id, room_id, tokens):
+    remove_tokens([message_id])
+    index_tokens(message_id, room_id, tokens)
+
+
+def remove_tokens(message_ids):
+    if message_ids:
+        db.session.execute(MessageSearchToken.__table__.delete()
+                           .where(MessageSearchToken.message_id.in_(message_ids)))
+
+
+# ---------------------------------------------------------------------------
+# 커서
+# ---------------------------------------------------------------------------
+
+def encode_cursor(values):
+    raw = json.dumps(values, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    if not cursor:
+        return None
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError):
+        raise ValueError('잘못된 커서입니다.')
+    if not isinstance(values, list):
+        raise ValueError('잘못된 커서입니다.')
+    return values
+
+
+# ---------------------------------------------------------------------------
+# 검색
+# ---------------------------------------------------------------------------
+
+def query_terms(query):
+    return re.findall(r'\w+', (query or '').lower())[:MAX_QUERY_TERMS]
+
+
+def _user_room_ids(user_id):
+    return db.select(room_participants.c.chat_room_id).where(room_participants.c.user_id == user_id)
+
+
+def _hit(row, rank=None):
+    return {
+        'id': row.id,
+        'room_id': row.room_id,
+        'user_id': row.user_id,
+        'username': row.username,
+        'content': row.content,
+        'timestamp': row.timestamp.isoformat() if row.timestamp else None,
+        'is_encrypted': bool(row.is_encrypted),
+        'rank': rank,
+    }
+
+
+def _page(hits, limit, cursor_of):
+    next_cursor = None
+    if len(hits) > limit:
+        hits = hits[:limit]
+        next_cursor = encode_cursor(cursor_of(hits[-1]))
+    return {'results': hits, 'next_cursor': next_cursor}
+
+
+def search_text(user_id, query, room_id=None, limit=20, cursor=None):
+    """평문 메시지 전문 검색 - room_id가 없으면 사용자가 참여한 모든 방에서 검색"""
+    terms = query_terms(query)
+    if not terms:
+        return {'results': [], 'next_cursor': None}
+    limit = max(1, min(limit, MAX_SEARCH_LIMIT))
+    after = decode_cursor(cursor)
+
+    if room_id is not None:
+        room_filter = Message.room_id == room_id
+    else:
+        room_filter = Message.room_id.in_(_user_room_ids(user_id))
+
+    columns = (Message.id, Message.room_id, Message.user_id, Message.content,
+               Message.timestamp, Message.is_encrypted, User.username)
+
+    if fts_enabled():
+        # 각 단어를 접두사 검색으로 ("회의" -> "회의는"도 일치), 모든 단어 포함(AND)
+        match = ' '.join(f'"{term}"*' for term in terms)
+        fts = table(FTS_TABLE, column('rowid'), column('rank'))
+        rank = fts.c.rank
+        statement = (db.select(*columns, rank.label('rank'))
+                     .select_from(fts)
+                     .join(Message, Message.id == fts.c.rowid)
+                     .join(User, User.id == Message.user_id)
+                     .where(text(f'{FTS_TABLE} MATCH :match').bindparams(match=match), room_filter))
+        if after:
+            after_rank, after_id = after
+            statement = statement.where(db.or_(rank > after_rank,
+                                               db.and_(rank == after_rank, Message.id > after_id)))
+        rows = db.session.execute(statement.order_by(rank, Message.id).limit(limit + 1)).all()
+        hits = [_hit(row, row.rank) for row in rows]
+        return _page(hits, limit, lambda hit: [hit['rank'], hit['id']])
+
+    # FTS5가 없으면 LIKE 검색 (최신순)
+    statement = (db.select(*columns)
+                 .join(User, User.id == Message.user_id)
+                 .where(room_filter, Message.is_encrypted == False,
+                        *(Message.content.ilike(f'%{term}%') for term in terms)))
+    if after:
+        statement = statement.where(Message.id < after[0])
+    rows = db.session.execute(statement.order_by(Message.id.desc()).limit(limit + 1)).all()
+    return _page([_hit(row) for row in rows], limit, lambda hit: [hit['id']])
+
+
+def search_tokens(room_id, tokens, limit=20, cursor=None):
+    """암호화된 메시지 블라인드 토큰 검색 - 모든 토큰을 가진 메시지를 최신순으로"""
+    tokens = clean_tokens(tokens)[:MAX_QUERY_TERMS]
+    if not tokens:
+        return {'results': [], 'next_cursor': None}
+    limit = max(1, min(limit, MAX_SEARCH_LIMIT))
+    after = decode_cursor(cursor)
+
+    matched = (db.select(MessageSearchToken.message_id)
+               .where(MessageSearchToken.room_id == room_id, MessageSearchToken.token.in_(tokens))
+               .group_by(MessageSearchToken.message_id)
+               .having(db.func.count(db.distinct(MessageSearchToken.token)) == len(tokens)))
+    if after:
+        matched = matched.where(MessageSearchToken.message_id < after[0])
+    matched = matched.order_by(MessageSearchToken.message_id.desc()).limit(limit + 1).subquery()
+
+    rows = db.session.execute(
+        db.select(Message.id, Message.room_id, Message.user_id, Message.content,
+                  Message.timestamp, Message.is_encrypted, User.username)
+        .join(matched, matched.c.message_id == Message.id)
+        .join(User, User.id == Message.user_id)
+        .order_by(Message.id.desc())
+    ).all()
+    return _page([_hit(row) for row in rows], limit, lambda hit: [hit['id']])
@@ -0,0 +1,106 @@
+"""
+소켓 세션 (sid -> 사용자)
+연결할 때 JWT를 한 번 검증해 사용자 id/이름과 참가 중인 채팅방 집합을 sid에 묶어 두고,
+이후 소켓 핸들러는 클라이언트가 보낸 username 대신 이 기록을 사용한다.
+(이벤트마다 사용자 조회 쿼리를 하지 않고, 다른 사용자 이름을 사칭할 수도 없다)
+
+참가 방 집합은 연결 시점 기준이다. REST API로 새 방에 들어가면 집합에 없는 방이므로
+한 번 다시 읽고(ROOM_REFRESH_INTERVAL에 한 번까지), 나가기/방 삭제는 forget_room으로 뺀다.
+연결할 때 auth.codec으로 요청한 방송 이벤트 인코딩(app/chat/codec.py)도 함께 기록한다.
+세션은 프로세스마다 따로 보관된다.
+"""
+
+import threading
+import time
+
+from flask import current_app, request
+from flask_jwt_extended import decode_token
+
+from app.chat import codec as socket_codec
+from app.models import User, db, room_participants
+
+# 참가하지 않은 방 요청 시 DB에서 참가 방 목록을 다시 읽는 최소 간격 (초)
+ROOM_REFRESH_INTERVAL = 5.0
+
+
+class SocketSession:
+    __slots__ = ('user_id', 'username', 'rooms', 'refreshed_at', 'codec')
+
+    def __init__(self, user_id, username, rooms, codec='json'):
+        self.user_id = user_id
+        self.username = username
+        self.rooms = rooms
+        self.refreshed_at = time.monotonic()
+        self.codec = codec
+
+
+def _load_rooms(user_id):
+    return set(db.session.execute(
+        db.select(room_participants.c.chat_room_id).where(room_participants.c.user_id == user_id)
+    ).scalars())
+
+
+class SocketSessions:
+    def __init__(self):
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def authenticate(self, auth):
+        """연결 요청의 JWT(auth.token 또는 access_token_cookie)를 검증해 세션을 만든다 - 실패하면 None"""
+        token = (auth or {}).get('token') or request.cookies.get('access_token_cookie')
+        if not token:
+            return None
+        try:
+            claims = decode_token(token)
+            # 리프레시 토큰으로는 소켓을 열 수 없다
+            if claims.get('type') != 'access':
+                return None
+            user_id = int(claims['sub'])
+        except Exception:
+            return None
+
+        username = db.session.execute(db.select(User.username).where(User.id == user_id)).scalar()
+        if username is None:
+            return None
+        codec = socket_codec.negotiate(auth, current_app.config.get('SOCKET_BINARY_CODEC', True))
+        session = SocketSession(user_id, username, _load_rooms(user_id), codec)
+        with self._lock:
+            self._sessions[request.sid] = session
+        return session
+
+    def get(self, sid=None):
+        return self._sessions.get(sid or request.sid)
+
+    def remove(self, sid=None):
+        with self._lock:
+            return self._sessions.pop(sid or request.sid, None)
+
+    def can_access(self, session, room_id):
+        """session 사용자가 room_id 방 참가자인지 (집합에 없으면 가끔 DB로 다시 확인)"""
+        if room_id in session.rooms:
+            return True
+        now = time.monotonic()
+        if now - session.refreshed_at < ROOM_REFRESH_INTERVAL:
+            return False
+        session.rooms = _load_rooms(session.user_id)
+        session.refreshed_at = now
+        return room_id in session.rooms
+
+    def forget_room(self, room_id, user_id=None):
+        """방 나가기/삭제 - 해당 사용자(없으면 모든 사용자) 세션의 참가 방 집합에서 뺀다"""
+        with self._lock:
+            sessions = list(self._sessions.values())
+        for session in sessions:
+            if user_id is None or session.user_id == user_id:
+                session.rooms.discard(room_id)
+
+
+socket_sessions = SocketSessions()
+
+
+def room_id_from(data):
+    """이벤트 데이터의 room 값 -> 정수 방 id (잘못된 값이면 None)"""
+    try:
+        return int(data['room'])
+    except (KeyError, TypeError, ValueError):
+        return None
@@ -0,0 +1,108 @@
+"""
+타이핑 상태 집계
+클라이언트의 typing 이벤트를 방에 바로 중계하지 않고 방별 "입력 중인 사용자" 목록으로 모아,
+TYPING_FLUSH_INTERVAL마다 목록이 바뀐 방에만 typing_state 프레임({room, usernames}) 하나를 보낸다.
+- 같은 sid의 typing 이벤트는 TYPING_THROTTLE 안에 다시 오면 상태가 바뀌지 않는 한 무시한다
+- 마지막 typing 이벤트 후 TYPING_TTL이 지나면 목록에서 자동으로 빠지므로
+  클라이언트가 is_typing=false를 보내지 못하고 끊겨도 표시가 남지 않는다
+- 메시지를 보내거나 방을 나가거나 연결이 끊기면 바로 뺀다
+상태는 프로세스마다 따로 보관된다.
+"""
+
+import threading
+import time
+
+from app import socketio
+from app.chat.broadcast import broadcaster
+
+# 마지막 typing 이벤트 후 입력 중으로 보는 시간 (초, 클라이언트는 이보다 자주 갱신)
+TYPING_TTL = 5.0
+# 같은 sid의 갱신을 받아들이는 최소 간격 (초)
+TYPING_THROTTLE = 1.0
+# typing_state 프레임을 모아 보내는 간격 (초)
+TYPING_FLUSH_INTERVAL = 0.5
+
+
+class TypingAggregator:
+    def __init__(self, ttl=TYPING_TTL, throttle=TYPING_THROTTLE, flush_interval=TYPING_FLUSH_INTERVAL):
+        self.ttl = ttl
+        self.throttle = throttle
+        self.flush_interval = flush_interval
+        self._rooms = {}  # room_id -> {sid: (username, 만료 시각)}
+        self._dirty = set()  # 다음 flush 때 typing_state를 보낼 방
+        self._lock = threading.Lock()
+        self._started = False
+
+    def start(self):
+        """백그라운드 flush 작업 시작 (여러 번 호출해도 한 번만 실행)"""
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+        socketio.start_background_task(self._run)
+
+    def update(self, sid, room_id, username, is_typing):
+        now = time.monotonic()
+        with self._lock:
+            typers = self._rooms.get(room_id)
+            current = typers.get(sid) if typers else None
+            if not is_typing:
+                if current is not None:
+                    del typers[sid]
+                    self._dirty.add(room_id)
+                return
+            if current is not None and current[1] - now > self.ttl - self.throttle:
+                return  # 방금 갱신한 sid
+            if typers is None:
+                typers = self._rooms[room_id] = {}
+            typers[sid] = (username, now + self.ttl)
+            if current is None:
+                self._dirty.add(room_id)
+        if not self._started:
+            self.start()
+
+    def remove(self, sid, room_id=None):
+        """sid를 room_id 방(없으면 모든 방)의 입력 중 목록에서 뺀다"""
+        with self._lock:
+            room_ids = [room_id] if room_id is not None else list(self._rooms)
+            for room_id in room_ids:
+                typers = self._rooms.get(room_id)
+                if typers and typers.pop(sid, None) is not None:
+                    self._dirty.add(room_id)
+
+    def usernames(self, room_id):
+        with self._lock:
+            return self._usernames(room_id)
+
+    def _usernames(self, room_id):
+        # 같은 사용자가 여러 탭에서 입력해도 한 번만
+        return sorted({username for username, _ in self._rooms.get(room_id, {}).values()})
+
+    def flush(self):
+        """만료된 항목을 빼고, 바뀐 방마다 typing_state 프레임을 보낸다"""
+        now = time.monotonic()
+        with self._lock:
+            for room_id, typers in list(self._rooms.items()):
+                expired = [sid for sid, (_, expires_at) in typers.items() if expires_at <= now]
+                for sid in expired:
+                    del typers[sid]
+                if expired:
+                    self._dirty.add(room_id)
+                if not typers:
+                    del self._rooms[room_id]
+            frames = [(room_id, self._usernames(room_id)) for room_id in self._dirty]
+            self._dirty.clear()
+
+        for room_id, usernames in frames:
+            broadcaster.emit('typing_state', {'room': room_id, 'usernames': usernames}, room=room_id)
+
+    def _run(self):
+        while True:
+            try:
+                self.flush()
+            except Exception as e:
+                print(f'타이핑 상태 전송 오류: {e}')
+            socketio.sleep(self.flush_interval)
+
+
+typing_aggregator = TypingAggregator()
@@ -0,0 +1,171 @@
+"""
+Flask CLI 명령
+    flask --app run init                최초 1회 부트스트랩 (스키마 + 관리자 계정 + 정적 파일 압축)
+    flask --app run db-upgrade          스키마 마이그레이션 적용
+    flask --app run check-query-plans   핫 쿼리 전체 스캔 여부 점검
+    flask --app run search-reindex      메시지 전문 검색 인덱스 재구축
+    flask --app run archive-messages    오래된 메시지를 압축 세그먼트로 보관
+    flask --app run compress-static     정적 파일의 .br/.gz 변형 생성
+    flask --app run attachments-gc      멈춘 첨부 파일 업로드와 참조 없는 파일 정리
+"""
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+
+
+def create_admin_user():
+    """기본 관리자 계정이 없으면 생성"""
+    from app.models import User, db
+
+    admin = User.query.filter_by(username='admin').first()
+    if admin:
+        return
+
+    try:
+        # 관리자용 키 쌍 생성
+        from app.crypto import MessageCrypto
+        private_key_pem, public_key_pem = MessageCrypto.generate_key_pair()
+        key_fingerprint = MessageCrypto.generate_fingerprint(public_key_pem)
+
+        admin = User(
+            username='admin',
+            email='admin@myapp.com',
+            is_admin=True,
+            public_key=public_key_pem,
+            key_fingerprint=key_fingerprint
+        )
+        admin.set_password('admin123')
+        db.session.add(admin)
+        db.session.commit()
+        print("Admin user created: username=admin, password=admin123")
+        print(f"Admin key fingerprint: {key_fingerprint}")
+    except Exception as e:
+        db.session.rollback()
+        print(f"Error creating admin user: {e}")
+        # 키 생성 실패시 기본 관리자만 생성
+        admin = User(username='admin', email='admin@myapp.com', is_admin=True)
+        admin.set_password('admin123')
+        db.session.add(admin)
+        db.session.commit()
+        print("Admin user created without encryption keys: username=admin, password=admin123")
+
+
+def bootstrap():
+    """최초 1회 초기화: 누락된 테이블 생성, 마이그레이션 적용, 관리자 계정 생성, 정적 파일 압축"""
+    from app.migrations import upgrade
+
+    applied = upgrade()
+    create_admin_user()
+    if 'static_variants' in current_app.extensions:
+        from app.compression import build_static_variants
+        build_static_variants()
+    return applied
+
+
+@click.command('init')
+@with_appcontext
+def init_command():
+    """DB 스키마와 기본 관리자 계정 초기화 (배포 시 한 번 실행)"""
+    applied = bootstrap()
+    if applied:
+        click.echo(f'적용한 마이그레이션: {", ".join(map(str, applied))}')
+    click.echo('초기화가 완료되었습니다.')
+
+
+@click.command('db-upgrade')
+@click.option('--target', type=int, default=None, help='이 버전까지만 적용')
+@with_appcontext
+def db_upgrade_command(target):
+    """대기 중인 스키마 마이그레이션 적용"""
+    from app.migrations import upgrade
+
+    applied = upgrade(target)
+    if applied:
+        click.echo(f'적용한 마이그레이션: {", ".join(map(str, applied))}')
+    else:
+        click.echo('스키마가 최신 상태입니다.')
+
+
+@click.command('check-query-plans')
+@with_appcontext
+def check_query_plans_command():
+    """핫 쿼리가 전체 테이블 스캔을 하면 실패 (CI용)"""
+    from app.query_plans import check_query_plans
+
+    failures = check_query_plans()
+    if not failures:
+        click.echo('모든 핫 쿼리가 인덱스를 사용합니다.')
+        return
+    for name, scans in failures.items():
+        click.echo(f'[FULL SCAN] {name}: {"; ".join(scans)}', err=True)
+    raise SystemExit(1)
+
+
+@click.command('search-reindex')
+@with_appcontext
+def search_reindex_command():
+    """평문 메시지로 전문 검색(FTS5) 인덱스를 다시 만든다"""
+    from app.chat.search import create_fts_index, rebuild_fts_index
+    from app.models import db
+
+    with db.engine.begin() as conn:
+        if not create_fts_index(conn):
+            click.echo('FTS5를 사용할 수 없는 DB입니다 (LIKE 검색 사용).', err=True)
+            raise SystemExit(1)
+        rebuild_fts_index(conn)
+    click.echo('메시지 검색 인덱스를 다시 만들었습니다.')
+
+
+@click.command('archive-messages')
+@click.option('--days', type=int, default=None, help='이 기간(일)이 지난 메시지 보관 (기본: MESSAGE_ARCHIVE_AFTER_DAYS)')
+@click.option('--room', 'room_id', type=int, default=None, help='이 채팅방만 보관')
+@with_appcontext
+def archive_messages_command(days, room_id):
+    """오래된 메시지를 방별 압축 세그먼트 파일로 옮긴다 (cron 등으로 주기 실행)"""
+    from app.chat.archive import archive_messages
+
+    results = archive_messages(days=days, room_id=room_id)
+    if not results:
+        click.echo('보관할 메시지가 없습니다.')
+        return
+    for rid, count in results.items():
+        click.echo(f'채팅방 {rid}: 메시지 {count}개 보관')
+
+
+@click.command('compress-static')
+@with_appcontext
+def compress_static_command():
+    """정적 파일의 미리 압축한 변형(.br/.gz) 생성"""
+    from app.compression import build_static_variants
+
+    if 'static_variants' not in current_app.extensions:
+        click.echo('응답 압축이 꺼져 있습니다 (COMPRESSION_ENABLED).')
+        return
+    count = build_static_variants()
+    click.echo(f'정적 파일 변형 {count}개가 준비되었습니다.')
+
+
+@click.command('attachments-gc')
+@click.option('--hours', type=int, default=None,
+              help='이 시간 동안 멈춘 업로드 정리 (기본: ATTACHMENT_UPLOAD_EXPIRE_HOURS)')
+@with_appcontext
+def attachments_gc_command(hours):
+    """이어 올리지 않은 업로드와 어떤 첨부 파일도 참조하지 않는 저장 파일 삭제 (cron 등으로 주기 실행)"""
+    from datetime import datetime, timedelta
+    from app.chat.attachments import purge
+
+    if hours is None:
+        hours = current_app.config.get('ATTACHMENT_UPLOAD_EXPIRE_HOURS', 24)
+    removed = purge(datetime.utcnow() - timedelta(hours=hours))
+    click.echo(f'첨부 파일 {removed}개를 정리했습니다.')
+
+
+def register_commands(app):
+    app.cli.add_command(init_command)
+    app.cli.add_command(db_upgrade_command)
+    app.cli.add_command(check_query_plans_command)
+    app.cli.add_command(search_reindex_command)
+    app.cli.add_command(archive_messages_command)
+    app.cli.add_command(compress_static_command)
+    app.cli.add_command(attachments_gc_command)
@@ -0,0 +1,256 @@
+"""
+HTTP 응답 압축
+- 동적 응답(JSON/HTML 등): Accept-Encoding에 따라 brotli 또는 gzip으로 압축한다.
+  COMPRESSION_MIN_SIZE보다 작은 응답은 그대로 보내고, 스트리밍 응답은 청크 단위로 압축한다.
+- 정적 파일: 미리 압축해 둔 .br/.gz 변형을 send_file로 보낸다.
+  변형은 `flask init`/`flask compress-static` 때 만들어 두고, 없거나 원본보다 오래됐으면
+  첫 요청 때 한 번 만든다.
+- 정적 파일 URL에는 수정 시각(v=...)을 붙여, 버전이 붙은 요청은 오래 캐시하게 한다.
+
+brotli는 선택 사항이다 (pip install brotli). 없으면 gzip만 사용한다.
+"""
+
+import gzip
+import mimetypes
+import os
+import zlib
+
+from flask import current_app, request, send_file
+from werkzeug.security import safe_join
+
+try:
+    import brotli
+except ImportError:  # 선택 의존성
+    brotli = None
+
+ENCODINGS = ('br', 'gzip') if brotli is not None else ('gzip',)
+EXTENSIONS = {'br': '.br', 'gzip': '.gz'}
+
+COMPRESSIBLE_MIMETYPES = {
+    'text/html', 'text/css', 'text/plain', 'text/javascript', 'text/csv',
+    'application/json', 'application/javascript', 'application/xml', 'image/svg+xml',
+}
+
+
+def compress(data, encoding, level):
+    if encoding == 'br':
+        return brotli.compress(data, quality=level)
+    return gzip.compress(data, compresslevel=level, mtime=0)
+
+
+def _stream_compressor(encoding, level):
+    """(조각 압축 함수, 마무리 함수) - 스트리밍 응답용"""
+    if encoding == 'br':
+        compressor = brotli.Compressor(quality=level)
+        # 조각마다 flush해서 클라이언트가 받은 만큼 바로 풀 수 있게 한다
+        return (lambda chunk: compressor.process(chunk) + compressor.flush()), compressor.finish
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    return (lambda chunk: compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)), compressor.flush
+
+
+def _compress_stream(chunks, encoding, level):
+    process, finish = _stream_compressor(encoding, level)
+    try:
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode('utf-8')
+            if chunk:
+                yield process(chunk)
+        yield finish()
+    finally:
+        if hasattr(chunks, 'close'):
+            chunks.close()
+
+
+def choose_encoding():
+    """클라이언트가 받을 수 있는 인코딩 중 가장 좋은 것 (없으면 None)"""
+    accepted = request.accept_encodings
+    for encoding in ENCODINGS:
+        if accepted.quality(encoding) > 0:
+            return encoding
+    return None
+
+
+def _level(encoding, static=False):
+    config = current_app.config
+    if encoding == 'br':
+        return config.get('COMPRESSION_BROTLI_STATIC_QUALITY' if static else 'COMPRESSION_BROTLI_QUALITY',
+                          11 if static else 4)
+    return config.get('COMPRESSION_GZIP_STATIC_LEVEL' if static else 'COMPRESSION_GZIP_LEVEL',
+                      9 if static else 6)
+
+
+# ---------------------------------------------------------------------------
+# 동적 응답
+# ---------------------------------------------------------------------------
+
+def _should_compress(response):
+    if request.method == 'HEAD' or response.direct_passthrough:
+        return False
+    if response.status_code < 200 or response.status_code >= 300 or response.status_code in (204, 206):
+        return False
+    if 'Content-Encoding' in response.headers:
+        return False
+    return response.mimetype in COMPRESSIBLE_MIMETYPES
+
+
+def compress_response(response):
+    """after_request 훅 - 압축 가능한 응답을 brotli/gzip으로 압축"""
+    if not _should_compress(response):
+        return response
+
+    response.vary.add('Accept-Encoding')
+    encoding = choose_encoding()
+    if encoding is None:
+        return response
+
+    level = _level(encoding)
+    if response.is_streamed:
+        response.response = _compress_stream(response.response, encoding, level)
+        response.headers.pop('Content-Length', None)
+    else:
+        data = response.get_data()
+        if len(data) < current_app.config.get('COMPRESSION_MIN_SIZE', 1024):
+            return response
+        response.set_data(compress(data, encoding, level))
+
+    response.headers['Content-Encoding'] = encoding
+    # 본문 바이트가 달라졌으므로 강한 ETag는 약한 ETag로 바꾼다
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
+
+
+# ---------------------------------------------------------------------------
+# 정적 파일
+# ---------------------------------------------------------------------------
+
+class StaticVariants:
+    """정적 파일의 미리 압축한 변형(.br/.gz) 관리
+
+    변형 파일의 수정 시각을 원본과 같게 맞춰 두고, 다르면 다시 만든다.
+    """
+
+    def __init__(self, source_dir, cache_dir, min_size=1024):
+        self.source_dir = source_dir
+        self.cache_dir = cache_dir
+        self.min_size = min_size
+
+    def _source(self, filename):
+        path = safe_join(self.source_dir, filename)
+        if path is None or not os.path.isfile(path):
+            return None
+        return path
+
+    def is_compressible(self, filename):
+        mimetype, _ = mimetypes.guess_type(filename)
+        return mimetype in COMPRESSIBLE_MIMETYPES
+
+    def build(self, source, variant, encoding, level):
+        stat = os.stat(source)
+        with open(source, 'rb') as f:
+            data = compress(f.read(), encoding, level)
+        os.makedirs(os.path.dirname(variant), exist_ok=True)
+        tmp_path = f'{variant}.{os.getpid()}.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.utime(tmp_path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+        os.replace(tmp_path, variant)
+
+    def path(self, filename, encoding, level):
+        """filename의 encoding 변형 경로 (압축하지 않는 파일이면 None)"""
+        source = self._source(filename)
+        if source is None or not self.is_compressible(filename):
+            return None
+        stat = os.stat(source)
+        if stat.st_size < self.min_size:
+            return None
+
+        variant = safe_join(self.cache_dir, filename + EXTENSIONS[encoding])
+        try:
+            fresh = os.stat(variant).st_mtime_ns == stat.st_mtime_ns
+        except OSError:
+            fresh = False
+        if not fresh:
+            self.build(source, variant, encoding, level)
+        return variant
+
+    def build_all(self, levels):
+        """모든 압축 대상 정적 파일의 변형 생성 - 만든(또는 최신인) 변형 수"""
+        count = 0
+        for root, _, files in os.walk(self.source_dir):
+            for name in files:
+                filename = os.path.relpath(os.path.join(root, name), self.source_dir).replace(os.sep, '/')
+                for encoding in ENCODINGS:
+                    if self.path(filename, encoding, levels[encoding]):
+                        count += 1
+        return count
+
+
+def static_variants(app=None):
+    app = app or current_app
+    return app.extensions['static_variants']
+
+
+def build_static_variants(app=None):
+    """`flask init`/`flask compress-static`에서 호출 - 정적 파일 변형을 미리 만든다"""
+    app = app or current_app
+    return static_variants(app).build_all({encoding: _level(encoding, static=True) for encoding in ENCODINGS})
+
+
+def _static_version(filename):
+    try:
+        return int(os.path.getmtime(os.path.join(current_app.static_folder, filename)))
+    except OSError:
+        return None
+
+
+def _add_static_version(endpoint, values):
+    """url_for('static', filename=...)에 v=수정 시각을 붙인다 (파일이 바뀌면 URL도 바뀜)"""
+    if endpoint == 'static' and 'filename' in values and 'v' not in values:
+        version = _static_version(values['filename'])
+        if version is not None:
+            values['v'] = version
+
+
+def _precompressed_static(static_view):
+    """Flask 기본 static 뷰를 감싸 미리 압축한 변형을 보낸다"""
+    def view(filename):
+        encoding = choose_encoding()
+        variant = None
+        if encoding is not None:
+            variant = static_variants().path(filename, encoding, _level(encoding, static=True))
+
+        if variant is None:
+            response = static_view(filename=filename)
+        else:
+            mimetype, _ = mimetypes.guess_type(filename)
+            response = send_file(variant, mimetype=mimetype, conditional=True,
+                                 max_age=current_app.get_send_file_max_age(filename))
+            response.headers['Content-Encoding'] = encoding
+
+        if static_variants().is_compressible(filename):
+            response.vary.add('Accept-Encoding')
+        if request.args.get('v'):
+            # 버전이 붙은 URL은 내용이 바뀌지 않으므로 오래 캐시
+            response.cache_control.public = True
+            response.cache_control.max_age = current_app.config.get('STATIC_VERSIONED_MAX_AGE', 31536000)
+            response.cache_control.immutable = True
+            response.cache_control.no_cache = None
+        return response
+    return view
+
+
+def init_compression(app):
+    if not app.config.get('COMPRESSION_ENABLED', True):
+        return
+
+    cache_dir = app.config.get('STATIC_COMPRESSED_DIR') or os.path.join(app.instance_path, 'static_compressed')
+    app.extensions['static_variants'] = StaticVariants(
+        app.static_folder, cache_dir, app.config.get('COMPRESSION_MIN_SIZE', 1024))
+
+    if 'static' in app.view_functions:
+        app.view_functions['static'] = _precompressed_static(app.view_functions['static'])
+        app.url_defaults(_add_static_version)
+    app.after_request(compress_response)
@@ -0,0 +1,54 @@
+"""
+조건부 GET (ETag/Last-Modified)
+목록 API는 응답 본문을 만들기 전에 가벼운 검증 쿼리(개수, 최대 id, 수정 시각 등)로
+ETag를 계산하고, 클라이언트의 If-None-Match와 같으면 본문 없이 304를 돌려준다.
+브라우저는 Cache-Control: no-cache 응답을 다시 요청할 때 If-None-Match를 자동으로 붙이므로
+fetch()를 쓰는 클라이언트 코드는 바꿀 필요가 없다.
+
+삭제는 수정 시각에 드러나지 않으므로 304 여부는 ETag로만 판단하고,
+Last-Modified는 참고용으로만 보낸다.
+"""
+
+import hashlib
+from functools import wraps
+
+from flask import current_app, make_response, request
+
+
+def make_etag(*parts):
+    return hashlib.blake2b(repr(parts).encode('utf-8'), digest_size=16).hexdigest()
+
+
+def _set_validators(response, etag, last_modified):
+    response.set_etag(etag, weak=True)
+    if last_modified is not None:
+        response.last_modified = last_modified
+    # 캐시는 하되 쓰기 전에 항상 다시 확인 (사용자별 데이터이므로 private)
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+
+
+def conditional(validator):
+    """ETag 조건부 응답 데코레이터
+
+    validator(**view_args)는 응답 내용이 바뀌면 함께 바뀌는 값(parts)과
+    마지막 수정 시각(없으면 None)을 (parts, last_modified)로 반환한다.
+    ETag에는 요청 경로와 쿼리 문자열도 포함된다.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            parts, last_modified = validator(*args, **kwargs)
+            etag = make_etag(request.full_path, parts)
+
+            if request.if_none_match.contains_weak(etag):
+                response = current_app.response_class(status=304)
+                _set_validators(response, etag, last_modified)
+                return response
+
+            response = make_response(view(*args, **kwargs))
+            if response.status_code == 200:
+                _set_validators(response, etag, last_modified)
+            return response
+        return wrapper
+    return decorator
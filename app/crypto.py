@@ -13,11 +13,14 @@ from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
 from cryptography.hazmat.backends import default_backend
 from cryptography.hazmat.primitives import padding as sym_padding
 
+from app.metrics import timed
+
 
 class MessageCrypto:
     """메시지 암호화/복호화를 담당하는 클래스"""
     
     @staticmethod
+    @timed('crypto')
     def generate_key_pair():
         """RSA 키 쌍 생성"""
         private_key = rsa.generate_private_key(
@@ -43,6 +46,7 @@ class MessageCrypto:
         return private_pem, public_pem
     
     @staticmethod
+    @timed('crypto')
     def encrypt_message(message, recipient_public_key_pem):
         """메시지를 하이브리드 암호화로 암호화"""
         # 1. AES 키 생성 (256비트)
@@ -85,6 +89,7 @@ class MessageCrypto:
         return base64.b64encode(json.dumps(encrypted_data).encode('utf-8')).decode('utf-8')
     
     @staticmethod
+    @timed('crypto')
     def decrypt_message(encrypted_data, private_key_pem):
         """암호화된 메시지를 복호화"""
         try:
@@ -128,6 +133,7 @@ class MessageCrypto:
             raise ValueError(f"복호화 실패: {str(e)}")
     
     @staticmethod
+    @timed('crypto')
     def generate_fingerprint(public_key_pem):
         """공개키의 지문 생성"""
         public_key = serialization.load_pem_public_key(
@@ -154,11 +160,13 @@ class GroupCrypto:
     """그룹 채팅 암호화를 담당하는 클래스 (AES-GCM 사용)"""
     
     @staticmethod
+    @timed('crypto')
     def generate_group_key():
         """그룹 채팅용 256비트(32바이트) 공유 키 생성"""
         return os.urandom(32) # Base64 인코딩 없이 순수 바이트 반환
     
     @staticmethod
+    @timed('crypto')
     def encrypt_group_key_for_user(group_key_bytes, user_public_key_pem):
         """사용자의 공개키로 그룹 키를 암호화 (RSA-OAEP)"""
         public_key = serialization.load_pem_public_key(
@@ -178,6 +186,7 @@ class GroupCrypto:
         return base64.b64encode(encrypted_group_key).decode('utf-8')
     
     @staticmethod
+    @timed('crypto')
     def decrypt_group_key_for_user(encrypted_group_key_b64, user_private_key_pem):
         """사용자의 개인키로 그룹 키를 복호화 (RSA-OAEP)"""
         private_key = serialization.load_pem_private_key(
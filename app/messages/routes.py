@@ -0,0 +1,177 @@
+from flask import Blueprint, request, jsonify
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from app.models import ChatRoom, Message, User, db
+from app.routing import read_replica
+from app.chat import conversations
+from app.chat import search as message_search
+from app.chat.routes import ONLINE_WINDOW, create_room_record, deliver_message, get_messages
+from datetime import datetime
+from sqlalchemy.exc import IntegrityError
+
+messages_bp = Blueprint('messages', __name__)
+
+# 대화 목록 한 번에 돌려주는 최대 수
+CONVERSATION_PAGE_MAX = 100
+
+def _last_messages(message_ids):
+    """대화별 마지막 메시지 미리보기 (보관/삭제된 메시지는 빠짐)"""
+    rows = db.session.execute(
+        db.select(Message.id, Message.content, Message.message_type, Message.timestamp, Message.user_id,
+                  Message.is_encrypted)
+        .where(Message.id.in_([message_id for message_id in message_ids if message_id]))
+    ).all()
+    return {
+        row.id: {
+            'id': row.id,
+            'content': row.content,
+            'message_type': row.message_type,
+            'timestamp': row.timestamp.isoformat(),
+            'user_id': row.user_id,
+            'is_encrypted': row.is_encrypted
+        }
+        for row in rows
+    }
+
+@messages_bp.route('/api/messages/conversations', methods=['GET'])
+@jwt_required()
+@read_replica
+def get_conversations():
+    """1:1 대화 목록 (마지막 활동 역순) - 다음 페이지는 next_cursor를 before로 넘긴다"""
+    user_id = int(get_jwt_identity())
+    limit = min(max(request.args.get('limit', 30, type=int), 1), CONVERSATION_PAGE_MAX)
+    # 커서는 마지막 항목의 (last_activity, id) - 같은 시각의 대화도 빠짐없이 넘어간다
+    try:
+        before = message_search.decode_cursor(request.args.get('before'))
+        if before is not None:
+            last_activity, conversation_id = before
+            before = (datetime.fromisoformat(last_activity), int(conversation_id))
+    except (ValueError, TypeError):
+        return jsonify({'error': '잘못된 커서입니다.'}), 400
+
+    rows = conversations.list_for(user_id, limit + 1, before)
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    users = {user.id: user for user in db.session.execute(
+        db.select(User.id, User.username, User.last_seen).where(User.id.in_([row.other_id for row in rows]))
+    )}
+    last_messages = _last_messages([row.last_message_id for row in rows])
+    online_since = datetime.utcnow() - ONLINE_WINDOW
+
+    items = []
+    for row in rows:
+        other = users.get(row.other_id)
+        items.append({
+            'id': row.id,
+            'room_id': row.room_id,
+            'user': {
+                'id': row.other_id,
+                'username': other.username if other else None,
+                'is_online': bool(other and other.last_seen and other.last_seen >= online_since)
+            },
+            'last_activity': row.last_activity.isoformat(),
+            'last_message': last_messages.get(row.last_message_id),
+            'unread_count': row.unread_count
+        })
+
+    return jsonify({
+        'conversations': items,
+        'next_cursor': message_search.encode_cursor([rows[-1].last_activity.isoformat(), rows[-1].id])
+                       if has_more else None
+    })
+
+@messages_bp.route('/api/messages/unread-count', methods=['GET'])
+@jwt_required()
+@read_replica
+def get_unread_count():
+    """모든 1:1 대화의 읽지 않은 메시지 수 (대화별 카운터 합계)"""
+    user_id = int(get_jwt_identity())
+    return jsonify({'unread_count': conversations.unread_count(user_id)})
+
+@messages_bp.route('/api/messages/<int:other_id>', methods=['GET'])
+@jwt_required()
+def get_conversation_messages(other_id):
+    """특정 사용자와의 메시지 - 1:1 채팅방의 메시지 목록 API와 같은 응답 (page, per_page, 읽음 처리 포함)"""
+    user_id = int(get_jwt_identity())
+    conversation = conversations.find(user_id, other_id) if other_id != user_id else None
+    if conversation is None:
+        return jsonify({'error': '대화를 찾을 수 없습니다.'}), 404
+    return get_messages(conversation.room_id)
+
+def _send(data, content, is_encrypted):
+    user_id = int(get_jwt_identity())
+    other_id = data.get('recipient_id') or data.get('user_id')
+    if other_id is not None:
+        other = db.session.get(User, other_id) if isinstance(other_id, int) else None
+    else:
+        other = User.query.filter_by(username=data.get('username')).first()
+    if other is None:
+        return jsonify({'error': '사용자를 찾을 수 없습니다.'}), 404
+    if other.id == user_id:
+        return jsonify({'error': '자기 자신과는 채팅할 수 없습니다.'}), 400
+    if not content:
+        return jsonify({'error': '메시지 내용이 필요합니다.'}), 400
+
+    try:
+        tokens = message_search.clean_tokens(data.get('search_tokens'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    user = db.session.get(User, user_id)
+    conversation = conversations.find(user_id, other.id)
+    if conversation is None:
+        if is_encrypted:
+            # 암호문은 방의 그룹 키로 만든 것이어야 하므로 방이 먼저 있어야 한다
+            return jsonify({'error': '대화를 찾을 수 없습니다. 먼저 1:1 채팅방을 만들어 주세요.'}), 404
+        try:
+            # 평문 메시지로 시작한 대화는 암호화하지 않는 방으로 만든다
+            room = create_room_record(user_id, f'{user.username} & {other.username}', [other.username],
+                                      is_private=True, is_encrypted=False)
+            db.session.commit()
+            room_id = room.id
+        except IntegrityError:
+            # 상대가 동시에 대화를 시작했으면 그 방을 사용
+            db.session.rollback()
+            conversation = conversations.find(user_id, other.id)
+            if conversation is None:
+                return jsonify({'error': '대화를 시작할 수 없습니다.'}), 500
+            room_id = conversation.room_id
+    else:
+        room_id = conversation.room_id
+
+    # 종단간 암호화 방에 평문이 저장되지 않도록 한다
+    if not is_encrypted and db.session.execute(
+            db.select(ChatRoom.is_encrypted).where(ChatRoom.id == room_id)).scalar():
+        return jsonify({'error': '암호화된 대화입니다. 방의 그룹 키로 암호화해 /api/messages/send-encrypted로 보내 주세요.'}), 400
+
+    try:
+        payload = deliver_message(room_id, user_id, user.username, content, data.get('reply_to_id'),
+                                  is_encrypted, tokens)
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': '메시지 전송 중 오류가 발생했습니다.'}), 500
+
+    return jsonify({
+        'message': '메시지가 전송되었습니다.',
+        'message_id': payload['id'],
+        'room_id': room_id,
+        'seq': payload['seq'],
+        'timestamp': payload['timestamp']
+    }), 201
+
+@messages_bp.route('/api/messages', methods=['POST'])
+@jwt_required()
+def send_message():
+    """1:1 평문 메시지 전송 (recipient_id 또는 username)
+
+    대화가 없으면 암호화하지 않는 1:1 채팅방을 만들고, 암호화된 대화면 400 (send-encrypted 사용).
+    """
+    data = request.get_json() or {}
+    return _send(data, data.get('content'), bool(data.get('is_encrypted', False)))
+
+@messages_bp.route('/api/messages/send-encrypted', methods=['POST'])
+@jwt_required()
+def send_encrypted_message():
+    """방의 그룹 키로 암호화한 1:1 메시지 전송 (기존 대화만)"""
+    data = request.get_json() or {}
+    return _send(data, data.get('encrypted_content'), True)
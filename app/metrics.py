@@ -0,0 +1,393 @@
+"""
+요청 단위 계측 (선택 사항, METRICS_ENABLED=true일 때만 동작)
+- Flask 요청 시그널로 엔드포인트별 지연 시간 히스토그램과 요청 수를 기록
+- SQLAlchemy before/after_cursor_execute 이벤트로 쿼리 수와 DB 시간을 기록
+- timed('crypto'), timed('serialization') 구간으로 암호화/직렬화 시간을 따로 집계
+- GET /metrics: Prometheus 텍스트 형식으로 노출
+- GET /metrics/profile?seconds=10: 샘플링 프로파일러를 돌려 스택을 접은(folded) 형식으로 반환
+  (flamegraph.pl, speedscope 등에서 바로 열 수 있음)
+
+값은 프로세스마다 따로 집계되므로 워커가 여러 개면 워커별로 수집해야 한다.
+스트리밍 응답은 본문을 보내기 전까지만 지연 시간에 포함된다.
+
+접근 제한: Authorization: Bearer <METRICS_TOKEN>이 필요하다. 토큰을 지정하지 않으면 계측은 하되
+엔드포인트는 404로 닫는다 (리버스 프록시 뒤에서는 모든 요청이 로컬 주소로 보이므로 주소로 허용하지 않음).
+"""
+
+import hmac
+import os
+import sys
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter
+from functools import wraps
+
+from flask import Response, abort, current_app, g, got_request_exception, has_app_context, request, \
+    request_finished, request_started
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.utils import os_modules
+
+# 지연 시간 히스토그램 경계 (초)
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# 요청당 쿼리 수 히스토그램 경계
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 200, 500)
+# 시간을 나눠 집계하는 구간
+SECTIONS = ('db', 'crypto', 'serialization')
+
+PROFILE_MAX_SECONDS = 60
+
+
+class Histogram:
+    """Prometheus 히스토그램 (레이블 조합별 버킷 카운트, 합, 개수)"""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.series = {}
+
+    def observe(self, labels, value):
+        counts = self.series.get(labels)
+        if counts is None:
+            # 버킷별 개수 + [+Inf 개수, 합]
+            counts = self.series[labels] = [0] * len(self.buckets) + [0, 0.0]
+        index = bisect_left(self.buckets, value)
+        if index < len(self.buckets):
+            counts[index] += 1
+        else:
+            counts[len(self.buckets)] += 1
+        counts[-1] += value
+
+    def samples(self, name):
+        for labels, counts in sorted(self.series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                yield f'{name}_bucket', labels + (('le', _format_value(bound)),), cumulative
+            cumulative += counts[len(self.buckets)]
+            yield f'{name}_bucket', labels + (('le', '+Inf'),), cumulative
+            yield f'{name}_sum', labels, counts[-1]
+            yield f'{name}_count', labels, cumulative
+
+
+def _format_value(value):
+    if isinstance(value, float):
+        return repr(value) if value != int(value) else f'{value:.1f}'
+    return str(value)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_sample(name, labels, value):
+    if labels:
+        label_text = ','.join(f'{key}="{_escape(val)}"' for key, val in labels)
+        return f'{name}{{{label_text}}} {_format_value(value)}'
+    return f'{name} {_format_value(value)}'
+
+
+class RequestMetrics:
+    """요청 하나의 계측 값 (flask.g.metrics)"""
+    __slots__ = ('started', 'queries', 'sections')
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.sections = dict.fromkeys(SECTIONS, 0.0)
+
+
+class Metrics:
+    def __init__(self):
+        self.enabled = False
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.requests = Counter()  # (endpoint, method, status) -> 개수
+            self.latency = Histogram(LATENCY_BUCKETS)  # (endpoint, method)
+            self.query_counts = Histogram(QUERY_COUNT_BUCKETS)  # (endpoint,)
+            self.section_seconds = Counter()  # (endpoint, section) -> 초
+            self.query_latency = Histogram(LATENCY_BUCKETS)  # (context,)
+            self.exceptions = Counter()  # (endpoint, 예외 이름)
+
+    # -- 기록 --------------------------------------------------------------
+
+    def add_section(self, section, elapsed):
+        """현재 요청의 구간 시간 추가 (요청 밖이면 무시)"""
+        if has_app_context():
+            current = g.get('metrics')
+            if current is not None:
+                current.sections[section] += elapsed
+
+    def record_query(self, elapsed):
+        context = 'other'
+        if has_app_context():
+            current = g.get('metrics')
+            if current is not None:
+                current.queries += 1
+                current.sections['db'] += elapsed
+                context = 'http'
+        with self._lock:
+            self.query_latency.observe((('context', context),), elapsed)
+
+    def record_request(self, endpoint, method, status, current):
+        elapsed = time.perf_counter() - current.started
+        endpoint_label = (('endpoint', endpoint),)
+        with self._lock:
+            self.requests[(endpoint, method, status)] += 1
+            self.latency.observe(endpoint_label + (('method', method),), elapsed)
+            self.query_counts.observe(endpoint_label, current.queries)
+            for section, seconds in current.sections.items():
+                self.section_seconds[(endpoint, section)] += seconds
+
+    def record_exception(self, endpoint, exception):
+        with self._lock:
+            self.exceptions[(endpoint, type(exception).__name__)] += 1
+
+    # -- 출력 --------------------------------------------------------------
+
+    def render(self, extra=()):
+        """Prometheus 텍스트 형식"""
+        lines = []
+
+        def metric(name, kind, help_text, samples):
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {kind}')
+            lines.extend(_format_sample(*sample) for sample in samples)
+
+        with self._lock:
+            metric('http_requests_total', 'counter', '엔드포인트별 요청 수',
+                   [('http_requests_total', (('endpoint', endpoint), ('method', method), ('status', status)), count)
+                    for (endpoint, method, status), count in sorted(self.requests.items())])
+            metric('http_request_duration_seconds', 'histogram', '엔드포인트별 요청 처리 시간',
+                   self.latency.samples('http_request_duration_seconds'))
+            metric('http_request_queries', 'histogram', '요청당 SQL 쿼리 수',
+                   self.query_counts.samples('http_request_queries'))
+            metric('http_request_section_seconds_total', 'counter', '요청 처리 중 DB/암호화/직렬화에 쓴 시간',
+                   [('http_request_section_seconds_total', (('endpoint', endpoint), ('section', section)), seconds)
+                    for (endpoint, section), seconds in sorted(self.section_seconds.items())])
+            metric('http_request_exceptions_total', 'counter', '처리되지 않은 예외 수',
+                   [('http_request_exceptions_total', (('endpoint', endpoint), ('exception', name)), count)
+                    for (endpoint, name), count in sorted(self.exceptions.items())])
+            metric('db_query_duration_seconds', 'histogram', 'SQL 쿼리 실행 시간 (http: 요청 안, other: 소켓/백그라운드)',
+                   self.query_latency.samples('db_query_duration_seconds'))
+
+        for name, kind, help_text, value in extra:
+            metric(name, kind, help_text, [(name, (), value)])
+        return '\n'.join(lines) + '\n'
+
+
+metrics = Metrics()
+
+
+class timed:
+    """구간 시간 측정 - with timed('crypto'): ... 또는 @timed('crypto')
+
+    계측이 꺼져 있으면 시간도 재지 않는다.
+    """
+    __slots__ = ('section', 'started')
+
+    def __init__(self, section):
+        self.section = section
+        self.started = None
+
+    def __enter__(self):
+        if metrics.enabled:
+            self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        if self.started is not None:
+            metrics.add_section(self.section, time.perf_counter() - self.started)
+            self.started = None
+        return False
+
+    def __call__(self, func):
+        section = self.section
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if not metrics.enabled:
+                return func(*args, **kwargs)
+            with timed(section):
+                return func(*args, **kwargs)
+        return wrapper
+
+
+# ---------------------------------------------------------------------------
+# 훅
+# ---------------------------------------------------------------------------
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('metrics_query_start', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get('metrics_query_start')
+    if starts:
+        metrics.record_query(time.perf_counter() - starts.pop())
+
+
+def _handle_error(exception_context):
+    # 실패한 쿼리는 after_cursor_execute가 불리지 않으므로 시작 시각만 버린다
+    connection = exception_context.connection
+    if connection is not None:
+        starts = connection.info.get('metrics_query_start')
+        if starts:
+            starts.pop()
+
+
+def _endpoint_label():
+    # 매칭되지 않은 URL(404)은 하나로 모아 레이블 수가 늘어나지 않게 한다
+    return request.endpoint or 'none'
+
+
+def _on_request_started(sender, **extra):
+    g.metrics = RequestMetrics()
+
+
+def _on_request_finished(sender, response, **extra):
+    current = g.get('metrics')
+    if current is not None:
+        metrics.record_request(_endpoint_label(), request.method, str(response.status_code), current)
+
+
+def _on_request_exception(sender, exception, **extra):
+    metrics.record_exception(_endpoint_label(), exception)
+
+
+# ---------------------------------------------------------------------------
+# 샘플링 프로파일러
+# ---------------------------------------------------------------------------
+
+def _frame_stack(frame):
+    stack = []
+    while frame is not None:
+        code = frame.f_code
+        stack.append(f'{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})')
+        frame = frame.f_back
+    return ';'.join(reversed(stack))
+
+
+def sample_stacks(seconds, interval=0.005):
+    """seconds초 동안 interval 간격으로 모든 스레드의 스택을 샘플링 - Counter(접은 스택 -> 횟수)
+
+    eventlet에서는 그린 스레드들이 한 OS 스레드에서 돌기 때문에,
+    그 순간 실행 중인 그린 스레드의 스택이 잡힌다.
+    """
+    os_threading, os_time = os_modules()
+    stacks = Counter()
+    own_ident = []
+
+    def run():
+        own_ident.append(os_threading.get_ident())
+        deadline = time.perf_counter() + seconds
+        while time.perf_counter() < deadline:
+            for ident, frame in sys._current_frames().items():
+                if ident != own_ident[0]:
+                    stacks[_frame_stack(frame)] += 1
+            os_time.sleep(interval)
+
+    sampler = os_threading.Thread(target=run, name='metrics-profiler', daemon=True)
+    sampler.start()
+    # 요청 처리 스레드(그린 스레드)는 양보하면서 기다린다
+    while sampler.is_alive():
+        time.sleep(0.05)
+    return stacks
+
+
+# ---------------------------------------------------------------------------
+# 엔드포인트
+# ---------------------------------------------------------------------------
+
+def _check_access():
+    token = current_app.config.get('METRICS_TOKEN')
+    if not token:
+        abort(404)
+    given = request.headers.get('Authorization', '')
+    if not hmac.compare_digest(given.encode(), f'Bearer {token}'.encode()):
+        abort(401)
+
+
+def _extra_metrics():
+    """다른 모듈의 상태 값"""
+    from app.activity import activity_log
+    from app.chat.broadcast import broadcaster
+    from app.chat.ring import message_ring
+    from app.storage import write_queue
+
+    activity = activity_log.stats()
+    ring = message_ring.stats()
+    broadcast = broadcaster.stats()
+    return [
+        ('write_queue_committed_batches_total', 'counter', '단일 writer가 커밋한 배치 수',
+         write_queue.committed_batches),
+        ('write_queue_committed_jobs_total', 'counter', '단일 writer가 커밋한 쓰기 작업 수',
+         write_queue.committed_jobs),
+        ('activity_log_buffered', 'gauge', '플러시 대기 중인 활동 기록 수', activity['buffered']),
+        ('activity_log_flushed_total', 'counter', '싱크에 쓴 활동 기록 수', activity['flushed']),
+        ('activity_log_dropped_total', 'counter', '버린 활동 기록 수', activity['dropped']),
+        ('message_ring_rooms', 'gauge', '최근 메시지 버퍼를 유지 중인 방 수', ring['rooms']),
+        ('message_ring_bytes', 'gauge', '최근 메시지 버퍼 크기 추정치', ring['bytes']),
+        ('message_ring_page_hits_total', 'counter', '버퍼에서 응답한 첫 페이지 요청 수',
+         ring['hits'].get('page', 0)),
+        ('message_ring_page_misses_total', 'counter', 'DB에서 읽은 첫 페이지 요청 수',
+         ring['misses'].get('page', 0)),
+        ('message_ring_resume_hits_total', 'counter', '버퍼에서 응답한 resume 요청 수',
+         ring['hits'].get('resume', 0)),
+        ('message_ring_resume_misses_total', 'counter', 'DB에서 읽은 resume 요청 수',
+         ring['misses'].get('resume', 0)),
+        ('broadcast_pending', 'gauge', '소켓별 대기열에서 전송을 기다리는 이벤트 수', broadcast['pending']),
+        ('broadcast_events_total', 'counter', '방송 요청한 이벤트 수', broadcast['events']),
+        ('broadcast_frames_total', 'counter', '소켓에 보낸 프레임 수', broadcast['frames']),
+        ('broadcast_coalesced_total', 'counter', '최신 값으로 합쳐진 이벤트 수', broadcast['coalesced']),
+        ('broadcast_dropped_total', 'counter', '대기열이 넘쳐 버린 이벤트 수', broadcast['dropped']),
+        ('broadcast_disconnected_total', 'counter', '뒤처져서 연결을 끊은 소켓 수', broadcast['disconnected']),
+    ]
+
+
+def metrics_view():
+    _check_access()
+    return Response(metrics.render(_extra_metrics()), mimetype='text/plain; version=0.0.4')
+
+
+def profile_view():
+    _check_access()
+    try:
+        seconds = min(float(request.args.get('seconds', 10)), PROFILE_MAX_SECONDS)
+        interval = max(float(request.args.get('interval', 0.005)), 0.001)
+    except ValueError:
+        abort(400)
+
+    stacks = sample_stacks(seconds, interval)
+    body = ''.join(f'{stack} {count}\n' for stack, count in stacks.most_common())
+
+    directory = current_app.config.get('METRICS_PROFILE_DIR')
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f'profile-{time.strftime("%Y%m%d-%H%M%S")}-{os.getpid()}.folded')
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(body)
+    return Response(body, mimetype='text/plain')
+
+
+def init_metrics(app):
+    if not app.config.get('METRICS_ENABLED', False):
+        return
+
+    metrics.enabled = True
+    if not event.contains(Engine, 'before_cursor_execute', _before_cursor_execute):
+        event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+        event.listen(Engine, 'handle_error', _handle_error)
+    request_started.connect(_on_request_started, app)
+    request_finished.connect(_on_request_finished, app)
+    got_request_exception.connect(_on_request_exception, app)
+
+    if not app.config.get('METRICS_TOKEN'):
+        print('METRICS_TOKEN이 없어 /metrics, /metrics/profile은 404로 응답합니다.')
+    app.add_url_rule('/metrics', 'metrics', metrics_view)
+    app.add_url_rule('/metrics/profile', 'metrics_profile', profile_view)
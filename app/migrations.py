@@ -0,0 +1,253 @@
+"""
+버전 기반 스키마 마이그레이션
+db.create_all()은 없는 테이블만 만들기 때문에, 기존 DB의 컬럼/인덱스 변경은
+여기에 순서대로 등록한 마이그레이션으로 반영한다.
+
+새 마이그레이션 추가 방법:
+1. app/models.py에 컬럼/인덱스를 추가 (새 DB는 create_all로 바로 최신 스키마가 됨)
+2. 아래에 @migration(다음 버전, '설명') 함수를 추가
+   - 새 DB에서도 실행되므로 이미 반영된 경우를 건너뛰도록 작성한다
+"""
+
+from datetime import datetime
+
+from sqlalchemy import inspect, text
+
+from app.models import db
+
+MIGRATIONS = []
+
+
+def migration(version, description):
+    """마이그레이션 등록 데코레이터"""
+    def decorator(func):
+        MIGRATIONS.append((version, description, func))
+        MIGRATIONS.sort(key=lambda item: item[0])
+        return func
+    return decorator
+
+
+def _ensure_version_table(conn):
+    conn.execute(text(
+        'CREATE TABLE IF NOT EXISTS schema_migrations ('
+        'version INTEGER PRIMARY KEY, '
+        'description VARCHAR(200), '
+        'applied_at TIMESTAMP)'
+    ))
+
+
+def current_version(conn):
+    _ensure_version_table(conn)
+    return conn.execute(text('SELECT MAX(version) FROM schema_migrations')).scalar() or 0
+
+
+def has_column(conn, table, column):
+    return any(col['name'] == column for col in inspect(conn).get_columns(table))
+
+
+def add_column(conn, table, column, ddl):
+    """컬럼이 없을 때만 ALTER TABLE ADD COLUMN"""
+    if not has_column(conn, table, column):
+        conn.execute(text(f'ALTER TABLE {table} ADD COLUMN {column} {ddl}'))
+
+
+def create_indexes(conn, *names):
+    """models.py에 선언된 인덱스를 이름으로 찾아 없으면 생성"""
+    indexes = {index.name: index for table in db.metadata.tables.values() for index in table.indexes}
+    for name in names:
+        indexes[name].create(conn, checkfirst=True)
+
+
+def upgrade(target=None):
+    """누락된 테이블을 만들고 대기 중인 마이그레이션을 순서대로 적용
+
+    적용한 마이그레이션 버전 목록을 반환한다.
+    """
+    db.create_all(bind_key=None)
+
+    applied = []
+    with db.engine.begin() as conn:
+        version = current_version(conn)
+
+    for number, description, func in MIGRATIONS:
+        if number <= version or (target is not None and number > target):
+            continue
+        with db.engine.begin() as conn:
+            func(conn)
+            conn.execute(
+                text('INSERT INTO schema_migrations (version, description, applied_at) '
+                     'VALUES (:version, :description, :applied_at)'),
+                {'version': number, 'description': description, 'applied_at': datetime.utcnow()}
+            )
+        applied.append(number)
+    return applied
+
+
+# ---------------------------------------------------------------------------
+# 마이그레이션 목록
+# ---------------------------------------------------------------------------
+
+@migration(1, 'event.fire_at 알림 스케줄 컬럼')
+def _add_event_fire_at(conn):
+    from app.calendar.recurrence import REPEAT_RULES, compute_fire_at
+
+    add_column(conn, 'event', 'fire_at', 'DATETIME')
+    create_indexes(conn, 'ix_event_fire_at')
+
+    # 앞으로 발생할 이벤트의 다음 알림 시각 채우기
+    now = datetime.utcnow()
+    event = db.metadata.tables['event']
+    rows = conn.execute(
+        db.select(event.c.id, event.c.start_time, event.c.repeat, event.c.repeat_until,
+                  event.c.notification_minutes)
+        .where(event.c.fire_at.is_(None))
+        .where(db.or_(event.c.start_time >= now, event.c.repeat.in_(REPEAT_RULES)))
+    ).all()
+    updates = []
+    for row in rows:
+        fire_at = compute_fire_at(row.start_time, row.repeat, row.repeat_until,
+                                  row.notification_minutes, now=now)
+        if fire_at is not None:
+            updates.append({'event_id': row.id, 'fire_at': fire_at})
+    if updates:
+        conn.execute(
+            event.update().where(event.c.id == db.bindparam('event_id')).values(fire_at=db.bindparam('fire_at')),
+            updates
+        )
+
+
+@migration(2, '핫 쿼리 경로 인덱스 팩')
+def _add_hot_path_indexes(conn):
+    create_indexes(
+        conn,
+        'ix_message_room_timestamp',
+        'ix_message_room_unread',
+        'ix_event_user_start',
+        'ix_event_repeat_group',
+        'ix_event_share_shared_with',
+        'ix_user_group_key_room',
+        'ix_room_participants_room',
+        'ix_user_last_seen',
+        'ix_user_activity_user_time',
+    )
+
+
+@migration(3, '메시지 전문 검색 인덱스 (FTS5 + 블라인드 토큰)')
+def _add_message_search(conn):
+    from app.chat.search import create_fts_index
+
+    create_indexes(conn, 'ix_message_search_token_room_token', 'ix_message_search_token_message')
+    # SQLite에서만 FTS5 테이블/트리거 생성 (그 외 DB는 LIKE 검색으로 대체)
+    create_fts_index(conn)
+
+
+@migration(4, '메시지 보관 세그먼트 인덱스')
+def _add_message_archive(conn):
+    create_indexes(conn, 'ix_message_archive_segment_room')
+
+
+@migration(5, '방별 메시지 순번 (message.seq, chat_room.last_seq)')
+def _add_message_seq(conn):
+    add_column(conn, 'message', 'seq', 'INTEGER')
+    add_column(conn, 'chat_room', 'last_seq', 'INTEGER NOT NULL DEFAULT 0')
+
+    # 기존 메시지에 id 순으로 순번 부여 (보관된 메시지 수만큼 건너뛰고 시작)
+    message = db.metadata.tables['message']
+    chat_room = db.metadata.tables['chat_room']
+    segment = db.metadata.tables['message_archive_segment']
+    offsets = dict(conn.execute(
+        db.select(segment.c.room_id, db.func.sum(segment.c.message_count)).group_by(segment.c.room_id)
+    ).all())
+    last_seqs = {}
+    updates = []
+    rows = conn.execute(
+        db.select(message.c.id, message.c.room_id).where(message.c.seq.is_(None))
+        .order_by(message.c.room_id, message.c.id)
+    ).all()
+    for message_id, room_id in rows:
+        if room_id not in last_seqs:
+            last_seqs[room_id] = conn.execute(
+                db.select(db.func.max(message.c.seq)).where(message.c.room_id == room_id)
+            ).scalar() or offsets.get(room_id, 0)
+        last_seqs[room_id] += 1
+        updates.append({'message_id': message_id, 'seq': last_seqs[room_id]})
+    for i in range(0, len(updates), 1000):
+        conn.execute(
+            message.update().where(message.c.id == db.bindparam('message_id')).values(seq=db.bindparam('seq')),
+            updates[i:i + 1000]
+        )
+    for room_id, last_seq in last_seqs.items():
+        conn.execute(chat_room.update().where(chat_room.c.id == room_id).values(last_seq=last_seq))
+
+    create_indexes(conn, 'ix_message_room_seq')
+
+
+@migration(6, '첨부 파일 (attachment, attachment_upload) 인덱스')
+def _add_attachments(conn):
+    create_indexes(conn, 'ix_attachment_sha256', 'ix_attachment_room', 'ix_attachment_upload_updated')
+
+
+@migration(7, '1:1 대화 색인 (conversation) 및 기존 1:1 채팅방 등록')
+def _add_conversations(conn):
+    create_indexes(conn, 'ix_conversation_room', 'ix_conversation_low_activity', 'ix_conversation_high_activity')
+
+    chat_room = db.metadata.tables['chat_room']
+    message = db.metadata.tables['message']
+    participants = db.metadata.tables['room_participants']
+    conversation = db.metadata.tables['conversation']
+
+    rooms = conn.execute(
+        db.select(chat_room.c.id, chat_room.c.last_activity)
+        .where(chat_room.c.is_group == False, chat_room.c.is_private == True)
+        .order_by(chat_room.c.last_activity.desc())
+    ).all()
+    members = {}
+    for room_id, user_id in conn.execute(
+        db.select(participants.c.chat_room_id, participants.c.user_id)
+        .where(participants.c.chat_room_id.in_([room.id for room in rooms]))
+    ):
+        members.setdefault(room_id, []).append(user_id)
+
+    # 같은 쌍의 1:1 방이 여러 개면 가장 최근에 활동한 방을 사용
+    pairs = {tuple(row) for row in conn.execute(db.select(conversation.c.user_low_id, conversation.c.user_high_id))}
+    linked = set(conn.execute(db.select(conversation.c.room_id)).scalars())
+    rows = []
+    for room in rooms:
+        users = members.get(room.id, [])
+        if len(users) != 2 or room.id in linked:
+            continue
+        low, high = sorted(users)
+        if (low, high) in pairs:
+            continue
+        pairs.add((low, high))
+        unread = dict(conn.execute(
+            db.select(message.c.user_id, db.func.count()).where(message.c.room_id == room.id,
+                                                                message.c.is_read == False)
+            .group_by(message.c.user_id)
+        ).all())
+        rows.append({
+            'user_low_id': low, 'user_high_id': high, 'room_id': room.id,
+            'last_activity': room.last_activity or datetime.utcnow(),
+            'last_message_id': conn.execute(
+                db.select(db.func.max(message.c.id)).where(message.c.room_id == room.id)).scalar(),
+            # 상대가 보낸 읽지 않은 메시지 수
+            'low_unread': unread.get(high, 0), 'high_unread': unread.get(low, 0),
+        })
+    if rows:
+        conn.execute(conversation.insert(), rows)
+
+
+@migration(8, '방별 메시지 수정/삭제 버전 (chat_room.version)')
+def _add_room_version(conn):
+    add_column(conn, 'chat_room', 'version', 'INTEGER NOT NULL DEFAULT 0')
+
+
+@migration(9, '사용자별 캘린더 버전 (user.calendar_version)')
+def _add_calendar_version(conn):
+    add_column(conn, 'user', 'calendar_version', 'INTEGER NOT NULL DEFAULT 0')
+
+
+@migration(10, '가져온 이벤트의 iCalendar UID (event.ical_uid)')
+def _add_event_ical_uid(conn):
+    add_column(conn, 'event', 'ical_uid', 'VARCHAR(255)')
+    create_indexes(conn, 'ix_event_user_ical_uid')
@@ -2,13 +2,18 @@ from werkzeug.security import generate_password_hash, check_password_hash
 from datetime import datetime, date
 from flask_sqlalchemy import SQLAlchemy
 
+from app.routing import RoutingSession
+
 # db 인스턴스는 __init__.py에서 초기화되지만 여기서는 참조만 함
 # 실제 초기화는 create_app()에서 발생
-db = SQLAlchemy()
+# 세션은 읽기 전용 복제본 라우팅을 지원 (app/routing.py)
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 
 room_participants = db.Table('room_participants',
     db.Column('user_id', db.Integer, db.ForeignKey('user.id'), primary_key=True),
-    db.Column('chat_room_id', db.Integer, db.ForeignKey('chat_room.id'), primary_key=True)
+    db.Column('chat_room_id', db.Integer, db.ForeignKey('chat_room.id'), primary_key=True),
+    # 기본키 (user_id, chat_room_id)로는 방 기준 조회가 안 되므로 별도 인덱스
+    db.Index('ix_room_participants_room', 'chat_room_id')
 )
 
 class User(db.Model):
@@ -19,7 +24,9 @@ class User(db.Model):
     email = db.Column(db.String(120), unique=True)
     is_admin = db.Column(db.Boolean, default=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    last_seen = db.Column(db.DateTime, default=datetime.utcnow)
+    last_seen = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    # 이 사용자가 보는 이벤트(본인/공유받은)가 바뀔 때마다 증가 (워커별 캘린더 캐시 무효화, app/calendar/listeners.py)
+    calendar_version = db.Column(db.Integer, default=0, server_default='0', nullable=False)
     
     # 종단간 암호화를 위한 RSA 키 쌍
     public_key = db.Column(db.Text)  # PEM 형식의 공개키
@@ -58,9 +65,17 @@ class Event(db.Model):
     is_repeat_master = db.Column(db.Boolean, default=False)  # 반복 이벤트의 마스터인지
     repeat_until = db.Column(db.DateTime)  # 반복 종료 날짜
     notification_minutes = db.Column(db.Integer, default=15)  # 알림 시간 (분 단위)
+    fire_at = db.Column(db.DateTime, index=True)  # 다음 알림 발송 시각 (알림 스케줄러용)
     is_shared = db.Column(db.Boolean, default=False)  # 공유 여부
     color = db.Column(db.String(7), default='#3788d8')  # 이벤트 색상 (HEX)
     priority = db.Column(db.String(20), default='normal')  # low, normal, high, urgent
+    ical_uid = db.Column(db.String(255))  # 가져온 iCalendar UID (다시 가져올 때 같은 이벤트를 갱신)
+    
+    __table_args__ = (
+        db.Index('ix_event_user_start', 'user_id', 'start_time'),
+        db.Index('ix_event_repeat_group', 'repeat_group_id', 'user_id'),
+        db.Index('ix_event_user_ical_uid', 'user_id', 'ical_uid'),
+    )
 
 class EventShare(db.Model):
     """이벤트 공유를 위한 모델"""
@@ -77,7 +92,10 @@ class EventShare(db.Model):
     shared_by = db.relationship('User', foreign_keys=[shared_by_user_id], backref='sent_event_shares')
     
     # 복합 유니크 제약조건
-    __table_args__ = (db.UniqueConstraint('event_id', 'shared_with_user_id', name='unique_event_share'),)
+    __table_args__ = (
+        db.UniqueConstraint('event_id', 'shared_with_user_id', name='unique_event_share'),
+        db.Index('ix_event_share_shared_with', 'shared_with_user_id', 'permission'),
+    )
 
 class ChatRoom(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -88,6 +106,10 @@ class ChatRoom(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     created_by = db.Column(db.Integer, db.ForeignKey('user.id'))
     last_activity = db.Column(db.DateTime, default=datetime.utcnow)
+    # 마지막으로 할당한 메시지 순번 (Message.seq)
+    last_seq = db.Column(db.Integer, default=0, server_default='0', nullable=False)
+    # 메시지 수정/삭제마다 증가 (다른 워커의 최근 메시지 링 버퍼가 오래된 내용을 응답하지 않도록)
+    version = db.Column(db.Integer, default=0, server_default='0', nullable=False)
     
     # 그룹 채팅 암호화를 위한 키
     encryption_key = db.Column(db.Text)  # AES 그룹 키 (참가자들에게 RSA로 암호화되어 전달)
@@ -96,8 +118,10 @@ class ChatRoom(db.Model):
     # 관계 설정
     participants = db.relationship('User', secondary=room_participants, 
                                  back_populates='chat_rooms')
-    messages = db.relationship('Message', backref='room', lazy=True, 
-                             cascade='all, delete-orphan')
+    # 메시지가 많은 방을 지울 때 ORM이 메시지를 모두 읽지 않도록 passive_deletes 사용
+    # (방 삭제는 app/chat/archive.py의 delete_room으로 일괄 삭제)
+    messages = db.relationship('Message', backref='room', lazy='dynamic', 
+                             cascade='all, delete-orphan', passive_deletes=True)
     creator = db.relationship('User', foreign_keys=[created_by], backref='created_rooms')
 
 class Message(db.Model):
@@ -107,18 +131,123 @@ class Message(db.Model):
     file_url = db.Column(db.String(200))
     file_name = db.Column(db.String(200))
     timestamp = db.Column(db.DateTime, default=datetime.utcnow)
-    room_id = db.Column(db.Integer, db.ForeignKey('chat_room.id'), nullable=False)
+    room_id = db.Column(db.Integer, db.ForeignKey('chat_room.id', ondelete='CASCADE'), nullable=False)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     is_read = db.Column(db.Boolean, default=False)
     is_edited = db.Column(db.Boolean, default=False)
     edited_at = db.Column(db.DateTime)
     reply_to_id = db.Column(db.Integer, db.ForeignKey('message.id'))
+    # 방 안에서 1씩 증가하는 순번 - 재연결 시 놓친 메시지 범위 조회용
+    seq = db.Column(db.Integer)
     
     # 암호화 관련 필드
     is_encrypted = db.Column(db.Boolean, default=True)  # 메시지가 암호화되었는지 여부
     
     # 자기 참조 관계 (답글)
     reply_to = db.relationship('Message', remote_side=[id], backref='replies')
+    
+    __table_args__ = (
+        db.Index('ix_message_room_timestamp', 'room_id', 'timestamp'),
+        db.Index('ix_message_room_unread', 'room_id', 'is_read', 'user_id'),
+        db.Index('ix_message_room_seq', 'room_id', 'seq', unique=True),
+    )
+
+class MessageSearchToken(db.Model):
+    """암호화된 메시지 검색용 블라인드 토큰
+    서버는 내용을 볼 수 없으므로, 클라이언트가 방 키로 계산한 키워드 HMAC 값만 저장한다.
+    (평문 메시지는 message_fts 전문 검색 인덱스로 검색, app/chat/search.py 참고)
+    """
+    id = db.Column(db.Integer, primary_key=True)
+    message_id = db.Column(db.Integer, db.ForeignKey('message.id'), nullable=False)
+    room_id = db.Column(db.Integer, db.ForeignKey('chat_room.id'), nullable=False)
+    token = db.Column(db.String(64), nullable=False)
+
+    __table_args__ = (
+        db.Index('ix_message_search_token_room_token', 'room_id', 'token', 'message_id'),
+        db.Index('ix_message_search_token_message', 'message_id'),
+    )
+
+class MessageArchiveSegment(db.Model):
+    """보관된 메시지 세그먼트 파일 목록
+    방마다 오래된 메시지를 id 순서대로 압축 파일(JSON Lines + gzip)에 추가 전용으로 저장하고,
+    보관된 메시지는 항상 해당 방에서 id가 가장 작은 메시지들이다.
+    """
+    id = db.Column(db.Integer, primary_key=True)
+    room_id = db.Column(db.Integer, db.ForeignKey('chat_room.id'), nullable=False)
+    path = db.Column(db.String(300), nullable=False)  # 보관 디렉터리 기준 상대 경로
+    first_message_id = db.Column(db.Integer, nullable=False)
+    last_message_id = db.Column(db.Integer, nullable=False)
+    first_timestamp = db.Column(db.DateTime)
+    last_timestamp = db.Column(db.DateTime)
+    message_count = db.Column(db.Integer, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('ix_message_archive_segment_room', 'room_id', 'last_message_id'),
+    )
+
+class Attachment(db.Model):
+    """채팅방에 올린 첨부 파일
+    파일 내용은 SHA-256 해시 이름으로 한 번만 저장하고(app/chat/attachments.py), 같은 내용을 여러 번 올리면
+    행만 늘어난다. 암호화된 파일은 클라이언트가 chunk_size 단위로 나눠 각각 암호화한 바이트열이다.
+    """
+    id = db.Column(db.Integer, primary_key=True)
+    sha256 = db.Column(db.String(64), nullable=False)
+    size = db.Column(db.BigInteger, nullable=False)
+    file_name = db.Column(db.String(200), nullable=False)
+    mime_type = db.Column(db.String(100))
+    chunk_size = db.Column(db.Integer)  # 암호화 전 청크 크기 (암호화된 파일만)
+    is_encrypted = db.Column(db.Boolean, default=False)
+    room_id = db.Column(db.Integer, db.ForeignKey('chat_room.id', ondelete='CASCADE'), nullable=False)
+    uploaded_by = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('ix_attachment_sha256', 'sha256'),
+        db.Index('ix_attachment_room', 'room_id'),
+    )
+
+class AttachmentUpload(db.Model):
+    """진행 중인 분할 업로드 (받은 바이트 수까지 이어 올릴 수 있음)"""
+    id = db.Column(db.String(32), primary_key=True)  # 추측할 수 없는 업로드 토큰
+    room_id = db.Column(db.Integer, db.ForeignKey('chat_room.id', ondelete='CASCADE'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    file_name = db.Column(db.String(200), nullable=False)
+    mime_type = db.Column(db.String(100))
+    size = db.Column(db.BigInteger, nullable=False)
+    received = db.Column(db.BigInteger, default=0, nullable=False)
+    sha256 = db.Column(db.String(64))  # 클라이언트가 알려 준 전체 해시 (있으면 완료 시 검증)
+    chunk_size = db.Column(db.Integer)
+    is_encrypted = db.Column(db.Boolean, default=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('ix_attachment_upload_updated', 'updated_at'),
+    )
+
+class Conversation(db.Model):
+    """1:1 대화 색인 (app/chat/conversations.py)
+    두 사용자 쌍마다 하나이며 user_low_id < user_high_id로 정규화한다. 메시지는 room_id의 1:1 채팅방에
+    저장되고, 이 행은 대화 목록 정렬용 마지막 활동 시각과 사용자별 읽지 않은 수만 가진다.
+    """
+    id = db.Column(db.Integer, primary_key=True)
+    user_low_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    user_high_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    room_id = db.Column(db.Integer, db.ForeignKey('chat_room.id', ondelete='CASCADE'), nullable=False)
+    last_activity = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    last_message_id = db.Column(db.Integer)  # 보관/삭제될 수 있으므로 FK 없음
+    low_unread = db.Column(db.Integer, default=0, server_default='0', nullable=False)  # user_low_id가 읽지 않은 수
+    high_unread = db.Column(db.Integer, default=0, server_default='0', nullable=False)
+
+    __table_args__ = (
+        db.UniqueConstraint('user_low_id', 'user_high_id', name='uq_conversation_pair'),
+        db.CheckConstraint('user_low_id < user_high_id', name='ck_conversation_pair_order'),
+        db.Index('ix_conversation_room', 'room_id', unique=True),
+        # 사용자별 대화 목록 (사용자가 어느 쪽인지에 따라 둘 중 하나를 사용)
+        db.Index('ix_conversation_low_activity', 'user_low_id', 'last_activity'),
+        db.Index('ix_conversation_high_activity', 'user_high_id', 'last_activity'),
+    )
 
 class UserGroupKey(db.Model):
     """각 사용자별로 그룹 채팅방의 암호화 키를 저장하는 테이블"""
@@ -133,7 +262,11 @@ class UserGroupKey(db.Model):
     room = db.relationship('ChatRoom', backref='user_keys')
     
     # 복합 유니크 제약조건
-    __table_args__ = (db.UniqueConstraint('user_id', 'room_id', name='unique_user_room_key'),)
+    # (user_id, room_id) 조회는 유니크 제약조건의 인덱스를 사용
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'room_id', name='unique_user_room_key'),
+        db.Index('ix_user_group_key_room', 'room_id'),
+    )
 
 
 
@@ -157,4 +290,6 @@ class UserActivity(db.Model):
     timestamp = db.Column(db.DateTime, default=datetime.utcnow)
     details = db.Column(db.Text)
     
-    user = db.relationship('User', backref='activities')
\ No newline at end of file
+    user = db.relationship('User', backref='activities')
+    
+    __table_args__ = (db.Index('ix_user_activity_user_time', 'user_id', 'timestamp'),)
\ No newline at end of file
@@ -0,0 +1,113 @@
+"""
+핫 쿼리 실행 계획 점검
+라우트 모듈의 실제 쿼리 형태를 EXPLAIN QUERY PLAN으로 확인해,
+자주 실행되는 쿼리가 전체 테이블 스캔으로 떨어지면 실패로 보고한다.
+(`flask check-query-plans`로 실행, SQLite 전용)
+"""
+
+from datetime import datetime, timedelta
+
+from app.models import (Conversation, Event, EventShare, Message, MessageSearchToken, User, UserGroupKey, db,
+                        room_participants)
+
+# 전체 스캔이 되면 안 되는 테이블
+HOT_TABLES = {'message', 'event', 'event_share', 'user_group_key', 'room_participants', 'user',
+              'user_activity', 'message_search_token', 'conversation'}
+
+
+def hot_queries():
+    """(이름, SELECT 문) 목록 - 각 라우트의 쿼리 형태를 그대로 따른다"""
+    now = datetime.utcnow()
+    user_id, room_id, event_id = 1, 1, 1
+    shared_event_ids = db.select(EventShare.event_id).where(EventShare.shared_with_user_id == user_id)
+
+    return [
+        # chat.get_messages: 방의 최근 메시지 페이지
+        ('messages_page', db.select(Message).where(Message.room_id == room_id)
+            .order_by(Message.timestamp.desc()).limit(50)),
+        # chat.handle_resume: 재연결 시 놓친 메시지 범위
+        ('message_resume_range', db.select(Message).where(Message.room_id == room_id, Message.seq > 100)
+            .order_by(Message.seq).limit(501)),
+        # chat.get_rooms: 방의 마지막 메시지
+        ('room_last_message', db.select(Message).where(Message.room_id == room_id)
+            .order_by(Message.timestamp.desc()).limit(1)),
+        # chat.get_rooms: 읽지 않은 메시지 수
+        ('room_unread_count', db.select(db.func.count(Message.id)).where(
+            Message.room_id == room_id, Message.user_id != user_id, Message.is_read == False)),
+        # chat 권한 확인: 방 참가자 목록
+        ('room_participants', db.select(room_participants.c.user_id)
+            .where(room_participants.c.chat_room_id == room_id)),
+        # chat.get_room_encryption_key / get_messages: 사용자 그룹 키
+        ('user_group_key', db.select(UserGroupKey).where(
+            UserGroupKey.user_id == user_id, UserGroupKey.room_id == room_id)),
+        # calendar.get_events: 본인 이벤트 기간 조회
+        ('events_range', db.select(Event).where(
+            Event.user_id == user_id, Event.start_time >= now, Event.start_time <= now + timedelta(days=31))
+            .order_by(Event.start_time)),
+        # calendar.get_events(include_shared): 본인 + 공유 이벤트
+        ('events_with_shared', db.select(Event).where(
+            db.or_(Event.user_id == user_id, Event.id.in_(shared_event_ids)))),
+        # calendar.get_events: 공유 권한 조회
+        ('event_share_lookup', db.select(EventShare).where(
+            EventShare.event_id == event_id, EventShare.shared_with_user_id == user_id)),
+        # calendar.delete_repeat_group
+        ('repeat_group', db.select(Event).where(
+            Event.repeat_group_id == 'group', Event.user_id == user_id)),
+        # calendar.import_ics: 다시 가져온 UID의 기존 이벤트
+        ('event_ical_uid', db.select(Event.id, Event.ical_uid, Event.repeat_group_id).where(
+            Event.user_id == user_id, Event.ical_uid.in_(['uid-1', 'uid-2']))),
+        # 알림 스케줄러 refill
+        ('notification_refill', db.select(Event.id, Event.fire_at).where(
+            Event.fire_at.isnot(None), Event.fire_at <= now + timedelta(hours=6))),
+        # chat.search_room_messages: 암호화된 메시지 블라인드 토큰 검색
+        ('message_token_search', db.select(MessageSearchToken.message_id).where(
+            MessageSearchToken.room_id == room_id, MessageSearchToken.token.in_(['a' * 64, 'b' * 64]))
+            .group_by(MessageSearchToken.message_id)
+            .order_by(MessageSearchToken.message_id.desc()).limit(21)),
+        # messages.get_conversations: 사용자의 1:1 대화 목록 (작은 id 쪽 / 큰 id 쪽)
+        ('conversations_low', db.select(Conversation).where(
+            Conversation.user_low_id == user_id, db.tuple_(Conversation.last_activity, Conversation.id) < (now, 1))
+            .order_by(Conversation.last_activity.desc(), Conversation.id.desc()).limit(31)),
+        ('conversations_high', db.select(Conversation).where(
+            Conversation.user_high_id == user_id, db.tuple_(Conversation.last_activity, Conversation.id) < (now, 1))
+            .order_by(Conversation.last_activity.desc(), Conversation.id.desc()).limit(31)),
+        # conversations.find: 두 사용자의 1:1 대화
+        ('conversation_pair', db.select(Conversation).where(
+            Conversation.user_low_id == 1, Conversation.user_high_id == 2)),
+        # conversations.record_message / mark_read: 방 기준 갱신
+        ('conversation_room', db.select(Conversation.id).where(Conversation.room_id == room_id)),
+        # 최근 접속 사용자 (온라인 판정)
+        ('recently_seen_users', db.select(User.id).where(User.last_seen > now - timedelta(minutes=5))),
+    ]
+
+
+def explain(conn, statement):
+    compiled = statement.compile(dialect=conn.dialect, compile_kwargs={'render_postcompile': True})
+    params = tuple(compiled.params[name] for name in compiled.positiontup)
+    rows = conn.exec_driver_sql(f'EXPLAIN QUERY PLAN {compiled}', params).all()
+    return [row[-1] for row in rows]
+
+
+def full_scans(plan):
+    """실행 계획에서 핫 테이블 전체 스캔 항목만 골라낸다"""
+    scans = []
+    for detail in plan:
+        if not detail.startswith('SCAN '):
+            continue
+        table = detail.split()[1].strip('"')
+        if table in HOT_TABLES:
+            scans.append(detail)
+    return scans
+
+
+def check_query_plans():
+    """{쿼리 이름: 전체 스캔 항목} - 비어 있으면 통과"""
+    failures = {}
+    with db.engine.connect() as conn:
+        if conn.dialect.name != 'sqlite':
+            raise RuntimeError('실행 계획 점검은 SQLite에서만 지원합니다.')
+        for name, statement in hot_queries():
+            scans = full_scans(explain(conn, statement))
+            if scans:
+                failures[name] = scans
+    return failures
@@ -0,0 +1,60 @@
+"""
+읽기/쓰기 세션 라우팅
+@read_replica가 붙은 읽기 위주 엔드포인트의 SELECT는 읽기 전용 복제본으로,
+그 외 모든 쓰기와 일반 요청은 기본(primary) DB로 보낸다.
+
+복제본은 SQLALCHEMY_BINDS의 'replica_' 접두사 키로 설정한다 (config.py 참고).
+"""
+
+import random
+from functools import wraps
+
+from flask import current_app, g, has_app_context
+from flask_sqlalchemy.session import Session
+from sqlalchemy.sql.dml import UpdateBase
+from sqlalchemy.sql.selectable import Select
+
+REPLICA_BIND_PREFIX = 'replica_'
+
+
+def replica_bind_keys(app=None):
+    app = app or current_app
+    binds = app.config.get('SQLALCHEMY_BINDS') or {}
+    return sorted(key for key in binds if key.startswith(REPLICA_BIND_PREFIX))
+
+
+def read_replica(view):
+    """해당 요청의 읽기 쿼리를 복제본으로 보내는 데코레이터
+
+    같은 요청 안에서 쓰기가 한 번이라도 일어나면 이후 읽기는 primary로 고정되어
+    자기가 쓴 데이터를 바로 읽을 수 있다.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        g.db_read_replica = True
+        return view(*args, **kwargs)
+    return wrapper
+
+
+class RoutingSession(Session):
+    """Flask-SQLAlchemy 세션에 복제본 라우팅을 추가한 세션"""
+
+    def _replica_engine(self):
+        key = g.get('db_replica_key')
+        if key is None:
+            keys = replica_bind_keys()
+            if not keys:
+                return None
+            # 요청 하나는 같은 복제본을 계속 사용
+            key = g.db_replica_key = random.choice(keys)
+        return self._db.engines[key]
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and has_app_context() and g.get('db_read_replica'):
+            if self._flushing or isinstance(clause, UpdateBase):
+                g.db_read_replica = False  # 쓰기 이후에는 primary 고정
+            elif clause is None or isinstance(clause, Select):
+                engine = self._replica_engine()
+                if engine is not None:
+                    return engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
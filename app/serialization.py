@@ -0,0 +1,171 @@
+"""
+JSON 응답 고속 경로
+- FastJSONProvider: orjson이 설치되어 있으면 사용하고, 없으면 표준 json으로 대체
+  (pip install orjson - 선택 사항)
+- compile_serializer: (키, 종류) 목록으로 컬럼 튜플 -> 딕셔너리 변환 함수를 미리 만들어 둔다.
+  행마다 getattr/isoformat을 반복하지 않고, orjson이면 datetime도 그대로 넘긴다.
+- list_response/object_response: 큰 목록은 전체를 만들지 않고 청크 단위로 스트리밍
+"""
+
+import decimal
+import json
+import uuid
+from datetime import date, datetime
+from itertools import chain, islice
+
+from flask import Response, stream_with_context
+from flask.json.provider import DefaultJSONProvider
+
+from app.metrics import timed
+
+try:
+    import orjson
+except ImportError:  # 선택 의존성
+    orjson = None
+
+JSON_BACKEND = 'orjson' if orjson is not None else 'json'
+
+# 이 행 수를 넘는 목록은 스트리밍 응답으로 보낸다
+STREAM_THRESHOLD = 1000
+# 스트리밍 시 한 번에 직렬화하는 행 수
+STREAM_CHUNK_SIZE = 500
+
+
+def _default(obj):
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    if isinstance(obj, (decimal.Decimal, uuid.UUID)):
+        return str(obj)
+    if hasattr(obj, '__html__'):
+        return str(obj.__html__())
+    raise TypeError(f'Object of type {type(obj).__name__} is not JSON serializable')
+
+
+if orjson is not None:
+    _ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS
+
+    def dumps(obj):
+        """obj -> JSON bytes"""
+        return orjson.dumps(obj, default=_default, option=_ORJSON_OPTIONS)
+
+    loads = orjson.loads
+else:
+    _encoder = json.JSONEncoder(separators=(',', ':'), default=_default)
+
+    def dumps(obj):
+        """obj -> JSON bytes"""
+        return _encoder.encode(obj).encode('utf-8')
+
+    loads = json.loads
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """jsonify()/request.get_json()에 쓰이는 JSON 공급자"""
+
+    sort_keys = False
+
+    def dumps(self, obj, **kwargs):
+        if kwargs:
+            # 옵션을 지정한 호출은 표준 구현으로
+            return super().dumps(obj, **kwargs)
+        return dumps(obj).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        with timed('serialization'):
+            body = dumps(obj)
+        return self._app.response_class(body, mimetype=self.mimetype)
+
+
+# ---------------------------------------------------------------------------
+# 미리 만든 직렬화 함수
+# ---------------------------------------------------------------------------
+
+def compile_serializer(fields, name='serialize', portable=False):
+    """컬럼 튜플을 딕셔너리로 바꾸는 함수 생성
+
+    fields는 튜플 순서대로의 (키, 종류) 목록이며 종류는
+    'raw'(그대로), 'datetime'(ISO 8601 문자열), 'bool'(True/False/None) 중 하나다.
+    portable=True이면 orjson이 있어도 datetime을 문자열로 바꾼다 (소켓 이벤트처럼 표준 json으로 보낼 값).
+    """
+    lines = [f'def {name}(row):', '    return {']
+    for i, (key, kind) in enumerate(fields):
+        value = f'row[{i}]'
+        if kind == 'datetime' and (orjson is None or portable):
+            # orjson은 datetime을 같은 ISO 형식으로 직접 직렬화한다
+            value = f'(None if {value} is None else {value}.isoformat())'
+        elif kind == 'bool':
+            value = f'(None if {value} is None else bool({value}))'
+        elif kind not in ('raw', 'datetime'):
+            raise ValueError(f'알 수 없는 필드 종류: {kind}')
+        lines.append(f'        {key!r}: {value},')
+    lines.append('    }')
+
+    namespace = {}
+    exec(compile('\n'.join(lines), f'<serializer {name}>', 'exec'), namespace)
+    return namespace[name]
+
+
+# ---------------------------------------------------------------------------
+# 스트리밍
+# ---------------------------------------------------------------------------
+
+def iter_json_array(rows, serialize, chunk_size=STREAM_CHUNK_SIZE):
+    """행 이터러블 -> JSON 배열 바이트 조각"""
+    rows = iter(rows)
+    yield b'['
+    first = True
+    while True:
+        chunk = [serialize(row) for row in islice(rows, chunk_size)]
+        if not chunk:
+            break
+        if not first:
+            yield b','
+        yield dumps(chunk)[1:-1]
+        first = False
+    yield b']'
+
+
+def iter_json_object(fields, list_key, rows, serialize, chunk_size=STREAM_CHUNK_SIZE):
+    """{**fields, list_key: [...]} 형태의 JSON을 목록 부분만 스트리밍"""
+    head = dumps(fields)[:-1]
+    yield head + (b',' if fields else b'') + dumps(list_key) + b':'
+    yield from iter_json_array(rows, serialize, chunk_size)
+    yield b'}'
+
+
+def _peek(rows, threshold):
+    """앞부분 threshold+1개를 읽어 (읽은 목록, 나머지 포함 이터레이터, 작은 목록인지) 반환"""
+    rows = iter(rows)
+    head = list(islice(rows, threshold + 1))
+    if len(head) <= threshold:
+        return head, None, True
+    return head, chain(head, rows), False
+
+
+def list_response(rows, serialize, threshold=STREAM_THRESHOLD):
+    """JSON 배열 응답 - 작은 목록은 한 번에, 큰 목록은 스트리밍"""
+    head, rows, small = _peek(rows, threshold)
+    if small:
+        with timed('serialization'):
+            body = dumps([serialize(row) for row in head])
+        return Response(body, mimetype='application/json')
+    return Response(stream_with_context(iter_json_array(rows, serialize)), mimetype='application/json')
+
+
+def object_response(fields, list_key, rows, serialize, threshold=STREAM_THRESHOLD):
+    """{**fields, list_key: [...]} JSON 응답 - 목록이 크면 스트리밍"""
+    head, rows, small = _peek(rows, threshold)
+    if small:
+        with timed('serialization'):
+            payload = dict(fields)
+            payload[list_key] = [serialize(row) for row in head]
+            body = dumps(payload)
+        return Response(body, mimetype='application/json')
+    return Response(stream_with_context(iter_json_object(fields, list_key, rows, serialize)),
+                    mimetype='application/json')
@@ -431,6 +431,7 @@ async function handleAddEvent(e) {
             } else {
                 showNotification('이벤트가 추가되었습니다!');
             }
+            showConflicts(result.conflicts);
             e.target.reset();
             toggleRepeatOptions(); // 폼 리셋 후 옵션 재설정
             loadEvents();
@@ -577,13 +578,15 @@ async function moveEvent(eventId, newStartTime, newEndTime) {
                 'Authorization': 'Bearer ' + localStorage.getItem('token')
             },
             body: JSON.stringify({
-                start_time: newStartTime,
-                end_time: newEndTime
+                new_start_time: newStartTime,
+                new_end_time: newEndTime
             })
         });
         
         if (response.ok) {
+            const result = await response.json();
             showNotification('일정이 이동되었습니다!');
+            showConflicts(result.conflicts);
             loadEvents(); // 리스트 뷰도 업데이트
         } else {
             const error = await response.json();
@@ -655,6 +658,17 @@ function logout() {
     }, 1000);
 }
 
+function showConflicts(conflicts) {
+    if (!conflicts || conflicts.length === 0) {
+        return;
+    }
+    const titles = conflicts.slice(0, 3).map(conflict => conflict.title).join(', ');
+    const more = conflicts.length > 3 ? ` 외 ${conflicts.length - 3}건` : '';
+    setTimeout(() => {
+        showNotification(`⚠️ 겹치는 일정이 있습니다: ${titles}${more}`, 'error');
+    }, 500);
+}
+
 function showNotification(message, type = 'success') {
     const notification = document.createElement('div');
     notification.className = 'notification';
@@ -2,12 +2,22 @@ let socket;
 let currentRoom = null;
 let currentUser = localStorage.getItem('username');
 let typingTimer;
+let lastTypingSent = 0;
+const binaryCodec = Boolean(window.MessagePack);
+// 서버는 마지막 typing 이벤트 후 5초가 지나면 입력 중 표시를 지우므로 그보다 자주 갱신
+const TYPING_REFRESH_MS = 3000;
 let isTyping = false;
 let currentPage = 1;
 let hasMoreMessages = true;
 let selectedUsers = [];
 let allUsers = [];
 let cryptoInitialized = false;
+// 방별 마지막으로 받은 메시지 순번 (재연결 시 resume으로 놓친 메시지만 받기 위함)
+const roomLastSeq = {};
+// 첨부 파일은 이 크기(평문)로 나눠 청크마다 따로 암호화해 올린다 (IV 12바이트 + GCM 태그 16바이트가 붙음)
+const UPLOAD_CHUNK_SIZE = 1024 * 1024;
+const ENCRYPTION_OVERHEAD = 28;
+const UPLOAD_RETRIES = 3;
 
 document.addEventListener('DOMContentLoaded', async () => {
     console.log('[Chat] DOM 로드 완료, 초기화 시작...');
@@ -45,7 +55,7 @@ document.addEventListener('DOMContentLoaded', async () => {
     // 주기적으로 온라인 상태 업데이트
     setInterval(() => {
         if (socket && socket.connected) {
-            socket.emit('ping', { username: currentUser });
+            socket.emit('ping');
             // 온라인 사용자 목록 업데이트 요청
             socket.emit('request_online_users');
         }
@@ -61,16 +71,22 @@ document.addEventListener('DOMContentLoaded', async () => {
 
 function initializeSocket() {
     // JWT 토큰을 포함한 Socket.IO 연결
+    // 사용자 확인은 서버가 토큰으로 하므로 이벤트에 사용자명을 보내지 않는다
+    // MessagePack 디코더가 있으면 방송 이벤트를 바이너리로 받는다 (서버가 지원하지 않으면 JSON)
     socket = io({
         auth: {
             token: localStorage.getItem('token'),
-            username: currentUser
+            codec: binaryCodec ? 'msgpack' : 'json'
         }
     });
     
     socket.on('connect', () => {
         console.log('소켓 연결됨');
         showNotification('연결되었습니다.', 'success');
+        // 재연결이면 보던 방에 다시 들어가면서 끊긴 동안의 메시지만 받는다
+        if (currentRoom) {
+            resumeRoom(currentRoom);
+        }
         // 연결 후 온라인 상태 업데이트
         updateAllOnlineUsers();
     });
@@ -80,23 +96,65 @@ function initializeSocket() {
         showNotification('연결이 끊어졌습니다. 재연결 중...', 'error');
     });
     
-    socket.on('reconnect', () => {
-        console.log('소켓 재연결됨');
-        showNotification('다시 연결되었습니다.', 'success');
-        if (currentRoom) {
-            socket.emit('join', { room: currentRoom, username: currentUser });
-        }
-    });
     
     socket.on('status', (data) => {
         displaySystemMessage(data.msg);
     });
     
     socket.on('message', (data) => {
+        const lastSeq = roomLastSeq[currentRoom] || 0;
+        if (data.seq && lastSeq && data.seq > lastSeq + 1) {
+            // 중간 메시지가 빠졌으면 빠진 범위부터 다시 받는다
+            resumeRoom(currentRoom);
+            return;
+        }
+        if (data.seq && data.seq <= lastSeq) {
+            return; // 이미 받은 메시지
+        }
+        rememberSeq(currentRoom, data);
         displayMessage(data);
         updateRoomLastMessage(data);
     });
     
+    // 다른 참가자(또는 다른 탭)의 수정/삭제 - 목록을 다시 읽지 않고 해당 메시지만 고친다
+    socket.on('message_updated', async (data) => {
+        if (String(data.room) !== String(currentRoom)) {
+            return;
+        }
+        let content = data.content;
+        if (data.is_encrypted) {
+            content = await decryptMessage(data.content, false, getCurrentRoomInfo());
+        }
+        applyMessageUpdate(data.id, content);
+    });
+    
+    socket.on('message_deleted', (data) => {
+        if (String(data.room) === String(currentRoom)) {
+            removeMessageElement(data.id);
+        }
+    });
+    
+    socket.on('resume', (data) => {
+        if (String(data.room) !== String(currentRoom)) {
+            return;
+        }
+        if (!data.complete) {
+            // 놓친 메시지가 너무 많으면 목록을 새로 읽는다
+            loadMessages(currentRoom);
+            return;
+        }
+        const lastSeq = roomLastSeq[currentRoom] || 0;
+        data.messages.forEach(message => {
+            if (message.seq > lastSeq) {
+                rememberSeq(currentRoom, message);
+                displayMessage(message);
+            }
+        });
+        if (data.messages.length) {
+            updateRoomLastMessage(data.messages[data.messages.length - 1]);
+        }
+    });
+    
     socket.on('user_joined', (data) => {
         displaySystemMessage(`${data.username}님이 참여했습니다.`);
         updateOnlineUsers();
@@ -107,8 +165,21 @@ function initializeSocket() {
         updateOnlineUsers();
     });
     
-    socket.on('typing', (data) => {
-        showTypingIndicator(data.username, data.is_typing);
+    // 서버가 짧은 시간 동안 모은 이벤트 묶음 - 등록된 핸들러에 하나씩 전달
+    socket.on('batch', (frames) => {
+        if (frames instanceof ArrayBuffer) {
+            frames = window.MessagePack.decode(new Uint8Array(frames));
+        }
+        frames.forEach(([event, data]) => {
+            socket.listeners(event).forEach(listener => listener(data));
+        });
+    });
+    
+    socket.on('typing_state', (data) => {
+        if (String(data.room) !== String(currentRoom)) {
+            return;
+        }
+        showTypingIndicator(data.usernames.filter(username => username !== currentUser));
     });
     
     socket.on('online_users_update', (data) => {
@@ -118,6 +189,11 @@ function initializeSocket() {
     socket.on('user_status_changed', (data) => {
         updateUserStatus(data.username, data.is_online);
     });
+    
+    socket.on('event_reminder', (data) => {
+        const when = data.minutes_until > 0 ? `${data.minutes_until}분 후` : '곧';
+        showNotification(`📅 ${data.title} 일정이 ${when} 시작됩니다.`, 'info');
+    });
 }
 
 async function loadChatRooms() {
@@ -183,12 +259,22 @@ function displayChatRooms(rooms) {
     });
 }
 
+function rememberSeq(roomId, message) {
+    if (message.seq && message.seq > (roomLastSeq[roomId] || 0)) {
+        roomLastSeq[roomId] = message.seq;
+    }
+}
+
+function resumeRoom(roomId) {
+    socket.emit('resume', { rooms: { [roomId]: roomLastSeq[roomId] || 0 } });
+}
+
 function joinRoom(roomId, roomName, event) {
     if (currentRoom === roomId) return;
 
     // 이전 방 나가기
     if (currentRoom) {
-        socket.emit('leave', { room: currentRoom, username: currentUser });
+        socket.emit('leave', { room: currentRoom });
         const prevRoom = document.querySelector(`.room-item[data-room-id="${currentRoom}"]`);
         if (prevRoom) {
             prevRoom.classList.remove('active');
@@ -200,7 +286,7 @@ function joinRoom(roomId, roomName, event) {
     hasMoreMessages = true;
 
     // 새 방 참여
-    socket.emit('join', { room: roomId, username: currentUser });
+    socket.emit('join', { room: roomId });
 
     // UI 업데이트
     document.getElementById('currentRoomName').textContent = roomName;
@@ -246,7 +332,9 @@ async function loadMessages(roomId, page = 1) {
             if (page === 1) {
                 // 첫 페이지는 교체
                 document.getElementById('messages').innerHTML = '';
+                roomLastSeq[roomId] = 0;
                 data.messages.forEach(message => {
+                    rememberSeq(roomId, message);
                     displayMessage(message, false);
                 });
             } else {
@@ -270,6 +358,96 @@ async function loadMessages(roomId, page = 1) {
     }
 }
 
+// 메시지 검색 (평문은 서버 전문 검색, 암호화된 메시지는 블라인드 토큰 검색)
+let searchCursor = null;
+
+async function searchMessages(loadMore = false) {
+    const query = document.getElementById('messageSearchInput').value.trim();
+    const results = document.getElementById('searchResults');
+    if (!query) {
+        results.innerHTML = '';
+        results.style.display = 'none';
+        return;
+    }
+    if (!loadMore) {
+        searchCursor = null;
+    }
+    
+    const params = new URLSearchParams({ limit: 20 });
+    let url = '/api/chat/search';
+    if (currentRoom) {
+        url = `/api/chat/rooms/${currentRoom}/search`;
+        // 메시지는 암호화되어 전송되므로 방 안에서는 블라인드 토큰으로 검색
+        if (cryptoInitialized && window.clientCrypto) {
+            const tokens = await window.clientCrypto.searchTokensForGroup(query, currentRoom, false);
+            params.set('tokens', tokens.join(','));
+        }
+    }
+    if (!params.has('tokens')) {
+        params.set('q', query);
+    }
+    if (searchCursor) {
+        params.set('cursor', searchCursor);
+    }
+    
+    try {
+        const response = await fetch(`${url}?${params}`, {
+            headers: { 'Authorization': 'Bearer ' + localStorage.getItem('token') }
+        });
+        if (!response.ok) {
+            showNotification('메시지 검색에 실패했습니다.', 'error');
+            return;
+        }
+        const data = await response.json();
+        
+        if (!loadMore) {
+            results.innerHTML = '';
+        }
+        const moreButton = results.querySelector('.search-more');
+        if (moreButton) {
+            moreButton.remove();
+        }
+        
+        for (const hit of data.results) {
+            let content = hit.content;
+            if (hit.is_encrypted) {
+                try {
+                    content = await decryptMessage(hit.content, hit.username === currentUser, getCurrentRoomInfo());
+                } catch (error) {
+                    content = '[복호화 실패]';
+                }
+            }
+            const item = document.createElement('div');
+            item.className = 'search-result';
+            item.textContent = `${hit.username}: ${truncateText(content, 80)}`;
+            item.title = new Date(hit.timestamp).toLocaleString('ko-KR');
+            item.onclick = () => {
+                const element = document.querySelector(`[data-message-id="${hit.id}"]`);
+                if (element) {
+                    element.scrollIntoView({ behavior: 'smooth', block: 'center' });
+                }
+            };
+            results.appendChild(item);
+        }
+        
+        if (!results.children.length) {
+            results.textContent = '검색 결과가 없습니다.';
+        }
+        
+        searchCursor = data.next_cursor;
+        if (searchCursor) {
+            const more = document.createElement('button');
+            more.className = 'search-more';
+            more.textContent = '더 보기';
+            more.onclick = () => searchMessages(true);
+            results.appendChild(more);
+        }
+        results.style.display = 'block';
+    } catch (error) {
+        console.error('메시지 검색 실패:', error);
+    }
+}
+
 async function loadRoomParticipants(roomId) {
     try {
         const response = await fetch(`/api/chat/rooms/${roomId}/participants`, {
@@ -333,12 +511,15 @@ async function sendMessage() {
     
     let finalContent = content;
     let isEncrypted = false;
+    let searchTokens = [];
     
     // 암호화 처리
     if (cryptoInitialized && window.clientCrypto) {
         try {
             // 모든 채팅에서 AES 그룹 키 사용 (1:1 채팅도 포함)
-            finalContent = await window.clientCrypto.encryptForGroup(content, currentRoom);
+            // 바이너리 인코딩 연결이면 암호문을 base64로 바꾸지 않고 바이트로 보낸다
+            finalContent = await window.clientCrypto.encryptForGroup(content, currentRoom, binaryCodec);
+            searchTokens = await window.clientCrypto.searchTokensForGroup(content, currentRoom);
             isEncrypted = true;
             console.log(`🔒 메시지 암호화됨`);
         } catch (error) {
@@ -354,9 +535,9 @@ async function sendMessage() {
     socket.emit('message', {
         room: currentRoom,
         content: finalContent,
-        username: currentUser,
         reply_to_id: replyToId,
-        is_encrypted: isEncrypted
+        is_encrypted: isEncrypted,
+        search_tokens: searchTokens
     });
     
     input.value = '';
@@ -364,6 +545,155 @@ async function sendMessage() {
     stopTyping();
 }
 
+function handleAttachmentSelected(event) {
+    const file = event.target.files[0];
+    event.target.value = '';
+    if (file) {
+        uploadAttachment(file);
+    }
+}
+
+function authHeaders(extra = {}) {
+    return { 'Authorization': 'Bearer ' + localStorage.getItem('token'), ...extra };
+}
+
+// 첨부 파일 분할 업로드 - 청크마다 그룹 키로 따로 암호화해 올리고, 끊기면 서버가 받은 위치부터 이어 올린다
+async function uploadAttachment(file) {
+    if (!currentRoom) return;
+    if (!cryptoInitialized || !window.clientCrypto) {
+        showNotification('암호화 시스템이 준비되지 않아 파일을 보낼 수 없습니다.', 'error');
+        return;
+    }
+    
+    const roomId = currentRoom;
+    const attachBtn = document.getElementById('attachBtn');
+    const chunkCount = Math.max(1, Math.ceil(file.size / UPLOAD_CHUNK_SIZE));
+    const encryptedChunk = UPLOAD_CHUNK_SIZE + ENCRYPTION_OVERHEAD;
+    const encryptedSize = file.size + chunkCount * ENCRYPTION_OVERHEAD;
+    // 페이지를 새로 열어도 같은 파일이면 진행 중이던 업로드를 이어 간다
+    const resumeKey = `upload:${roomId}:${file.name}:${file.size}:${file.lastModified}`;
+    attachBtn.disabled = true;
+    
+    try {
+        let uploadId = localStorage.getItem(resumeKey);
+        let offset = 0;
+        if (uploadId) {
+            const response = await fetch(`/api/chat/uploads/${uploadId}`, { headers: authHeaders() });
+            if (response.ok) {
+                offset = (await response.json()).offset;
+            } else {
+                uploadId = null;
+            }
+        }
+        if (!uploadId) {
+            const response = await fetch(`/api/chat/rooms/${roomId}/uploads`, {
+                method: 'POST',
+                headers: authHeaders({ 'Content-Type': 'application/json' }),
+                body: JSON.stringify({
+                    file_name: file.name,
+                    mime_type: file.type || 'application/octet-stream',
+                    size: encryptedSize,
+                    is_encrypted: true,
+                    chunk_size: UPLOAD_CHUNK_SIZE
+                })
+            });
+            const data = await response.json();
+            if (!response.ok) {
+                throw new Error(data.error || '업로드를 시작할 수 없습니다.');
+            }
+            uploadId = data.upload_id;
+            localStorage.setItem(resumeKey, uploadId);
+        }
+        
+        let attachment = null;
+        let failures = 0;
+        while (!attachment) {
+            // offset은 항상 암호화된 청크 경계 (마지막 청크만 짧음)
+            const index = Math.floor(offset / encryptedChunk);
+            const plain = await file.slice(index * UPLOAD_CHUNK_SIZE, (index + 1) * UPLOAD_CHUNK_SIZE).arrayBuffer();
+            const body = await window.clientCrypto.encryptForGroup(plain, roomId, true);
+            
+            let response;
+            try {
+                response = await fetch(`/api/chat/uploads/${uploadId}?offset=${index * encryptedChunk}`, {
+                    method: 'PUT',
+                    headers: authHeaders({ 'Content-Type': 'application/octet-stream' }),
+                    body: body
+                });
+            } catch (error) {
+                // 네트워크 오류 - 잠시 뒤 서버가 받은 위치를 다시 확인
+                if (++failures > UPLOAD_RETRIES) throw error;
+                await new Promise(resolve => setTimeout(resolve, 1000 * failures));
+                const status = await fetch(`/api/chat/uploads/${uploadId}`, { headers: authHeaders() });
+                if (status.ok) offset = (await status.json()).offset;
+                continue;
+            }
+            
+            const data = await response.json();
+            if (response.status === 409) {
+                offset = data.offset;
+                continue;
+            }
+            if (!response.ok) {
+                throw new Error(data.error || '파일 전송에 실패했습니다.');
+            }
+            failures = 0;
+            if (data.complete) {
+                attachment = data.attachment;
+            } else {
+                offset = data.offset;
+                attachBtn.title = `파일 첨부 (${Math.floor(offset * 100 / encryptedSize)}%)`;
+            }
+        }
+        localStorage.removeItem(resumeKey);
+        
+        socket.emit('message', {
+            room: roomId,
+            content: await window.clientCrypto.encryptForGroup(file.name, roomId, binaryCodec),
+            is_encrypted: true,
+            attachment_id: attachment.id
+        });
+    } catch (error) {
+        console.error('파일 업로드 실패:', error);
+        showNotification(`파일 업로드 실패: ${error.message}`, 'error');
+    } finally {
+        attachBtn.disabled = false;
+        attachBtn.title = '파일 첨부';
+    }
+}
+
+// 첨부 파일 내려받기 - 암호화된 파일은 청크 단위 Range 요청으로 받아 청크마다 복호화
+async function downloadAttachment(url, fileName) {
+    try {
+        const info = await (await fetch(`${url}/info`, { headers: authHeaders() })).json();
+        if (!info.is_encrypted) {
+            window.open(url, '_blank');
+            return;
+        }
+        
+        const encryptedChunk = info.chunk_size + ENCRYPTION_OVERHEAD;
+        const parts = [];
+        for (let start = 0; start < info.size; start += encryptedChunk) {
+            const end = Math.min(start + encryptedChunk, info.size) - 1;
+            const response = await fetch(url, { headers: authHeaders({ 'Range': `bytes=${start}-${end}` }) });
+            if (response.status !== 206 && response.status !== 200) {
+                throw new Error('파일을 받을 수 없습니다.');
+            }
+            const chunk = new Uint8Array(await response.arrayBuffer());
+            parts.push(await window.clientCrypto.decryptFromGroup(chunk, currentRoom, true));
+        }
+        
+        const link = document.createElement('a');
+        link.href = URL.createObjectURL(new Blob(parts, { type: info.mime_type || 'application/octet-stream' }));
+        link.download = fileName || info.file_name;
+        link.click();
+        setTimeout(() => URL.revokeObjectURL(link.href), 10000);
+    } catch (error) {
+        console.error('파일 다운로드 실패:', error);
+        showNotification('파일을 내려받지 못했습니다.', 'error');
+    }
+}
+
 // 현재 방 정보 가져오기
 function getCurrentRoomInfo() {
     if (!currentRoom) return null;
@@ -449,10 +779,10 @@ async function displayMessage(data, animate = true, prepend = false) {
         }
         
         replyHtml = `
-            <div class="reply-indicator">
+            <div class="reply-indicator" data-reply-to-id="${data.reply_to.id}">
                 <div class="reply-line"></div>
                 <div class="reply-info">
-                    <strong>${data.reply_to.username}</strong>: ${replyContent}
+                    <strong>${data.reply_to.username}</strong>: <span class="reply-text">${replyContent}</span>
                 </div>
             </div>
         `;
@@ -473,6 +803,14 @@ async function displayMessage(data, animate = true, prepend = false) {
         </div>
     `;
     
+    if (data.file_url) {
+        const attachment = document.createElement('div');
+        attachment.className = 'message-attachment';
+        attachment.textContent = `${data.message_type === 'image' ? '🖼️' : '📎'} ${data.file_name || '첨부 파일'}`;
+        attachment.onclick = () => downloadAttachment(data.file_url, data.file_name);
+        messageDiv.querySelector('.message-text').after(attachment);
+    }
+    
     if (prepend) {
         messages.insertBefore(messageDiv, messages.firstChild);
     } else {
@@ -493,11 +831,15 @@ function displaySystemMessage(text) {
     scrollToBottom();
 }
 
-function showTypingIndicator(username, isTyping) {
+function showTypingIndicator(usernames) {
     const indicator = document.getElementById('typingIndicator') || createTypingIndicator();
     
-    if (isTyping) {
-        indicator.innerHTML = `<div class="typing-text">${username}님이 입력 중...</div>`;
+    if (usernames.length) {
+        const names = usernames.length > 3
+            ? `${usernames.slice(0, 3).join(', ')} 외 ${usernames.length - 3}명`
+            : usernames.join(', ');
+        indicator.innerHTML = '<div class="typing-text"></div>';
+        indicator.firstChild.textContent = `${names}님이 입력 중...`;
         indicator.style.display = 'block';
     } else {
         indicator.style.display = 'none';
@@ -528,11 +870,11 @@ function handleKeyPress(event) {
 }
 
 function handleTyping() {
-    if (!isTyping) {
+    if (!isTyping || Date.now() - lastTypingSent > TYPING_REFRESH_MS) {
         isTyping = true;
+        lastTypingSent = Date.now();
         socket.emit('typing', {
             room: currentRoom,
-            username: currentUser,
             is_typing: true
         });
     }
@@ -546,7 +888,6 @@ function stopTyping() {
         isTyping = false;
         socket.emit('typing', {
             room: currentRoom,
-            username: currentUser,
             is_typing: false
         });
     }
@@ -655,21 +996,26 @@ async function editMessage() {
     const newContent = prompt('메시지 수정:', originalContent);
     if (newContent && newContent !== originalContent) {
         try {
+            // 전송할 때와 같이 암호화하고 검색 토큰도 다시 계산
+            let body = { content: newContent };
+            if (cryptoInitialized && window.clientCrypto) {
+                body = {
+                    content: await window.clientCrypto.encryptForGroup(newContent, currentRoom),
+                    search_tokens: await window.clientCrypto.searchTokensForGroup(newContent, currentRoom)
+                };
+            }
+            
             const response = await fetch(`/api/chat/messages/${messageId}`, {
                 method: 'PUT',
                 headers: {
                     'Content-Type': 'application/json',
                     'Authorization': 'Bearer ' + localStorage.getItem('token')
                 },
-                body: JSON.stringify({ content: newContent })
+                body: JSON.stringify(body)
             });
             
             if (response.ok) {
-                messageText.textContent = newContent;
-                const timeElement = messageElement.querySelector('.message-time');
-                if (!timeElement.querySelector('.edited-indicator')) {
-                    timeElement.innerHTML += ' <span class="edited-indicator">(수정됨)</span>';
-                }
+                applyMessageUpdate(messageId, newContent);
                 showNotification('메시지가 수정되었습니다.');
             } else {
                 showNotification('메시지 수정에 실패했습니다.', 'error');
@@ -696,8 +1042,7 @@ async function deleteMessage() {
             });
             
             if (response.ok) {
-                const messageElement = document.querySelector(`[data-message-id="${messageId}"]`);
-                messageElement.remove();
+                removeMessageElement(messageId);
                 showNotification('메시지가 삭제되었습니다.');
             } else {
                 showNotification('메시지 삭제에 실패했습니다.', 'error');
@@ -710,6 +1055,30 @@ async function deleteMessage() {
     menu.style.display = 'none';
 }
 
+// 수정된 메시지 내용과 이 메시지를 인용한 답글 미리보기 갱신
+function applyMessageUpdate(messageId, content) {
+    const messageElement = document.querySelector(`.message[data-message-id="${messageId}"]`);
+    if (messageElement) {
+        messageElement.querySelector('.message-text').textContent = content;
+        const timeElement = messageElement.querySelector('.message-time');
+        if (!timeElement.querySelector('.edited-indicator')) {
+            timeElement.innerHTML += ' <span class="edited-indicator">(수정됨)</span>';
+        }
+    }
+    document.querySelectorAll(`.reply-indicator[data-reply-to-id="${messageId}"] .reply-text`).forEach(element => {
+        element.textContent = truncateText(content, 100);
+    });
+}
+
+// 삭제된 메시지와 이 메시지를 인용한 답글 미리보기 제거 (서버도 답글의 원본 참조를 지움)
+function removeMessageElement(messageId) {
+    const messageElement = document.querySelector(`.message[data-message-id="${messageId}"]`);
+    if (messageElement) {
+        messageElement.remove();
+    }
+    document.querySelectorAll(`.reply-indicator[data-reply-to-id="${messageId}"]`).forEach(element => element.remove());
+}
+
 function copyMessage() {
     const menu = document.getElementById('messageContextMenu');
     const messageId = menu.dataset.messageId;
@@ -772,7 +1141,8 @@ function updateRoomLastMessage(messageData) {
         if (item.onclick.toString().includes(currentRoom)) {
             const lastMessage = item.querySelector('.last-message');
             if (lastMessage) {
-                lastMessage.textContent = `${messageData.username}: ${truncateText(messageData.content, 50)}`;
+                const preview = typeof messageData.content === 'string' ? messageData.content : '🔒 암호화된 메시지';
+                lastMessage.textContent = `${messageData.username}: ${truncateText(preview, 50)}`;
             }
         }
     });
@@ -936,8 +1306,7 @@ async function inviteUser(username, event) {
             // 실시간으로 다른 사용자들에게 알림
             socket.emit('user_invited', {
                 room: currentRoom,
-                invited_user: username,
-                invited_by: currentUser
+                invited_user: username
             });
         } else {
             const error = await response.json();
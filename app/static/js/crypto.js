@@ -7,6 +7,7 @@ class ClientCrypto {
     constructor() {
         this.currentUserKeys = null;
         this.groupKeys = new Map(); // roomId -> AES key
+        this.searchKeys = new Map(); // roomId -> HMAC key (검색 토큰용)
         this.userPublicKeys = new Map(); // username -> public key
     }
 
@@ -148,6 +149,7 @@ class ClientCrypto {
                     );
                     
                     this.groupKeys.set(roomId, aesKey);
+                    this.searchKeys.set(roomId, await this.deriveSearchKey(decryptedKey));
                     return aesKey;
                 }
             }
@@ -157,6 +159,57 @@ class ClientCrypto {
         return null;
     }
 
+    /**
+     * 그룹 키에서 검색 토큰용 HMAC 키를 유도합니다 (암호화 키와 분리)
+     */
+    async deriveSearchKey(rawGroupKey) {
+        const baseKey = await window.crypto.subtle.importKey('raw', rawGroupKey, 'HKDF', false, ['deriveKey']);
+        return await window.crypto.subtle.deriveKey(
+            {
+                name: 'HKDF',
+                hash: 'SHA-256',
+                salt: new Uint8Array(32),
+                info: new TextEncoder().encode('message-search-token')
+            },
+            baseKey,
+            { name: 'HMAC', hash: 'SHA-256', length: 256 },
+            false,
+            ['sign']
+        );
+    }
+
+    /**
+     * 암호화된 메시지 검색용 블라인드 토큰 생성
+     * 단어(와 접두사)마다 방 키로 HMAC을 계산해 서버는 내용을 모른 채 일치 여부만 알 수 있다.
+     * 메시지 전송 시에는 withPrefixes=true, 검색어에는 false로 호출한다.
+     */
+    async searchTokensForGroup(text, roomId, withPrefixes = true) {
+        await this.loadGroupKey(roomId);
+        const searchKey = this.searchKeys.get(roomId);
+        if (!searchKey) {
+            return [];
+        }
+
+        const terms = new Set();
+        for (const word of (text.toLowerCase().match(/[\p{L}\p{N}_]+/gu) || [])) {
+            terms.add(word);
+            if (withPrefixes) {
+                // "회의는" -> "회의"로도 검색되도록 2글자 이상 접두사 포함
+                for (let i = 2; i < word.length; i++) {
+                    terms.add(word.slice(0, i));
+                }
+            }
+        }
+
+        const tokens = [];
+        for (const term of Array.from(terms).slice(0, 64)) {
+            const mac = await window.crypto.subtle.sign('HMAC', searchKey, new TextEncoder().encode(term));
+            tokens.push(Array.from(new Uint8Array(mac).slice(0, 16))
+                .map(b => b.toString(16).padStart(2, '0')).join(''));
+        }
+        return tokens;
+    }
+
     /**
      * 1:1 채팅용 메시지 암호화 (RSA 직접 사용)
      */
@@ -186,14 +239,16 @@ class ClientCrypto {
 
     /**
      * 그룹 채팅용 메시지 암호화 (AES 사용)
+     * raw가 true이면 base64 문자열 대신 바이트(Uint8Array)로 반환
      */
-    async encryptForGroup(message, roomId) {
+    async encryptForGroup(message, roomId, raw = false) {
         const groupKey = await this.loadGroupKey(roomId);
         if (!groupKey) {
             throw new Error('그룹 키를 찾을 수 없습니다');
         }
 
-        const messageBuffer = new TextEncoder().encode(message);
+        // 첨부 파일 청크는 ArrayBuffer/Uint8Array 그대로 암호화
+        const messageBuffer = typeof message === 'string' ? new TextEncoder().encode(message) : message;
         const iv = window.crypto.getRandomValues(new Uint8Array(12)); // GCM needs 12 bytes IV
         
         const encryptedBuffer = await window.crypto.subtle.encrypt(
@@ -210,19 +265,21 @@ class ClientCrypto {
         combined.set(iv);
         combined.set(new Uint8Array(encryptedBuffer), iv.length);
         
-        return this.arrayBufferToBase64(combined.buffer);
+        return raw ? combined : this.arrayBufferToBase64(combined.buffer);
     }
 
     /**
-     * 그룹 채팅용 메시지 복호화
+     * 그룹 채팅용 메시지 복호화 (base64 문자열 또는 MessagePack으로 받은 바이트)
+     * raw=true면 문자열 대신 ArrayBuffer 반환 (첨부 파일 청크)
      */
-    async decryptFromGroup(encryptedMessage, roomId) {
+    async decryptFromGroup(encryptedMessage, roomId, raw = false) {
         const groupKey = await this.loadGroupKey(roomId);
         if (!groupKey) {
             throw new Error('그룹 키를 찾을 수 없습니다');
         }
 
-        const combined = this.base64ToArrayBuffer(encryptedMessage);
+        const combined = typeof encryptedMessage === 'string'
+            ? this.base64ToArrayBuffer(encryptedMessage) : encryptedMessage;
         const iv = combined.slice(0, 12);
         const encrypted = combined.slice(12);
 
@@ -235,7 +292,7 @@ class ClientCrypto {
             encrypted
         );
 
-        return new TextDecoder().decode(decryptedBuffer);
+        return raw ? decryptedBuffer : new TextDecoder().decode(decryptedBuffer);
     }
 
     /**
@@ -0,0 +1,182 @@
+"""
+SQLite 운영 튜닝 계층
+- 모든 SQLite 연결에 WAL, synchronous=NORMAL, mmap, 캐시, busy_timeout PRAGMA 적용
+- 쓰기 작업을 전용 writer 하나로 모아 그룹 커밋 (읽기는 각자 연결에서 동시에 실행)
+"""
+
+import queue
+import sqlite3
+import threading
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app import socketio
+from app.models import db
+
+DEFAULT_SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -64 * 1024,  # 음수는 KiB 단위 (64MB)
+    'busy_timeout': 5000,
+    'temp_store': 'MEMORY',
+}
+
+_sqlite_pragmas = dict(DEFAULT_SQLITE_PRAGMAS)
+
+
+@event.listens_for(Engine, 'connect')
+def _on_connect(dbapi_connection, connection_record):
+    if not isinstance(dbapi_connection, sqlite3.Connection):
+        return
+    # pysqlite의 암묵적 트랜잭션 처리를 끄고 BEGIN을 직접 보낸다
+    # (SAVEPOINT 기반 그룹 커밋이 올바르게 동작하도록)
+    dbapi_connection.isolation_level = None
+    cursor = dbapi_connection.cursor()
+    for name, value in _sqlite_pragmas.items():
+        cursor.execute(f'PRAGMA {name}={value}')
+    cursor.close()
+
+
+@event.listens_for(Engine, 'begin')
+def _on_begin(conn):
+    if conn.dialect.name == 'sqlite':
+        conn.exec_driver_sql('BEGIN')
+
+
+def async_primitives():
+    """Socket.IO 비동기 모드(eventlet/threading)에 맞는 큐/이벤트/작업 생성 함수"""
+    server = getattr(socketio, 'server', None)
+    if server is not None:
+        eio = server.eio
+        return (eio.create_queue, eio.create_event, eio.get_queue_empty_exception(),
+                socketio.start_background_task)
+
+    def start_thread(target):
+        thread = threading.Thread(target=target, daemon=True)
+        thread.start()
+        return thread
+
+    return queue.Queue, threading.Event, queue.Empty, start_thread
+
+
+class _WriteJob:
+    __slots__ = ('func', 'args', 'kwargs', 'done', 'result', 'error')
+
+    def __init__(self, func, args, kwargs, done):
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.done = done
+        self.result = None
+        self.error = None
+
+
+class WriteQueue:
+    """단일 writer 쓰기 큐
+
+    submit()으로 받은 함수들을 전용 writer가 순서대로 실행한다.
+    큐에 쌓인 작업은 각자 SAVEPOINT 안에서 실행한 뒤 한 번에 커밋하므로
+    (그룹 커밋) 작업 하나가 실패해도 같은 묶음의 다른 작업에는 영향이 없다.
+    비활성화되어 있으면 호출한 곳에서 바로 실행하고 커밋한다.
+    """
+
+    def __init__(self, max_batch=128):
+        self.max_batch = max_batch
+        self.enabled = False
+        self.committed_batches = 0
+        self.committed_jobs = 0
+        self._app = None
+        self._queue = None
+        self._create_event = None
+        self._empty = None
+        self._lock = threading.Lock()
+        self._started = False
+
+    def init_app(self, app):
+        self._app = app
+        self.max_batch = app.config.get('SQLITE_WRITE_BATCH_SIZE', self.max_batch)
+        uri = app.config.get('SQLALCHEMY_DATABASE_URI', '')
+        self.enabled = bool(app.config.get('SQLITE_WRITE_QUEUE', False)) and uri.startswith('sqlite')
+
+        _sqlite_pragmas.clear()
+        _sqlite_pragmas.update(app.config.get('SQLITE_PRAGMAS', DEFAULT_SQLITE_PRAGMAS))
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._started:
+                return
+            create_queue, self._create_event, self._empty, start_task = async_primitives()
+            self._queue = create_queue()
+            self._started = True
+        start_task(self._run)
+
+    def submit(self, func, *args, wait=True, **kwargs):
+        """쓰기 함수 실행 요청
+
+        func는 db.session으로 쓰기만 하고 커밋하지 않아야 하며, 반환값은
+        커밋 후 세션 밖에서도 쓸 수 있는 값(딕셔너리 등)이어야 한다.
+        wait=True이면 커밋될 때까지 기다렸다가 결과를 반환한다.
+        """
+        if not self.enabled:
+            try:
+                result = func(*args, **kwargs)
+                db.session.commit()
+                return result
+            except Exception:
+                db.session.rollback()
+                raise
+
+        self._ensure_started()
+        job = _WriteJob(func, args, kwargs, self._create_event() if wait else None)
+        self._queue.put(job)
+        if not wait:
+            return None
+        job.done.wait()
+        if job.error is not None:
+            raise job.error
+        return job.result
+
+    def _next_batch(self):
+        batch = [self._queue.get()]
+        while len(batch) < self.max_batch:
+            try:
+                batch.append(self._queue.get_nowait())
+            except self._empty:
+                break
+        return batch
+
+    def _run(self):
+        with self._app.app_context():
+            while True:
+                batch = self._next_batch()
+                for job in batch:
+                    try:
+                        with db.session.begin_nested():
+                            job.result = job.func(*job.args, **job.kwargs)
+                    except Exception as e:
+                        job.error = e
+                try:
+                    db.session.commit()
+                    self.committed_batches += 1
+                    self.committed_jobs += len(batch)
+                except Exception as e:
+                    db.session.rollback()
+                    for job in batch:
+                        job.error = job.error or e
+                finally:
+                    db.session.remove()
+
+                for job in batch:
+                    if job.error is not None and job.done is None:
+                        print(f'쓰기 작업 오류 ({getattr(job.func, "__name__", job.func)}): {job.error}')
+                    if job.done is not None:
+                        job.done.set()
+
+
+write_queue = WriteQueue()
+
+
+def init_storage(app):
+    write_queue.init_app(app)
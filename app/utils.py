@@ -0,0 +1,17 @@
+"""
+여러 모듈이 함께 쓰는 작은 도우미
+"""
+
+import threading
+import time
+
+
+def os_modules():
+    """eventlet이 패치했어도 실제 OS 스레드/sleep을 쓰는 (threading, time) 모듈"""
+    try:
+        from eventlet import patcher
+    except ImportError:
+        return threading, time
+    if patcher.is_monkey_patched('thread'):
+        return patcher.original('threading'), patcher.original('time')
+    return threading, time
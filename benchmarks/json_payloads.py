@@ -0,0 +1,121 @@
+"""
+JSON 응답 직렬화 벤치마크
+
+이벤트/메시지 10k개 페이로드를 기존 방식(행마다 딕셔너리 + isoformat + Flask 기본 jsonify)과
+고속 경로(미리 만든 직렬화 함수 + FastJSONProvider, 스트리밍)로 직렬화해 초당 바이트 수를 비교한다.
+orjson 설치 여부에 따라 고속 경로의 백엔드가 달라진다.
+
+    python benchmarks/json_payloads.py --rows 10000 --repeat 5
+"""
+
+import argparse
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def make_event_rows(count):
+    base = datetime(2026, 1, 1, 9, 0, 0, 123456)
+    rows = []
+    for i in range(count):
+        start = base + timedelta(hours=i)
+        rows.append((
+            i + 1, f'이벤트 {i}', '회의 안건 검토 및 다음 일정 조율', start, start + timedelta(minutes=30),
+            None, 'meeting', '회의실 A', False, base, base, None, False, None, 15, '#3788d8', 'normal',
+            i % 7 == 0, 'view' if i % 7 == 0 else None, 'bob' if i % 7 == 0 else None,
+        ))
+    return rows
+
+
+def make_message_rows(count):
+    base = datetime(2026, 1, 1, 9, 0, 0, 123456)
+    rows = []
+    for i in range(count):
+        rows.append((
+            i + 1, 'A' * 120, 'text', base + timedelta(seconds=i), i % 5 + 1, False, None, None, True, i + 1,
+            None, None, f'user{i % 5}', None,
+        ))
+    return rows
+
+
+def baseline_events(app, rows):
+    """기존 get_events 방식: 행마다 딕셔너리와 isoformat, Flask 기본 JSON 공급자"""
+    from flask.json.provider import DefaultJSONProvider
+
+    payload = []
+    for row in rows:
+        payload.append({
+            'id': row[0], 'title': row[1], 'description': row[2],
+            'start_time': row[3].isoformat(),
+            'end_time': row[4].isoformat() if row[4] else None,
+            'repeat': row[5], 'category': row[6], 'location': row[7], 'is_all_day': row[8],
+            'created_at': row[9].isoformat(), 'updated_at': row[10].isoformat(),
+            'repeat_group_id': row[11], 'is_repeat_master': row[12],
+            'repeat_until': row[13].isoformat() if row[13] else None,
+            'notification_minutes': row[14], 'color': row[15], 'priority': row[16],
+            'is_shared_with_me': row[17], 'share_permission': row[18], 'owner_username': row[19],
+        })
+    return DefaultJSONProvider(app).dumps(payload).encode('utf-8')
+
+
+def baseline_messages(app, rows):
+    from flask.json.provider import DefaultJSONProvider
+
+    payload = []
+    for row in rows:
+        payload.append({
+            'id': row[0], 'content': row[1], 'message_type': row[2], 'username': row[12],
+            'timestamp': row[3].isoformat(), 'user_id': row[4], 'is_edited': row[5],
+            'edited_at': row[6].isoformat() if row[6] else None, 'reply_to_id': row[7],
+            'is_encrypted': row[8], 'seq': row[9], 'file_url': row[10], 'file_name': row[11],
+        })
+    return DefaultJSONProvider(app).dumps({'messages': payload, 'has_more': False,
+                                           'total': len(rows)}).encode('utf-8')
+
+
+def measure(name, func, repeat):
+    best = None
+    size = 0
+    for _ in range(repeat):
+        started = time.perf_counter()
+        size = len(func())
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    print(f'{name:>28}: {best * 1000:8.1f} ms, {size / 1024:8.0f} KiB, {size / best / 1024 / 1024:8.1f} MiB/s')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    from flask import Flask
+    from app.serialization import JSON_BACKEND, dumps, iter_json_array, iter_json_object
+    from app.calendar.routes import serialize_event
+    from app.chat.routes import serialize_message
+
+    app = Flask(__name__)
+    events = make_event_rows(args.rows)
+    messages = make_message_rows(args.rows)
+    print(f'행 수: {args.rows}, 고속 경로 백엔드: {JSON_BACKEND}')
+
+    measure('events baseline', lambda: baseline_events(app, events), args.repeat)
+    measure('events fast', lambda: dumps([serialize_event(row) for row in events]), args.repeat)
+    measure('events fast (streamed)', lambda: b''.join(iter_json_array(events, serialize_event)), args.repeat)
+
+    measure('messages baseline', lambda: baseline_messages(app, messages), args.repeat)
+    measure('messages fast', lambda: dumps({'has_more': False, 'total': len(messages),
+                                            'messages': [serialize_message(row) for row in messages]}),
+            args.repeat)
+    measure('messages fast (streamed)',
+            lambda: b''.join(iter_json_object({'has_more': False, 'total': len(messages)}, 'messages',
+                                              messages, serialize_message)),
+            args.repeat)
+
+
+if __name__ == '__main__':
+    main()
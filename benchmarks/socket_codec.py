@@ -0,0 +1,123 @@
+"""
+소켓 방송 인코딩 벤치마크 (JSON vs MessagePack)
+
+참가자 200명인 방에 암호화된 메시지 N개를 방송한다고 보고, 기존 JSON 패킷(암호문은 base64 문자열)과
+MessagePack 'batch' 바이너리 첨부(암호문은 바이트)를 비교한다.
+- 서버: 프레임 인코딩 시간 (같은 프레임을 받는 소켓끼리 한 번만 인코딩하므로 참가자 수로 나눈 값)
+- 클라이언트: 받은 프레임 디코딩 + 암호문 바이트 복원 시간 (참가자마다 한 번씩)
+- 전달된 메시지 하나당 전송 바이트
+
+    python benchmarks/socket_codec.py --messages 2000 --members 200 --batch 1
+    python benchmarks/socket_codec.py --batch 10   # 5ms 안에 메시지 10개가 모인 경우
+
+msgpack 패키지가 없으면 JSON 결과만 출력한다.
+"""
+
+import argparse
+import base64
+import json
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def make_payloads(count, plaintext_size):
+    """serialize_message_event 형식의 암호화된 메시지 페이로드 (IV 12바이트 + 암호문 + GCM 태그 16바이트)"""
+    base = datetime(2026, 1, 1, 9, 0, 0, 123456)
+    payloads = []
+    for i in range(count):
+        ciphertext = os.urandom(12 + plaintext_size + 16)
+        payloads.append({
+            'id': i + 1, 'content': base64.b64encode(ciphertext).decode('ascii'), 'message_type': 'text',
+            'timestamp': (base + timedelta(seconds=i)).isoformat(), 'user_id': i % 200 + 1,
+            'is_edited': False, 'edited_at': None, 'reply_to_id': None, 'is_encrypted': True,
+            'seq': i + 1, 'file_url': None, 'file_name': None, 'username': f'user{i % 200}', 'reply_to': None,
+        })
+    return payloads
+
+
+def frames_of(payloads, batch):
+    return [[['message', payload] for payload in payloads[i:i + batch]] for i in range(0, len(payloads), batch)]
+
+
+def encode_json(frames):
+    from socketio import packet
+
+    if len(frames) == 1:
+        return [packet.Packet(packet.EVENT, data=['message', frames[0][1]]).encode()]
+    return [packet.Packet(packet.EVENT, data=['batch', frames]).encode()]
+
+
+def decode_json(encoded):
+    # 클라이언트: 패킷 JSON 파싱 + 암호문 base64 디코딩 (복호화 전 단계)
+    event, data = json.loads(encoded[0][1:])
+    messages = [frame[1] for frame in data] if event == 'batch' else [data]
+    for message in messages:
+        base64.b64decode(message['content'])
+    return len(messages)
+
+
+def encode_msgpack(frames):
+    from socketio import packet
+    from app.chat.codec import pack_frames
+
+    # 바이너리 이벤트: 텍스트 헤더 패킷 + 첨부 바이트
+    return packet.Packet(packet.EVENT, data=['batch', pack_frames(frames)]).encode()
+
+
+def decode_msgpack(encoded):
+    import msgpack
+
+    frames = msgpack.unpackb(encoded[1])
+    return len(frames)
+
+
+def size_of(encoded):
+    return sum(len(part.encode('utf-8')) if isinstance(part, str) else len(part) for part in encoded)
+
+
+def measure(name, frames, encode, decode, members, repeat):
+    best_encode = best_decode = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        encoded = [encode(frame) for frame in frames]
+        elapsed = time.perf_counter() - started
+        best_encode = elapsed if best_encode is None else min(best_encode, elapsed)
+
+        started = time.perf_counter()
+        delivered = sum(decode(item) for item in encoded)
+        elapsed = time.perf_counter() - started
+        best_decode = elapsed if best_decode is None else min(best_decode, elapsed)
+
+    total_bytes = sum(size_of(item) for item in encoded)
+    # 서버는 프레임마다 한 번 인코딩해 members개 소켓에 보내고, 클라이언트는 각자 디코딩한다
+    print(f'{name:>10}: 서버 {best_encode / delivered / members * 1e6:7.3f} us/전달, '
+          f'클라이언트 {best_decode / delivered * 1e6:7.2f} us/메시지, '
+          f'{total_bytes / delivered:7.1f} B/메시지, 방 전체 {total_bytes * members / 1024 / 1024:8.1f} MiB')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--messages', type=int, default=2000)
+    parser.add_argument('--members', type=int, default=200)
+    parser.add_argument('--batch', type=int, default=1, help='프레임 하나에 모인 메시지 수')
+    parser.add_argument('--size', type=int, default=200, help='평문 메시지 크기 (바이트)')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    from app.chat.codec import msgpack
+
+    frames = frames_of(make_payloads(args.messages, args.size), args.batch)
+    print(f'메시지 {args.messages}개, 참가자 {args.members}명, 프레임당 메시지 {args.batch}개, 평문 {args.size}B')
+    measure('json', frames, encode_json, decode_json, args.members, args.repeat)
+    if msgpack is None:
+        print('msgpack이 설치되어 있지 않아 MessagePack 비교를 건너뜁니다 (pip install msgpack)')
+        return
+    measure('msgpack', frames, encode_msgpack, decode_msgpack, args.members, args.repeat)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,527 @@
+"""
+Socket.IO 부하 테스트
+
+시나리오 파일(benchmarks/scenarios/*.json)대로 사용자/채팅방을 준비하고, 가상 클라이언트 수천 개를
+한 프로세스(asyncio)에서 띄워 로컬 서버에 붙인다. 각 클라이언트는 chat.js와 같은 순서로 동작한다.
+    /api/auth/login 로그인 -> 토큰으로 소켓 연결 -> join
+    -> ping_interval마다 ping + request_online_users
+    -> 보내는 클라이언트는 평균 message_interval초마다 typing(3초마다 갱신) 후 message, typing 해제
+메시지 내용에 보낸 시각을 넣어 방 참가자 전원이 받을 때까지의 지연(end-to-end)을 잰다.
+
+결과: 로그인/연결 시간, 보낸 메시지/s, 전달/s, 전달 지연 백분위, 전달률, 서버 CPU/RSS, 오류 수
+
+    python benchmarks/socket_load.py --scenario dm_small
+    python benchmarks/socket_load.py --scenario room_1000 --codec msgpack --json result.json
+    # 이미 떠 있는 서버 (같은 DB에 사용자/방을 준비)
+    python benchmarks/socket_load.py --scenario room_1000 --url http://127.0.0.1:5000 \\
+        --database-url sqlite:////path/app.db --server-pid 12345
+
+필요 패키지: pip install "python-socketio[asyncio_client]" (aiohttp), 선택: psutil (Linux가 아니면 서버 CPU/RSS용)
+기본은 임시 SQLite DB로 서버(python run.py와 같은 socketio.run)를 직접 띄운다.
+클라이언트 수만큼 파일 디스크립터가 필요하므로 ulimit -n을 충분히 올려 둔다.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import resource
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCENARIO_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'scenarios')
+sys.path.insert(0, ROOT)
+
+PASSWORD = 'load-test'
+# chat.js와 같은 간격
+TYPING_REFRESH = 3.0
+# 지연 표본 최대 수 (넘으면 저장소 표본 추출)
+MAX_SAMPLES = 200000
+
+SCENARIO_DEFAULTS = {
+    'rooms': [{'count': 1, 'members': 10}],
+    'duration': 60,
+    'ramp_up': 10,
+    'senders': 1.0,
+    'message_interval': 10,
+    'message_size': 80,
+    'typing_seconds': 2.0,
+    'ping_interval': 30,
+    'codec': 'json',
+    'login_concurrency': 20,
+    'drain': 3,
+}
+
+SERVER_SCRIPT = (
+    'import sys\n'
+    'from app import create_app, socketio\n'
+    'app = create_app()\n'
+    "socketio.run(app, host='127.0.0.1', port=int(sys.argv[1]), log_output=False)\n"
+)
+
+
+def load_scenario(name):
+    path = name if os.path.exists(name) else os.path.join(SCENARIO_DIR, f'{name}.json')
+    with open(path, encoding='utf-8') as f:
+        scenario = {**SCENARIO_DEFAULTS, **json.load(f)}
+    scenario.setdefault('name', os.path.splitext(os.path.basename(path))[0])
+    return scenario
+
+
+# ---------------------------------------------------------------------------
+# 준비 (사용자/채팅방을 DB에 직접 생성)
+# ---------------------------------------------------------------------------
+
+def prepare(scenario, database_url):
+    """시나리오의 사용자와 방을 만든다 (이미 있으면 그대로 사용) - [(username, room_id), ...]"""
+    os.environ['DATABASE_URL'] = database_url
+    from config import Config
+    from app import create_app
+    from app.migrations import upgrade
+    from app.models import ChatRoom, User, db
+    from app.chat import conversations
+
+    class PrepareConfig(Config):
+        SQLALCHEMY_DATABASE_URI = database_url
+        SOCKETIO_ASYNC_MODE = 'threading'
+        SQLITE_WRITE_QUEUE = False
+
+    app = create_app(PrepareConfig)
+    prefix = f"lt_{scenario['name']}_"
+    clients = []
+    with app.app_context():
+        upgrade()
+        # 비밀번호 해시는 한 번만 계산해 모든 사용자에게 사용
+        hasher = User(username='')
+        hasher.set_password(PASSWORD)
+
+        total = sum(group['count'] * group['members'] for group in scenario['rooms'])
+        names = [f'{prefix}{i}' for i in range(total)]
+        existing = {user.username: user for user in User.query.filter(User.username.in_(names))}
+        for name in names:
+            if name not in existing:
+                existing[name] = User(username=name, password_hash=hasher.password_hash)
+                db.session.add(existing[name])
+        db.session.flush()
+
+        index = 0
+        for g, group in enumerate(scenario['rooms']):
+            for r in range(group['count']):
+                members = [existing[name] for name in names[index:index + group['members']]]
+                index += group['members']
+                room_name = f'{prefix}room_{g}_{r}'
+                room = ChatRoom.query.filter_by(name=room_name).first()
+                if room is None:
+                    is_dm = group['members'] == 2
+                    room = ChatRoom(name=room_name, is_group=not is_dm, is_private=is_dm,
+                                    created_by=members[0].id, is_encrypted=False)
+                    room.participants.extend(members)
+                    db.session.add(room)
+                    db.session.flush()
+                    if is_dm:
+                        conversations.link(room.id, members[0].id, members[1].id)
+                clients.extend((member.username, room.id) for member in members)
+        db.session.commit()
+    return clients
+
+
+# ---------------------------------------------------------------------------
+# 서버 프로세스
+# ---------------------------------------------------------------------------
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_server(database_url, port, env_overrides):
+    env = {**os.environ, 'DATABASE_URL': database_url, **env_overrides}
+    # 연결/해제 로그(print)는 버리고 오류(stderr)만 보인다
+    return subprocess.Popen([sys.executable, '-c', SERVER_SCRIPT, str(port)], cwd=ROOT, env=env,
+                            stdout=subprocess.DEVNULL)
+
+
+async def wait_for_server(session, url, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            async with session.get(f'{url}/login') as response:
+                if response.status < 500:
+                    return
+        except OSError:
+            pass
+        await asyncio.sleep(0.2)
+    raise RuntimeError('서버가 시작되지 않았습니다.')
+
+
+class ProcessSampler:
+    """서버 프로세스의 CPU 시간과 RSS 주기 측정 (psutil이 없으면 Linux /proc)"""
+
+    def __init__(self, pid):
+        self.pid = pid
+        self.samples = []  # (monotonic, cpu 초, rss 바이트)
+        try:
+            import psutil
+            self._process = psutil.Process(pid)
+        except ImportError:
+            self._process = None
+
+    def sample(self):
+        try:
+            if self._process is not None:
+                times = self._process.cpu_times()
+                cpu, rss = times.user + times.system, self._process.memory_info().rss
+            else:
+                with open(f'/proc/{self.pid}/stat') as f:
+                    fields = f.read().rsplit(')', 1)[1].split()
+                cpu = (int(fields[11]) + int(fields[12])) / os.sysconf('SC_CLK_TCK')
+                rss = int(fields[21]) * os.sysconf('SC_PAGE_SIZE')
+        except (OSError, ValueError):
+            return
+        self.samples.append((time.monotonic(), cpu, rss))
+
+    async def run(self, interval=1.0):
+        while True:
+            self.sample()
+            await asyncio.sleep(interval)
+
+    def summary(self, since):
+        window = [sample for sample in self.samples if sample[0] >= since]
+        if len(window) < 2:
+            return None
+        (t0, cpu0, _), (t1, cpu1, _) = window[0], window[-1]
+        return {
+            'cpu_percent': (cpu1 - cpu0) / (t1 - t0) * 100,
+            'rss_mb_start': self.samples[0][2] / 1024 / 1024,
+            'rss_mb_peak': max(sample[2] for sample in self.samples) / 1024 / 1024,
+        }
+
+
+# ---------------------------------------------------------------------------
+# 가상 클라이언트
+# ---------------------------------------------------------------------------
+
+class Stats:
+    def __init__(self):
+        self.latencies = []
+        self.latency_count = 0
+        self.login_times = []
+        self.connect_times = []
+        self.sent = 0
+        self.expected = 0
+        self.delivered = 0
+        self.errors = {}
+
+    def error(self, kind):
+        self.errors[kind] = self.errors.get(kind, 0) + 1
+
+    def latency(self, seconds):
+        self.delivered += 1
+        self.latency_count += 1
+        if len(self.latencies) < MAX_SAMPLES:
+            self.latencies.append(seconds)
+        else:
+            slot = random.randrange(self.latency_count)
+            if slot < MAX_SAMPLES:
+                self.latencies[slot] = seconds
+
+
+class LoadClient:
+    def __init__(self, index, username, room_id, scenario, url, stats, room_online, is_sender):
+        self.index = index
+        self.username = username
+        self.room_id = room_id
+        self.scenario = scenario
+        self.url = url
+        self.stats = stats
+        self.room_online = room_online
+        self.is_sender = is_sender
+        self.sio = None
+        self.connected = False
+        self.stopping = False
+
+    async def login(self, session, semaphore):
+        async with semaphore:
+            started = time.perf_counter()
+            async with session.post(f'{self.url}/api/auth/login',
+                                    json={'username': self.username, 'password': PASSWORD}) as response:
+                if response.status != 200:
+                    raise RuntimeError(f'login {response.status}')
+                token = (await response.json())['access_token']
+            self.stats.login_times.append(time.perf_counter() - started)
+            return token
+
+    def _on_message(self, data):
+        content = data.get('content') if isinstance(data, dict) else None
+        if not isinstance(content, str) or '|' not in content:
+            return
+        sent_at, sender, _ = content.split('|', 2)
+        # 부하 테스트 클라이언트가 보낸 메시지만 ('m' 접두사)
+        if sender.startswith('m'):
+            self.stats.latency(time.perf_counter() - float(sent_at))
+
+    def _on_batch(self, frames):
+        if isinstance(frames, (bytes, bytearray)):
+            import msgpack
+            frames = msgpack.unpackb(frames)
+        for event, data in frames:
+            if event == 'message':
+                self._on_message(data)
+
+    async def connect(self, session, semaphore):
+        import socketio
+
+        try:
+            token = await self.login(session, semaphore)
+        except Exception:
+            self.stats.error('login')
+            return False
+
+        self.sio = socketio.AsyncClient(reconnection=False)
+        self.sio.on('message', self._on_message)
+        self.sio.on('batch', self._on_batch)
+        self.sio.on('disconnect', self._on_disconnect)
+        auth = {'token': token}
+        if self.scenario['codec'] == 'msgpack':
+            auth['codec'] = 'msgpack'
+        started = time.perf_counter()
+        try:
+            await self.sio.connect(self.url, auth=auth, transports=['websocket'], wait_timeout=30)
+            await self.sio.emit('join', {'room': self.room_id})
+        except Exception:
+            self.stats.error('connect')
+            return False
+        self.stats.connect_times.append(time.perf_counter() - started)
+        self.connected = True
+        self.room_online[self.room_id] = self.room_online.get(self.room_id, 0) + 1
+        return True
+
+    def _on_disconnect(self):
+        if self.connected:
+            self.connected = False
+            self.room_online[self.room_id] -= 1
+            if not self.stopping:
+                self.stats.error('disconnected')
+
+    async def _emit(self, event, data=None):
+        try:
+            await self.sio.emit(event, data)
+        except Exception:
+            self.stats.error('emit')
+
+    async def pinger(self):
+        # 클라이언트마다 시작 시점을 흩어 동시에 몰리지 않게 한다
+        await asyncio.sleep(random.uniform(0, self.scenario['ping_interval']))
+        while self.connected:
+            await self._emit('ping')
+            await self._emit('request_online_users')
+            await asyncio.sleep(self.scenario['ping_interval'])
+
+    async def sender(self, stop_at):
+        scenario = self.scenario
+        padding = 'x' * max(0, scenario['message_size'] - 30)
+        sent = 0
+        while self.connected:
+            await asyncio.sleep(random.expovariate(1 / scenario['message_interval']))
+            if time.monotonic() >= stop_at or not self.connected:
+                return
+            # 입력 중 표시 (chat.js처럼 3초마다 갱신) 후 전송, 전송 후 해제
+            typing_left = scenario['typing_seconds']
+            while typing_left > 0:
+                await self._emit('typing', {'room': self.room_id, 'is_typing': True})
+                await asyncio.sleep(min(TYPING_REFRESH, typing_left))
+                typing_left -= TYPING_REFRESH
+            sent += 1
+            content = f'{time.perf_counter():.6f}|m{self.index}|{sent}{padding}'
+            self.stats.sent += 1
+            self.stats.expected += self.room_online.get(self.room_id, 0)
+            await self._emit('message', {'room': self.room_id, 'content': content, 'is_encrypted': False})
+            await self._emit('typing', {'room': self.room_id, 'is_typing': False})
+
+    async def close(self):
+        self.stopping = True
+        if self.sio is not None and self.connected:
+            try:
+                await self.sio.disconnect()
+            except Exception:
+                pass
+
+
+# ---------------------------------------------------------------------------
+# 실행
+# ---------------------------------------------------------------------------
+
+def percentile(values, fraction):
+    if not values:
+        return None
+    index = min(len(values) - 1, int(round(fraction * (len(values) - 1))))
+    return values[index]
+
+
+async def run(scenario, clients, url, server_pid):
+    import aiohttp
+
+    stats = Stats()
+    room_online = {}
+    senders = set(random.sample(range(len(clients)), round(len(clients) * scenario['senders'])))
+    load_clients = [LoadClient(i, username, room_id, scenario, url, stats, room_online, i in senders)
+                    for i, (username, room_id) in enumerate(clients)]
+    sampler = ProcessSampler(server_pid) if server_pid else None
+    sampler_task = None
+
+    connector = aiohttp.TCPConnector(limit=scenario['login_concurrency'])
+    async with aiohttp.ClientSession(connector=connector) as session:
+        await wait_for_server(session, url)
+        if sampler is not None:
+            sampler_task = asyncio.ensure_future(sampler.run())
+        semaphore = asyncio.Semaphore(scenario['login_concurrency'])
+
+        # 램프업: ramp_up초에 걸쳐 고르게 연결
+        ramp_started = time.monotonic()
+        delay = scenario['ramp_up'] / max(1, len(load_clients))
+
+        async def start(client, offset):
+            await asyncio.sleep(offset)
+            return await client.connect(session, semaphore)
+
+        results = await asyncio.gather(*(start(client, i * delay) for i, client in enumerate(load_clients)))
+        ramp_seconds = time.monotonic() - ramp_started
+        print(f'연결 {sum(results)}/{len(load_clients)} ({ramp_seconds:.1f}s)')
+
+        # 측정 구간
+        cpu_started = os.times()
+        measure_started = time.monotonic()
+        stop_at = measure_started + scenario['duration']
+        tasks = [asyncio.ensure_future(client.pinger()) for client in load_clients if client.connected]
+        tasks += [asyncio.ensure_future(client.sender(stop_at))
+                  for client in load_clients if client.connected and client.is_sender]
+        await asyncio.sleep(scenario['duration'])
+        measure_seconds = time.monotonic() - measure_started
+        # 전송 중인 메시지가 도착할 시간
+        await asyncio.sleep(scenario['drain'])
+        cpu_finished = os.times()
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await asyncio.gather(*(client.close() for client in load_clients))
+
+    if sampler_task is not None:
+        sampler_task.cancel()
+    latencies = sorted(stats.latencies)
+    generator_cpu = (cpu_finished.user + cpu_finished.system - cpu_started.user - cpu_started.system)
+    return {
+        'scenario': scenario['name'],
+        'codec': scenario['codec'],
+        'clients': len(load_clients),
+        'connected': sum(results),
+        'senders': sum(1 for client in load_clients if client.is_sender),
+        'login_ms_p50': _ms(percentile(sorted(stats.login_times), 0.5)),
+        'login_ms_p95': _ms(percentile(sorted(stats.login_times), 0.95)),
+        'connect_ms_p95': _ms(percentile(sorted(stats.connect_times), 0.95)),
+        'duration': measure_seconds,
+        'messages_sent': stats.sent,
+        'messages_per_second': stats.sent / measure_seconds,
+        'deliveries_per_second': stats.delivered / measure_seconds,
+        'delivery_ratio': stats.delivered / stats.expected if stats.expected else None,
+        'latency_ms': {
+            'p50': _ms(percentile(latencies, 0.5)),
+            'p90': _ms(percentile(latencies, 0.9)),
+            'p99': _ms(percentile(latencies, 0.99)),
+            'p999': _ms(percentile(latencies, 0.999)),
+            'max': _ms(latencies[-1] if latencies else None),
+        },
+        'server': sampler.summary(measure_started) if sampler else None,
+        # 로드 생성기가 CPU를 다 쓰면 지연은 서버가 아니라 생성기 탓일 수 있다
+        'generator_cpu_percent': generator_cpu / (measure_seconds + scenario['drain']) * 100,
+        'errors': stats.errors,
+        'error_rate': sum(stats.errors.values()) / max(1, len(load_clients)),
+    }
+
+
+def _ms(seconds):
+    return None if seconds is None else round(seconds * 1000, 2)
+
+
+def report(result):
+    latency = result['latency_ms']
+    print(f"\n[{result['scenario']}] codec={result['codec']} 클라이언트 {result['connected']}/{result['clients']} "
+          f"(보내는 클라이언트 {result['senders']})")
+    print(f"  로그인 p50 {result['login_ms_p50']} ms, p95 {result['login_ms_p95']} ms / "
+          f"연결 p95 {result['connect_ms_p95']} ms")
+    print(f"  보낸 메시지 {result['messages_sent']}개, {result['messages_per_second']:.1f} msg/s, "
+          f"전달 {result['deliveries_per_second']:.1f}/s, 전달률 "
+          + (f"{result['delivery_ratio'] * 100:.2f}%" if result['delivery_ratio'] is not None else '-'))
+    print(f"  전달 지연 p50 {latency['p50']} / p90 {latency['p90']} / p99 {latency['p99']} / "
+          f"p99.9 {latency['p999']} / max {latency['max']} ms")
+    if result['server']:
+        server = result['server']
+        print(f"  서버 CPU {server['cpu_percent']:.0f}%, RSS {server['rss_mb_start']:.0f} -> "
+              f"최대 {server['rss_mb_peak']:.0f} MB")
+    print(f"  로드 생성기 CPU {result['generator_cpu_percent']:.0f}%")
+    print(f"  오류 {result['errors'] or '없음'} (클라이언트당 {result['error_rate']:.3f})")
+
+
+def raise_fd_limit(clients):
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    wanted = clients * 2 + 256
+    if soft < wanted:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (min(wanted, hard), hard))
+        if hard < wanted:
+            print(f'경고: 파일 디스크립터 한도 {hard}가 클라이언트 {clients}개에 부족할 수 있습니다 (ulimit -n).')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scenario', default='dm_small', help='benchmarks/scenarios의 이름 또는 JSON 파일 경로')
+    parser.add_argument('--url', help='이미 떠 있는 서버 (없으면 임시 DB로 서버를 띄움)')
+    parser.add_argument('--database-url', help='사용자/방을 준비할 DB (--url 서버와 같은 DB)')
+    parser.add_argument('--server-pid', type=int, help='--url 서버의 프로세스 id (CPU/RSS 측정)')
+    parser.add_argument('--server-env', action='append', default=[], metavar='KEY=VALUE',
+                        help='직접 띄우는 서버의 환경변수 (예: BROADCAST_BATCHING=false)')
+    parser.add_argument('--duration', type=float, help='측정 시간(초)')
+    parser.add_argument('--codec', choices=['json', 'msgpack'])
+    parser.add_argument('--json', dest='json_path', help='결과를 JSON 파일로도 저장')
+    args = parser.parse_args()
+
+    scenario = load_scenario(args.scenario)
+    if args.duration is not None:
+        scenario['duration'] = args.duration
+    if args.codec:
+        scenario['codec'] = args.codec
+
+    if args.url and not args.database_url:
+        parser.error('--url을 쓸 때는 같은 서버의 --database-url이 필요합니다.')
+    database_url = args.database_url or f"sqlite:///{tempfile.mkdtemp(prefix='bench-load-')}/load.db"
+    clients = prepare(scenario, database_url)
+    raise_fd_limit(len(clients))
+    print(f"시나리오 {scenario['name']}: 클라이언트 {len(clients)}개, 방 "
+          f"{sum(group['count'] for group in scenario['rooms'])}개")
+
+    server = None
+    url, server_pid = args.url, args.server_pid
+    if url is None:
+        port = free_port()
+        overrides = dict(item.split('=', 1) for item in args.server_env)
+        server = start_server(database_url, port, overrides)
+        url, server_pid = f'http://127.0.0.1:{port}', server.pid
+    try:
+        result = asyncio.run(run(scenario, clients, url, server_pid))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=10)
+
+    report(result)
+    if args.json_path:
+        with open(args.json_path, 'w', encoding='utf-8') as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+"""
+SQLite 쓰기 처리량 벤치마크
+
+동시 소켓 메시지 저장을 흉내 내어, 기본 설정(연결마다 개별 커밋)과
+튜닝 계층(WAL/PRAGMA + 단일 writer 그룹 커밋)의 초당 메시지 수를 비교한다.
+
+    python benchmarks/sqlite_writes.py --producers 32 --messages 200
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def run_mode(mode, producers, messages):
+    from config import Config
+    from app import create_app
+    from app.models import ChatRoom, User, db
+    from app.storage import write_queue
+
+    db_path = os.path.join(tempfile.mkdtemp(prefix='bench-sqlite-'), 'bench.db')
+
+    class BenchConfig(Config):
+        SQLALCHEMY_DATABASE_URI = f'sqlite:///{db_path}'
+        SOCKETIO_ASYNC_MODE = 'threading'
+        SQLITE_WRITE_QUEUE = mode == 'tuned'
+        SQLITE_PRAGMAS = Config.SQLITE_PRAGMAS if mode == 'tuned' else {}
+
+    app = create_app(BenchConfig)
+    from app.chat.routes import _store_message
+
+    with app.app_context():
+        db.create_all()
+        user = User(username='bench', email='bench@example.com')
+        user.set_password('bench')
+        db.session.add(user)
+        db.session.flush()
+        room = ChatRoom(name='bench', created_by=user.id, is_encrypted=False)
+        db.session.add(room)
+        db.session.commit()
+        user_id, room_id = user.id, room.id
+
+    errors = []
+
+    def producer():
+        with app.app_context():
+            for i in range(messages):
+                try:
+                    write_queue.submit(_store_message, room_id, user_id, f'message {i}', None, False)
+                except Exception as e:
+                    errors.append(e)
+            db.session.remove()
+
+    threads = [threading.Thread(target=producer) for _ in range(producers)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    total = producers * messages - len(errors)
+    print(f'{mode:>7}: {total} messages in {elapsed:.2f}s -> {total / elapsed:,.0f} msg/s, '
+          f'errors={len(errors)}, group commits={write_queue.committed_batches}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--producers', type=int, default=32)
+    parser.add_argument('--messages', type=int, default=200, help='producer당 메시지 수')
+    parser.add_argument('--mode', choices=('baseline', 'tuned'))
+    args = parser.parse_args()
+
+    if args.mode:
+        run_mode(args.mode, args.producers, args.messages)
+        return
+
+    # PRAGMA는 프로세스 전역 연결 리스너로 적용되므로 모드마다 별도 프로세스에서 실행
+    for mode in ('baseline', 'tuned'):
+        subprocess.run([sys.executable, __file__, '--mode', mode,
+                        '--producers', str(args.producers), '--messages', str(args.messages)],
+                       check=True)
+
+
+if __name__ == '__main__':
+    main()
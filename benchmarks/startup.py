@@ -0,0 +1,72 @@
+"""
+워커 시작 시간 벤치마크
+
+새 프로세스(워커)마다 앱 패키지 import, create_app(), 첫 요청 처리까지 걸린
+시간을 측정한다. create_app()이 DB/암호화 작업을 하지 않는지 확인하는 용도.
+
+    flask --app run init                      # 한 번 초기화해 둔 DB를 사용
+    python benchmarks/startup.py --workers 8
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def measure_worker():
+    """현재 프로세스에서 한 워커의 시작 단계별 시간(ms)을 측정"""
+    started = time.perf_counter()
+    from app import create_app
+    imported = time.perf_counter()
+
+    app = create_app()
+    created = time.perf_counter()
+
+    with app.test_client() as client:
+        response = client.get('/login')
+    first_request = time.perf_counter()
+
+    return {
+        'import': (imported - started) * 1000,
+        'create_app': (created - imported) * 1000,
+        'first_request': (first_request - created) * 1000,
+        'total': (first_request - started) * 1000,
+        'status': response.status_code,
+        'crypto_loaded': 'app.crypto' in sys.modules,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, default=8, help='측정할 워커(프로세스) 수')
+    parser.add_argument('--worker', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(measure_worker()))
+        return
+
+    # 워커 시작을 흉내 내기 위해 매번 새 프로세스에서 측정 (import 캐시 없음)
+    results = []
+    for _ in range(args.workers):
+        output = subprocess.run([sys.executable, __file__, '--worker'], cwd=ROOT,
+                                check=True, capture_output=True, text=True).stdout
+        results.append(json.loads(output.strip().splitlines()[-1]))
+
+    for key in ('import', 'create_app', 'first_request', 'total'):
+        values = [result[key] for result in results]
+        print(f'{key:>14}: median {statistics.median(values):8.1f} ms, max {max(values):8.1f} ms')
+    statuses = sorted({result['status'] for result in results})
+    crypto = sum(result['crypto_loaded'] for result in results)
+    print(f'{"status":>14}: {statuses}, app.crypto 로드된 워커 {crypto}/{len(results)}')
+
+
+if __name__ == '__main__':
+    main()
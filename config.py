@@ -1,10 +1,106 @@
+import os
+
+
+def _engine_options(url):
+    """DB 종류에 맞는 엔진/커넥션 풀 설정 (환경변수로 조정)"""
+    if url.startswith('sqlite'):
+        # 소켓 핸들러/백그라운드 작업이 다른 스레드에서 연결을 사용할 수 있음
+        return {'connect_args': {'check_same_thread': False}}
+    return {
+        'pool_size': int(os.environ.get('DB_POOL_SIZE', 10)),
+        'max_overflow': int(os.environ.get('DB_MAX_OVERFLOW', 20)),
+        'pool_timeout': int(os.environ.get('DB_POOL_TIMEOUT', 30)),
+        'pool_recycle': int(os.environ.get('DB_POOL_RECYCLE', 1800)),
+        'pool_pre_ping': True,
+    }
+
+
+def _replica_binds():
+    """DATABASE_REPLICA_URLS(쉼표 구분)를 replica_N 바인드로 변환"""
+    urls = [url.strip() for url in os.environ.get('DATABASE_REPLICA_URLS', '').split(',') if url.strip()]
+    return {f'replica_{i}': {'url': url, **_engine_options(url)} for i, url in enumerate(urls)}
+
+
 class Config:
     SECRET_KEY = 'your-secret-key'
-    SQLALCHEMY_DATABASE_URI = 'sqlite:///app.db'
+    SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL', 'sqlite:///app.db')
+    SQLALCHEMY_ENGINE_OPTIONS = _engine_options(SQLALCHEMY_DATABASE_URI)
+    # 읽기 전용 복제본 (app/routing.py의 @read_replica 엔드포인트에서 사용)
+    SQLALCHEMY_BINDS = _replica_binds()
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     JWT_SECRET_KEY = 'your-jwt-secret-key'
     
     # JWT 쿠키 설정
     JWT_TOKEN_LOCATION = ['headers', 'cookies']
     JWT_COOKIE_SECURE = False  # 개발환경에서는 False, 프로덕션에서는 True
-    JWT_COOKIE_CSRF_PROTECT = False  # 개발 편의를 위해 False
\ No newline at end of file
+    JWT_COOKIE_CSRF_PROTECT = False  # 개발 편의를 위해 False
+    
+    # Socket.IO 비동기 모드 (None이면 설치된 패키지에 따라 자동 선택)
+    SOCKETIO_ASYNC_MODE = None
+    
+    # SQLite 튜닝 (app/storage.py) - 모든 연결에 적용되는 PRAGMA
+    SQLITE_PRAGMAS = {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'mmap_size': 256 * 1024 * 1024,
+        'cache_size': -64 * 1024,  # 64MB
+        'busy_timeout': 5000,
+        'temp_store': 'MEMORY',
+    }
+    # 소켓 쓰기를 단일 writer로 모아 그룹 커밋
+    SQLITE_WRITE_QUEUE = True
+    SQLITE_WRITE_BATCH_SIZE = 128
+    
+    # 오래된 메시지 보관 (app/chat/archive.py, `flask archive-messages`)
+    # 경로가 없으면 인스턴스 폴더의 message_archive 사용
+    MESSAGE_ARCHIVE_DIR = os.environ.get('MESSAGE_ARCHIVE_DIR')
+    MESSAGE_ARCHIVE_AFTER_DAYS = int(os.environ.get('MESSAGE_ARCHIVE_AFTER_DAYS', 90))
+    MESSAGE_ARCHIVE_SEGMENT_SIZE = 5000  # 세그먼트 파일 하나에 담는 메시지 수
+    
+    # 최근 메시지 링 버퍼 (app/chat/ring.py) - 메시지 목록 첫 페이지와 재연결(resume) 응답용
+    MESSAGE_RING_SIZE = 200  # 방마다 보관하는 최근 메시지 수
+    MESSAGE_RING_MAX_ROOMS = 1000  # 버퍼를 유지하는 최대 방 수 (오래 쓰지 않은 방부터 제거)
+    MESSAGE_RING_MAX_BYTES = int(os.environ.get('MESSAGE_RING_MAX_BYTES', 64 * 1024 * 1024))  # 전체 크기 추정치 한도
+    
+    # 소켓 이벤트 마이크로 배치 (app/chat/broadcast.py)
+    BROADCAST_BATCHING = os.environ.get('BROADCAST_BATCHING', 'true').lower() == 'true'
+    BROADCAST_BATCH_WINDOW = float(os.environ.get('BROADCAST_BATCH_WINDOW', 0.005))  # 이벤트를 모으는 시간 (초)
+    BROADCAST_MAX_PENDING = int(os.environ.get('BROADCAST_MAX_PENDING', 256))  # 소켓별 최대 대기 이벤트 수
+    # auth.codec='msgpack'을 보낸 클라이언트에 MessagePack으로 방송 (msgpack 설치 시, app/chat/codec.py)
+    SOCKET_BINARY_CODEC = os.environ.get('SOCKET_BINARY_CODEC', 'true').lower() == 'true'
+    # 브라우저용 MessagePack 디코더 - 서버가 코덱을 지원하고 SRI 해시가 설정된 경우에만 페이지에 넣는다
+    MSGPACK_JS_URL = os.environ.get('MSGPACK_JS_URL',
+                                    'https://unpkg.com/@msgpack/msgpack@2.8.0/dist.es5+umd/msgpack.min.js')
+    MSGPACK_JS_INTEGRITY = os.environ.get('MSGPACK_JS_INTEGRITY')  # 예: sha384-...
+    
+    # 첨부 파일 (app/chat/attachments.py) - 경로가 없으면 인스턴스 폴더의 attachments 사용
+    ATTACHMENT_DIR = os.environ.get('ATTACHMENT_DIR')
+    ATTACHMENT_MAX_SIZE = int(os.environ.get('ATTACHMENT_MAX_SIZE', 100 * 1024 * 1024))  # 파일 하나의 최대 크기
+    ATTACHMENT_CHUNK_MAX = 8 * 1024 * 1024  # 요청 하나로 받는 최대 청크 크기
+    ATTACHMENT_UPLOAD_EXPIRE_HOURS = 24  # 이 시간 동안 이어 올리지 않은 업로드는 `flask attachments-gc`가 정리
+    ATTACHMENT_THUMBNAILS = True  # 암호화되지 않은 이미지 미리보기 (Pillow 설치 시)
+    # True면 파일 전송을 프록시(X-Sendfile)에 맡김
+    USE_X_SENDFILE = os.environ.get('USE_X_SENDFILE', 'false').lower() == 'true'
+    
+    # 사용자 활동 감사 로그 버퍼 (app/activity.py)
+    ACTIVITY_LOG_SINK = os.environ.get('ACTIVITY_LOG_SINK', 'database')  # database | file
+    ACTIVITY_LOG_DIR = os.environ.get('ACTIVITY_LOG_DIR')  # 없으면 인스턴스 폴더의 activity_log
+    ACTIVITY_LOG_BATCH_SIZE = 500  # 이 건수가 쌓이면 바로 플러시
+    ACTIVITY_LOG_FLUSH_INTERVAL = 1.0  # 초 - 건수가 적어도 이 간격으로 플러시
+    ACTIVITY_LOG_MAX_BUFFER = 10000  # 메모리 버퍼 최대 건수
+    ACTIVITY_LOG_OVERFLOW = 'spill'  # 버퍼 초과/쓰기 실패 시 spill(디스크로) | drop(버림)
+    
+    # HTTP 응답 압축 (app/compression.py) - brotli는 설치된 경우에만 사용
+    COMPRESSION_ENABLED = True
+    COMPRESSION_MIN_SIZE = 1024  # 바이트 - 이보다 작은 응답은 압축하지 않음
+    COMPRESSION_GZIP_LEVEL = 6
+    COMPRESSION_BROTLI_QUALITY = 4  # 동적 응답은 속도 위주
+    COMPRESSION_GZIP_STATIC_LEVEL = 9
+    COMPRESSION_BROTLI_STATIC_QUALITY = 11  # 정적 파일은 미리 한 번만 압축
+    STATIC_COMPRESSED_DIR = os.environ.get('STATIC_COMPRESSED_DIR')  # 없으면 인스턴스 폴더의 static_compressed
+    STATIC_VERSIONED_MAX_AGE = 365 * 24 * 3600  # ?v=수정시각이 붙은 정적 파일의 캐시 기간(초)
+    
+    # 요청 계측과 /metrics 엔드포인트 (app/metrics.py) - 기본은 꺼짐
+    METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'false').lower() == 'true'
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN')  # 필수 (없으면 /metrics 엔드포인트는 404)
+    METRICS_PROFILE_DIR = os.environ.get('METRICS_PROFILE_DIR')  # 프로파일 결과를 파일로도 저장할 경로
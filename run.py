@@ -3,5 +3,10 @@ from app import create_app, socketio
 app = create_app()
 
 if __name__ == '__main__':
+    # 개발 서버는 편의를 위해 실행 전에 초기화 (운영에서는 `flask --app run init`을 한 번 실행)
+    from app.cli import bootstrap
+    with app.app_context():
+        bootstrap()
+
     # 개발 모드로 실행
     socketio.run(app, debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
@@ -0,0 +1,89 @@
+"""
+핫 쿼리 실행 계획 회귀 테스트
+마이그레이션을 적용한 임시 SQLite DB에서 EXPLAIN QUERY PLAN을 실행해
+자주 실행되는 쿼리가 기대한 인덱스를 타는지 확인한다.
+
+    pip install pytest
+    python -m pytest tests
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config  # noqa: E402
+
+# 쿼리 이름 -> 실행 계획에 나와야 하는 인덱스 (app/query_plans.py의 hot_queries)
+EXPECTED_INDEXES = {
+    'messages_page': 'ix_message_room_timestamp',
+    'message_resume_range': 'ix_message_room_seq',
+    'room_last_message': 'ix_message_room_timestamp',
+    'room_unread_count': 'ix_message_room_unread',
+    'room_participants': 'ix_room_participants_room',
+    'user_group_key': 'sqlite_autoindex_user_group_key_1',
+    'events_range': 'ix_event_user_start',
+    'events_with_shared': 'ix_event_share_shared_with',
+    'event_share_lookup': 'sqlite_autoindex_event_share_1',
+    'repeat_group': 'ix_event_repeat_group',
+    'event_ical_uid': 'ix_event_user_ical_uid',
+    'notification_refill': 'ix_event_fire_at',
+    'message_token_search': 'ix_message_search_token_room_token',
+    'conversations_low': 'ix_conversation_low_activity',
+    'conversations_high': 'ix_conversation_high_activity',
+    'conversation_pair': 'sqlite_autoindex_conversation_1',
+    'conversation_room': 'ix_conversation_room',
+    'recently_seen_users': 'ix_user_last_seen',
+}
+
+# 정렬을 인덱스 순서로 처리해야 하는 쿼리 (임시 B-트리 정렬이 나오면 안 됨)
+ORDERED_BY_INDEX = ('messages_page', 'message_resume_range', 'room_last_message', 'events_range',
+                    'conversations_low', 'conversations_high')
+
+
+@pytest.fixture(scope='module')
+def plans(tmp_path_factory):
+    from app import create_app
+    from app.models import db
+    from app.migrations import upgrade
+    from app.query_plans import explain, hot_queries
+
+    url = f"sqlite:///{tmp_path_factory.mktemp('plans') / 'test.db'}"
+
+    class TestConfig(Config):
+        SQLALCHEMY_DATABASE_URI = url
+        SQLALCHEMY_BINDS = {}
+        SQLITE_WRITE_QUEUE = False
+        SOCKETIO_ASYNC_MODE = 'threading'
+
+    app = create_app(TestConfig)
+    with app.app_context():
+        upgrade()
+        with db.engine.connect() as conn:
+            yield {name: explain(conn, statement) for name, statement in hot_queries()}
+        db.engine.dispose()
+
+
+def test_every_hot_query_has_an_expectation(plans):
+    assert set(plans) == set(EXPECTED_INDEXES)
+
+
+@pytest.mark.parametrize('name', sorted(EXPECTED_INDEXES))
+def test_hot_query_uses_index(plans, name):
+    plan = plans[name]
+    assert any(f'INDEX {EXPECTED_INDEXES[name]} ' in detail for detail in plan), plan
+
+
+@pytest.mark.parametrize('name', ORDERED_BY_INDEX)
+def test_hot_query_orders_by_index(plans, name):
+    plan = plans[name]
+    assert not any(detail.startswith('USE TEMP B-TREE') for detail in plan), plan
+
+
+def test_no_full_scans_on_hot_tables(plans):
+    from app.query_plans import full_scans
+
+    failures = {name: full_scans(plan) for name, plan in plans.items() if full_scans(plan)}
+    assert failures == {}